@@ -2,8 +2,21 @@ import json
 import yaml
 import re
 import argparse
+import os
+import sys
+import hashlib
 from collections import OrderedDict
-from datetime import datetime, timezone
+
+# Per-function Lambda settings; functions with provisionedConcurrency are invoked on this alias
+FUNCTION_SETTINGS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                      'deployment-files', 'lambda', 'functions.yaml')
+LIVE_ALIAS = 'live'
+# Stage cache and throttling per route
+API_SETTINGS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'api_settings.yaml')
+ROUTE_SETTING_KEYS = {'cacheTtl', 'cacheKeyParameters', 'rateLimit', 'burstLimit', 'requestModel'}
+JSON_SCHEMA_DRAFT_4 = 'http://json-schema.org/draft-04/schema#'
+# How long browsers may reuse a preflight response (Chromium caps it at 2 hours, Firefox at 24)
+CORS_MAX_AGE_SECONDS = 7200
 
 # Helper to sanitize names for CloudFormation logical IDs
 # Removes non-alphanumeric characters and capitalizes each part
@@ -21,10 +34,93 @@ def ordered_to_plain(obj):
         return [ordered_to_plain(v) for v in obj]
     return obj
 
-# Main conversion function with full CORS support (including wildcard methods and GatewayResponses)
-def convert_api_to_cfn(api_json):
-    timestamp = datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S%f')
+# Names of the functions deploy-lambda.py gives provisioned concurrency (on the live alias)
+def load_provisioned_functions(settings_path):
+    if not settings_path or not os.path.isfile(settings_path):
+        return set()
+    with open(settings_path, 'r') as f:
+        doc = yaml.safe_load(f) or {}
+    default = (doc.get('defaults') or {}).get('provisionedConcurrency') or 0
+    return {
+        name for name, settings in (doc.get('functions') or {}).items()
+        if (settings or {}).get('provisionedConcurrency', default)
+    }
 
+# Name of the Lambda function an integration URI invokes (without alias or version), or None
+def lambda_function_name(raw_uri):
+    match = re.search(r'/functions/arn:aws:lambda:[^:]+:[0-9]+:function:([^/]+)/', raw_uri or '')
+    return match.group(1).split(':')[0] if match else None
+
+# Names of the Lambda functions the API's methods invoke
+def api_functions(api_json):
+    return {
+        name
+        for res in api_json['resources']
+        for method_def in (res.get('resourceMethods') or {}).values()
+        if (name := lambda_function_name((method_def.get('methodIntegration') or {}).get('uri')))
+    }
+
+# Monolith mode: deploy-lambda.py --monolith moves the provisioned concurrency of the functions the
+# API routes to onto the router, so the router is invoked on its alias when any of them had some
+def with_router_provisioned(provisioned_functions, api_json, router_function):
+    if router_function and set(provisioned_functions) & api_functions(api_json):
+        return set(provisioned_functions) | {router_function}
+    return set(provisioned_functions)
+
+# Stage and per-route cache/throttling/validation settings and request models (see api_settings.yaml)
+def load_api_settings(settings_path):
+    if not settings_path or not os.path.isfile(settings_path):
+        return {'stage': {}, 'routes': {}, 'models': {}}
+    with open(settings_path, 'r') as f:
+        doc = yaml.safe_load(f) or {}
+    routes = doc.get('routes') or {}
+    models = doc.get('models') or {}
+    for route, settings in routes.items():
+        unknown = set(settings or {}) - ROUTE_SETTING_KEYS
+        if unknown:
+            raise ValueError(f"{settings_path}: unknown setting(s) {', '.join(sorted(unknown))} for {route}")
+        if (settings or {}).get('cacheTtl') and not route.startswith('GET '):
+            raise ValueError(f"{settings_path}: only GET routes can be cached ({route})")
+        model = (settings or {}).get('requestModel')
+        if model and model not in models:
+            raise ValueError(f"{settings_path}: {route} uses the undefined model {model}")
+    return {'stage': doc.get('stage') or {}, 'routes': routes, 'models': models}
+
+# Query string parameters a request template reads, e.g. $input.params('userID')
+def template_query_parameters(request_templates):
+    names = set()
+    for body_template in (request_templates or {}).values():
+        names.update(re.findall(r"\$input\.params\(['\"](\w+)['\"]\)", body_template or ''))
+    return names
+
+# MethodSettings address a method by its path with every "/" encoded as "~1"
+def method_setting_path(path):
+    return '/' + path.replace('/', '~1')
+
+# Short digest of the resources a deployment snapshots. The Deployment's logical ID carries it,
+# so CloudFormation creates a new deployment only when the API itself changed
+def definition_hash(resources):
+    canonical = json.dumps(ordered_to_plain(resources), sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:10]
+
+# Router mode: non-proxy integrations only pass what their template builds, so add the
+# method and resource the router (kashishop_common.router) dispatches on
+ROUTE_CONTEXT_FIELDS = '"httpMethod": "$context.httpMethod",\n  "resource": "$context.resourcePath"'
+
+def with_route_context(request_templates):
+    templates = dict(request_templates or {})
+    body_template = templates.get('application/json')
+    if body_template and body_template.lstrip().startswith('{'):
+        start = body_template.index('{') + 1
+        templates['application/json'] = f"{body_template[:start]}\n  {ROUTE_CONTEXT_FIELDS},{body_template[start:]}"
+    else:
+        templates['application/json'] = f"{{\n  {ROUTE_CONTEXT_FIELDS}\n}}\n"
+    return templates
+
+# Main conversion function with full CORS support (including wildcard methods and GatewayResponses)
+# router_function: point every Lambda integration at that single function instead (monolith mode)
+# api_settings: load_api_settings() result, for the stage cache, throttling and request validation
+def convert_api_to_cfn(api_json, provisioned_functions=(), router_function=None, api_settings=None):
     template = OrderedDict()
     template['AWSTemplateFormatVersion'] = '2010-09-09'
     template['Description'] = f"CloudFormation template for API Gateway API: {api_json.get('name')}"
@@ -61,6 +157,11 @@ def convert_api_to_cfn(api_json):
             )
 
     method_logical_ids = []
+    api_settings = api_settings or {'stage': {}, 'routes': {}, 'models': {}}
+    route_settings = dict(api_settings['routes'])
+    method_settings = []
+    validator_logical = sanitize_name(api_json['name'] + 'BodyValidator')
+    validated = False
 
     # 3) Create AWS::ApiGateway::Resource objects
     for res in api_json['resources']:
@@ -135,13 +236,15 @@ def convert_api_to_cfn(api_json):
 
                 # If this is a Lambda or HTTP integration, rewrite the function ARN to include EnvPrefix
                 if integration.get('type') in ['AWS', 'AWS_PROXY', 'HTTP', 'HTTP_PROXY'] and raw_uri:
-                    match = re.search(r'/functions/arn:aws:lambda:[^:]+:[0-9]+:function:([^/]+)/', raw_uri)
-                    if match:
-                        orig_fn = match.group(1)
+                    function_name = lambda_function_name(raw_uri)
+                    if function_name:
+                        orig_fn = router_function or function_name
+                        # Provisioned concurrency only serves requests sent to the alias
+                        qualifier = f":{LIVE_ALIAS}" if orig_fn in provisioned_functions else ''
                         new_uri = {
                             'Fn::Sub': (
                                 f"arn:aws:apigateway:${{AWS::Region}}:lambda:path/2015-03-31/functions/arn:aws:lambda:${{AWS::Region}}:"
-                                f"${{AWS::AccountId}}:function:${{EnvPrefix}}-{orig_fn}/invocations"
+                                f"${{AWS::AccountId}}:function:${{EnvPrefix}}-{orig_fn}{qualifier}/invocations"
                             )
                         }
                         integ_obj['Uri'] = new_uri
@@ -155,7 +258,9 @@ def convert_api_to_cfn(api_json):
                 # Pass through any request parameters or templates
                 if integration.get('requestParameters'):
                     integ_obj['RequestParameters'] = integration['requestParameters']
-                if integration.get('requestTemplates'):
+                if router_function and integration.get('type') == 'AWS':
+                    integ_obj['RequestTemplates'] = with_route_context(integration.get('requestTemplates'))
+                elif integration.get('requestTemplates'):
                     integ_obj['RequestTemplates'] = integration['requestTemplates']
 
                 # Preserve passthroughBehavior, contentHandling, timeout, and caching if present
@@ -180,12 +285,43 @@ def convert_api_to_cfn(api_json):
 
                 method_props['Integration'] = integ_obj
 
+            # d) Stage cache and throttling for this route (api_settings.yaml)
+            settings = route_settings.pop(f"{http_method} {res['path']}", None) or {}
+            method_setting = {}
+            if settings.get('cacheTtl') and integration:
+                key_names = sorted(set(settings.get('cacheKeyParameters') or [])
+                                   | template_query_parameters(integration.get('requestTemplates')))
+                key_params = [f"method.request.querystring.{name}" for name in key_names]
+                if key_params:
+                    # Cache keys must be declared on the method; keep the exported required flags
+                    method_props['RequestParameters'] = {
+                        **{param: False for param in key_params}, **method_props.get('RequestParameters', {})
+                    }
+                method_props['Integration']['CacheKeyParameters'] = key_params
+                method_setting.update({'CachingEnabled': True, 'CacheTtlInSeconds': settings['cacheTtl']})
+            if settings.get('requestModel'):
+                # Rejected with a 400 by API Gateway, before the function is invoked
+                model_logical = sanitize_name(api_json['name'] + settings['requestModel'] + 'Model')
+                method_props['RequestModels'] = {'application/json': {'Ref': model_logical}}
+                method_props['RequestValidatorId'] = {'Ref': validator_logical}
+                validated = True
+            for key, property_name in (('rateLimit', 'ThrottlingRateLimit'), ('burstLimit', 'ThrottlingBurstLimit')):
+                if settings.get(key) is not None:
+                    method_setting[property_name] = settings[key]
+            if method_setting:
+                method_settings.append({
+                    'ResourcePath': method_setting_path(res['path']),
+                    'HttpMethod': http_method,
+                    **method_setting
+                })
+
             resources_section[method_logical] = {
                 'Type': 'AWS::ApiGateway::Method',
                 'Properties': method_props
             }
 
-            # c) Add a CORS OPTIONS method on this same resource
+            # c) Add a CORS OPTIONS method on this same resource, answered by API Gateway (MOCK)
+            # with a Max-Age so browsers reuse the preflight instead of repeating it
             options_logical = sanitize_name(
                 api_json['name'] + res['path'].replace('/', '_') + 'OptionsMethod'
             )
@@ -203,7 +339,8 @@ def convert_api_to_cfn(api_json):
                         'ResponseParameters': {
                             'method.response.header.Access-Control-Allow-Headers': "'Content-Type,Authorization,X-Api-Key,X-Amz-Date,X-Amz-Security-Token'",
                             'method.response.header.Access-Control-Allow-Methods': "'GET,POST,PUT,DELETE,OPTIONS'",
-                            'method.response.header.Access-Control-Allow-Origin': "'*'"
+                            'method.response.header.Access-Control-Allow-Origin': "'*'",
+                            'method.response.header.Access-Control-Max-Age': f"'{CORS_MAX_AGE_SECONDS}'"
                         }
                     }]
                 },
@@ -213,7 +350,8 @@ def convert_api_to_cfn(api_json):
                     'ResponseParameters': {
                         'method.response.header.Access-Control-Allow-Headers': False,
                         'method.response.header.Access-Control-Allow-Methods': False,
-                        'method.response.header.Access-Control-Allow-Origin': False
+                        'method.response.header.Access-Control-Allow-Origin': False,
+                        'method.response.header.Access-Control-Max-Age': False
                     }
                 }]
             }
@@ -223,18 +361,7 @@ def convert_api_to_cfn(api_json):
             }
             method_logical_ids.append(options_logical)
 
-    # 5) Deployment resource, with MethodSettings (no extraneous keys)
-    deployment_logical = sanitize_name(api_json['name'] + 'Deployment')
-    resources_section[deployment_logical] = {
-        'Type': 'AWS::ApiGateway::Deployment',
-        'DependsOn': method_logical_ids,
-        'Properties': {
-            'RestApiId': {'Ref': api_logical_id},
-            'StageName': {'Fn::Sub': f"${{EnvPrefix}}-{timestamp}"}
-        }
-    }
-
-    # 6) Models
+    # 5) Models
     for model in api_json.get('models', []):
         model_logical = sanitize_name(api_json['name'] + model['name'] + 'Model')
         schema_obj = json.loads(model['schema']) if isinstance(model['schema'], str) else model['schema']
@@ -248,7 +375,29 @@ def convert_api_to_cfn(api_json):
             }
         }
 
-    # 7) Authorizers
+    # 5b) Request models from the API settings, and the validator of the methods using them
+    for model_name, schema in (api_settings.get('models') or {}).items():
+        resources_section[sanitize_name(api_json['name'] + model_name + 'Model')] = {
+            'Type': 'AWS::ApiGateway::Model',
+            'Properties': {
+                'RestApiId': {'Ref': api_logical_id},
+                'Name': {'Fn::Sub': f"${{EnvPrefix}}{model_name}"},
+                'ContentType': 'application/json',
+                'Schema': {'$schema': JSON_SCHEMA_DRAFT_4, 'title': model_name, **schema}
+            }
+        }
+    if validated:
+        resources_section[validator_logical] = {
+            'Type': 'AWS::ApiGateway::RequestValidator',
+            'Properties': {
+                'RestApiId': {'Ref': api_logical_id},
+                'Name': 'BodyAndParameters',
+                'ValidateRequestBody': True,
+                'ValidateRequestParameters': True
+            }
+        }
+
+    # 6) Authorizers
     for auth in api_json.get('authorizers', []):
         auth_logical = sanitize_name(api_json['name'] + auth['name'] + 'Authorizer')
         auth_props = {
@@ -266,7 +415,7 @@ def convert_api_to_cfn(api_json):
             auth_props['IdentityValidationExpression'] = auth['identityValidationExpression']
         resources_section[auth_logical] = {'Type': 'AWS::ApiGateway::Authorizer', 'Properties': auth_props}
 
-    # 8) Add GatewayResponses (only ResponseParameters allowed)
+    # 7) Add GatewayResponses (only ResponseParameters allowed)
     for response_type in ['DEFAULT_4XX', 'DEFAULT_5XX']:
         gateway_logical = sanitize_name(api_json['name'] + response_type + 'GatewayResponse')
         resources_section[gateway_logical] = {
@@ -283,13 +432,236 @@ def convert_api_to_cfn(api_json):
             }
         }
 
+    for route in route_settings:
+        print(f"Warning: {route} in the API settings matches no method", file=sys.stderr)
+
+    # 8) Deployment of everything above, named after its hash; regenerating an unchanged API
+    # yields the same template, so the stack update is a no-op
+    digest = definition_hash(resources_section)
+    deployment_logical = sanitize_name(api_json['name'] + 'Deployment') + digest
+    resources_section[deployment_logical] = {
+        'Type': 'AWS::ApiGateway::Deployment',
+        'DependsOn': list(OrderedDict.fromkeys(method_logical_ids)),
+        'Properties': {
+            'RestApiId': {'Ref': api_logical_id},
+            'Description': f"{api_json['name']} {digest}"
+        }
+    }
+
+    # 9) Stage <EnvPrefix>: points at the current deployment and carries the cache cluster and
+    # throttling, which update in place without a new deployment
+    stage_settings = api_settings['stage']
+    stage_props = {
+        'RestApiId': {'Ref': api_logical_id},
+        'StageName': {'Ref': 'EnvPrefix'},
+        'DeploymentId': {'Ref': deployment_logical}
+    }
+    if stage_settings.get('cacheClusterSize'):
+        # Caching stays off for methods without a cacheTtl (CachingEnabled defaults to false)
+        stage_props['CacheClusterEnabled'] = True
+        stage_props['CacheClusterSize'] = str(stage_settings['cacheClusterSize'])
+    elif any(setting.get('CachingEnabled') for setting in method_settings):
+        print("Warning: routes have a cacheTtl but the stage has no cacheClusterSize; they are not cached",
+              file=sys.stderr)
+    # Stage-wide throttling is the method setting for every resource and method
+    stage_throttling = {}
+    if stage_settings.get('rateLimit') is not None:
+        stage_throttling['ThrottlingRateLimit'] = stage_settings['rateLimit']
+    if stage_settings.get('burstLimit') is not None:
+        stage_throttling['ThrottlingBurstLimit'] = stage_settings['burstLimit']
+    if stage_throttling:
+        method_settings.insert(0, {'ResourcePath': '/*', 'HttpMethod': '*', **stage_throttling})
+    if method_settings:
+        stage_props['MethodSettings'] = method_settings
+    stage_logical = sanitize_name(api_json['name'] + 'Stage')
+    resources_section[stage_logical] = {'Type': 'AWS::ApiGateway::Stage', 'Properties': stage_props}
+
+    template['Resources'] = resources_section
+
+    # 10) Outputs
+    template['Outputs'] = OrderedDict({
+        'ApiEndpoint': {
+            'Description': 'Invoke URL for the deployed API',
+            'Value': {'Fn::Sub': f"https://${{{api_logical_id}}}.execute-api.${{AWS::Region}}.amazonaws.com/${{EnvPrefix}}"}
+        }
+    })
+
+    return template
+
+# HTTP API (API Gateway v2) flavour of the same API: Lambda proxy integrations with payload
+# format 2.0 (handlers adapt with kashishop_common.events.accepts_http_api), the built-in CORS
+# instead of MOCK OPTIONS methods and gateway responses, a JWT authorizer for the Cognito pool
+# (only when the REST API protects a route with Cognito; it then takes the UserPoolId and
+# UserPoolClientId parameters) and an auto-deploying stage. HTTP APIs have no stage cache or
+# request validation, so cacheTtl and requestModel settings are ignored.
+def convert_api_to_http_api(api_json, provisioned_functions=(), router_function=None, api_settings=None):
+    template = OrderedDict()
+    template['AWSTemplateFormatVersion'] = '2010-09-09'
+    template['Description'] = f"CloudFormation template for API Gateway HTTP API: {api_json.get('name')}"
+
+    template['Parameters'] = OrderedDict({
+        'EnvPrefix': {
+            'Type': 'String',
+            'Description': 'Prefix for naming resources (e.g., dev, test, prod)',
+            'MinLength': 1
+        }
+    })
+    # The pool is only needed (and the Cognito stack only has to exist first) when a route uses it
+    cognito_protected = any(
+        method_def.get('authorizationType') == 'COGNITO_USER_POOLS'
+        for res in api_json['resources']
+        for method_def in (res.get('resourceMethods') or {}).values()
+    )
+    if cognito_protected:
+        template['Parameters']['UserPoolId'] = {
+            'Type': 'String',
+            'Description': 'Cognito user pool that issues the JWTs (KashishopUserPoolId output of the Cognito stack)'
+        }
+        template['Parameters']['UserPoolClientId'] = {
+            'Type': 'String',
+            'Description': 'App client the JWTs are issued to (Kashishop2UserPoolClientId output of the Cognito stack)'
+        }
+
+    resources_section = OrderedDict()
+
+    # 1) Api, with CORS answered by API Gateway itself
+    api_logical_id = sanitize_name(api_json['name'] + 'HttpApi')
+    resources_section[api_logical_id] = {
+        'Type': 'AWS::ApiGatewayV2::Api',
+        'Properties': {
+            'Name': {'Fn::Sub': f"${{EnvPrefix}}{api_json['name']}"},
+            'ProtocolType': 'HTTP',
+            'CorsConfiguration': {
+                'AllowOrigins': ['*'],
+                'AllowMethods': ['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'],
+                'AllowHeaders': ['Content-Type', 'Authorization', 'X-Api-Key', 'X-Amz-Date', 'X-Amz-Security-Token'],
+                'MaxAge': CORS_MAX_AGE_SECONDS
+            }
+        }
+    }
+
+    # 2) JWT authorizer for the Cognito pool
+    authorizer_logical = sanitize_name(api_json['name'] + 'CognitoAuthorizer')
+    if cognito_protected:
+        resources_section[authorizer_logical] = {
+            'Type': 'AWS::ApiGatewayV2::Authorizer',
+            'Properties': {
+                'ApiId': {'Ref': api_logical_id},
+                'Name': 'CognitoJwt',
+                'AuthorizerType': 'JWT',
+                'IdentitySource': ['$request.header.Authorization'],
+                'JwtConfiguration': {
+                    'Audience': [{'Ref': 'UserPoolClientId'}],
+                    'Issuer': {'Fn::Sub': 'https://cognito-idp.${AWS::Region}.amazonaws.com/${UserPoolId}'}
+                }
+            }
+        }
+
+    api_settings = api_settings or {'stage': {}, 'routes': {}, 'models': {}}
+    route_settings = dict(api_settings['routes'])
+    stage_route_settings = OrderedDict()
+    route_logical_ids = []
+    uncached_routes = []
+    unvalidated_routes = []
+
+    # 3) One Lambda proxy integration per function and a route per method
+    for res in api_json['resources']:
+        for http_method, method_def in (res.get('resourceMethods') or {}).items():
+            integration = method_def.get('methodIntegration') or {}
+            if http_method == 'OPTIONS' and integration.get('type') == 'MOCK':
+                continue  # Preflight requests are answered by the CorsConfiguration
+            function_name = lambda_function_name(integration.get('uri'))
+            if integration.get('type') not in ('AWS', 'AWS_PROXY') or not function_name:
+                print(f"Warning: {http_method} {res['path']} has no Lambda integration; skipped", file=sys.stderr)
+                continue
+            target_fn = router_function or function_name
+            # Provisioned concurrency only serves requests sent to the alias
+            qualifier = f":{LIVE_ALIAS}" if target_fn in provisioned_functions else ''
+
+            integration_logical = sanitize_name(api_json['name'] + '_' + target_fn + 'Integration')
+            if integration_logical not in resources_section:
+                resources_section[integration_logical] = {
+                    'Type': 'AWS::ApiGatewayV2::Integration',
+                    'Properties': {
+                        'ApiId': {'Ref': api_logical_id},
+                        'IntegrationType': 'AWS_PROXY',
+                        'IntegrationUri': {'Fn::Sub': (
+                            f"arn:aws:lambda:${{AWS::Region}}:${{AWS::AccountId}}:function:${{EnvPrefix}}-{target_fn}{qualifier}"
+                        )},
+                        'PayloadFormatVersion': '2.0',
+                        'CredentialsArn': {'Fn::Sub': 'arn:aws:iam::${AWS::AccountId}:role/LabRole'},
+                        # HTTP APIs allow at most 30 seconds
+                        'TimeoutInMillis': min(integration.get('timeoutInMillis') or 30000, 30000)
+                    }
+                }
+
+            route = f"{http_method} {res['path']}"
+            route_props = {
+                'ApiId': {'Ref': api_logical_id},
+                'RouteKey': route,
+                'Target': {'Fn::Sub': f"integrations/${{{integration_logical}}}"},
+                'AuthorizationType': 'NONE'
+            }
+            # Routes the REST API protects with the Cognito authorizer require a JWT here
+            if method_def.get('authorizationType') == 'COGNITO_USER_POOLS':
+                route_props['AuthorizationType'] = 'JWT'
+                route_props['AuthorizerId'] = {'Ref': authorizer_logical}
+            route_logical = sanitize_name(api_json['name'] + res['path'].replace('/', '_') + http_method + 'Route')
+            resources_section[route_logical] = {'Type': 'AWS::ApiGatewayV2::Route', 'Properties': route_props}
+            route_logical_ids.append(route_logical)
+
+            settings = route_settings.pop(route, None) or {}
+            if settings.get('cacheTtl'):
+                uncached_routes.append(route)
+            if settings.get('requestModel'):
+                unvalidated_routes.append(route)
+            throttling = {}
+            if settings.get('rateLimit') is not None:
+                throttling['ThrottlingRateLimit'] = settings['rateLimit']
+            if settings.get('burstLimit') is not None:
+                throttling['ThrottlingBurstLimit'] = settings['burstLimit']
+            if throttling:
+                stage_route_settings[route] = throttling
+
+    for route in route_settings:
+        print(f"Warning: {route} in the API settings matches no method", file=sys.stderr)
+    if uncached_routes:
+        print(f"Warning: HTTP APIs have no stage cache; cacheTtl is ignored for {', '.join(uncached_routes)}",
+              file=sys.stderr)
+    if unvalidated_routes:
+        print(f"Warning: HTTP APIs have no request validation; requestModel is ignored for "
+              f"{', '.join(unvalidated_routes)}", file=sys.stderr)
+
+    # 4) Stage <EnvPrefix>, deployed automatically on every change
+    stage_settings = api_settings['stage']
+    stage_props = {
+        'ApiId': {'Ref': api_logical_id},
+        'StageName': {'Ref': 'EnvPrefix'},
+        'AutoDeploy': True
+    }
+    default_throttling = {}
+    if stage_settings.get('rateLimit') is not None:
+        default_throttling['ThrottlingRateLimit'] = stage_settings['rateLimit']
+    if stage_settings.get('burstLimit') is not None:
+        default_throttling['ThrottlingBurstLimit'] = stage_settings['burstLimit']
+    if default_throttling:
+        stage_props['DefaultRouteSettings'] = default_throttling
+    if stage_route_settings:
+        stage_props['RouteSettings'] = stage_route_settings
+    resources_section[sanitize_name(api_json['name'] + 'HttpStage')] = {
+        'Type': 'AWS::ApiGatewayV2::Stage',
+        # RouteSettings can only name routes that exist
+        'DependsOn': route_logical_ids,
+        'Properties': stage_props
+    }
+
     template['Resources'] = resources_section
 
-    # 9) Outputs
+    # 5) Outputs
     template['Outputs'] = OrderedDict({
         'ApiEndpoint': {
             'Description': 'Invoke URL for the deployed API',
-            'Value': {'Fn::Sub': f"https://${{{api_logical_id}}}.execute-api.${{AWS::Region}}.amazonaws.com/{timestamp}"}
+            'Value': {'Fn::Sub': f"https://${{{api_logical_id}}}.execute-api.${{AWS::Region}}.amazonaws.com/${{EnvPrefix}}"}
         }
     })
 
@@ -300,6 +672,14 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Convert API Gateway JSON to CloudFormation template with CORS')
     parser.add_argument('--input', required=True, help='Input JSON file from get-apigw.sh')
     parser.add_argument('--output', required=True, help='Output CloudFormation YAML file')
+    parser.add_argument('--function-settings', default=FUNCTION_SETTINGS_PATH,
+                        help='functions.yaml; functions with provisionedConcurrency are invoked on their live alias')
+    parser.add_argument('--api-settings', default=API_SETTINGS_PATH,
+                        help='Stage cache and throttling per route (api_settings.yaml)')
+    parser.add_argument('--http-api', action='store_true',
+                        help='Emit an HTTP API (payload format 2.0, built-in CORS, JWT authorizer for Cognito-protected routes)')
+    parser.add_argument('--router-function', default=None,
+                        help='Point every Lambda method at this one function (deploy-lambda.py --monolith), e.g. router')
     args = parser.parse_args()
 
     with open(args.input, 'r') as f:
@@ -310,7 +690,12 @@ if __name__ == '__main__':
     else:
         api_json = apis
 
-    template = convert_api_to_cfn(api_json)
+    convert = convert_api_to_http_api if args.http_api else convert_api_to_cfn
+    provisioned_functions = with_router_provisioned(load_provisioned_functions(args.function_settings), api_json,
+                                                    args.router_function)
+    template = convert(api_json, provisioned_functions,
+                       router_function=args.router_function,
+                       api_settings=load_api_settings(args.api_settings))
     plain_template = ordered_to_plain(template)
 
     yaml_str = yaml.safe_dump(plain_template, sort_keys=False)
@@ -334,7 +719,14 @@ if __name__ == '__main__':
         else:
             new_lines.append(line)
 
+    output = '\n'.join(new_lines) + '\n'
+    if os.path.isfile(args.output):
+        with open(args.output, 'r') as f:
+            if f.read() == output:
+                print(f"CloudFormation template {args.output} is unchanged")
+                sys.exit(0)
+
     with open(args.output, 'w') as out_f:
-        out_f.write('\n'.join(new_lines) + '\n')
+        out_f.write(output)
 
     print(f"CloudFormation template written to {args.output}")
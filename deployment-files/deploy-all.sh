@@ -3,6 +3,8 @@
 # deploy-all.sh (updated to deploy Cognito stack and call external callback updater)
 #
 # Usage: ./deploy-all.sh <ENV>
+#        LAMBDA_MODE=router ./deploy-all.sh <ENV>   (every API route served by one <ENV>-router function)
+#        API_TYPE=http ./deploy-all.sh <ENV>        (HTTP API with built-in CORS instead of the REST API)
 #
 # Performs end-to-end deployment for Kashishop:
 #   1. Print AWS caller identity & environment info
@@ -11,17 +13,21 @@
 #   4. Deploy S3 buckets
 #   5. Deploy Cognito resources
 #   6. Deploy API Gateway stack
-#   7. Deploy all Lambda functions
+#   7. Deploy all Lambda functions (+ S3 trigger for image variants, mail outbox triggers,
+#      keep-warm schedule, optional seed data from SEED_SNAPSHOT)
 #   8. Update Cognito callback URL via external script
 #   9. Configure Cognito App Client Core Settings (NEW)
 #  10. Deploy Cognito Managed Branding via Python script
 #  11. Create Admin User (NEW)
-#  12. Enable CORS on API Gateway resources
+#  12. Enable CORS on API Gateway resources (REST API only; the HTTP API has it built in)
 #  13. Update Frontend JS with new API endpoint
 #  14. Update Login Button URL (NEW)
 #  15. Sync frontend files to S3
 #  16. Deploy login.html to S3
 #  17. Print Frontend URL
+#
+# scripts/deploy-graph.py runs the same steps as a dependency graph: independent steps at the
+# same time, unchanged ones skipped, with a critical-path timing report.
 
 set -euo pipefail
 
@@ -48,8 +54,26 @@ COGNITO_BRANDING_SCRIPT="${SCRIPTS_DIR}/configure-login.py" # Path to your Pytho
 COGNITO_APP_CLIENT_CONFIG_SCRIPT="${SCRIPTS_DIR}/cognito-client-settings.sh" # Path to your App Client configuration Bash script
 SETUP_ADMIN_SCRIPT="${SCRIPTS_DIR}/setup-admin.sh" # Path to your setup-admin.sh script
 UPDATE_LOGIN_BUTTON_SCRIPT="${SCRIPTS_DIR}/update-login-button.py" # Path to the new login button update script
+IMAGE_VARIANTS_SCRIPT="${SCRIPTS_DIR}/configure-image-variants.sh" # S3 trigger for thumbnail/variant generation
+MAIL_OUTBOX_SCRIPT="${SCRIPTS_DIR}/configure-mail-outbox.sh" # Stream + schedule that drain the mail outbox
+KEEP_WARM_SCRIPT="${SCRIPTS_DIR}/configure-keep-warm.py" # Scheduled pings for keepWarm in lambda/functions.yaml
+SNAPSHOT_SCRIPT="${SCRIPTS_DIR}/snapshot_env.py" # Restores SEED_SNAPSHOT (if set) into the new tables
 COGNITO_FULL_JSON_PATH="$(pwd)/../cognito_full.json" # Assumes cognito_full.json is in the project root
 TEMPLATE_BUCKET="${ENV}-kashishop-templates"
+LAMBDA_MODE="${LAMBDA_MODE:-functions}" # functions (one Lambda per route) or router (monolith mode)
+API_TYPE="${API_TYPE:-rest}" # rest (REST API) or http (HTTP API, payload format 2.0)
+if [[ "${API_TYPE}" == "http" ]]; then
+  API_TEMPLATE_PREFIX="api-gateway-http"
+else
+  API_TEMPLATE_PREFIX="api-gateway"
+fi
+if [[ "${LAMBDA_MODE}" == "router" ]]; then
+  API_TEMPLATE="${API_TEMPLATE_PREFIX}-router-template.yaml"
+  LAMBDA_OPTIONS=(--monolith)
+else
+  API_TEMPLATE="${API_TEMPLATE_PREFIX}-template.yaml"
+  LAMBDA_OPTIONS=()
+fi
 
 # 1️⃣ AWS Identity & Region/Account Info
 ACCOUNT_ID=$(aws sts get-caller-identity --query Account --output text)
@@ -113,20 +137,53 @@ echo "🚀 Deploying API Gateway Stack: ${API_STACK_NAME}"
 if ! aws s3api head-bucket --bucket "${TEMPLATE_BUCKET}" 2>/dev/null; then
   aws s3 mb "s3://${TEMPLATE_BUCKET}" --region "${REGION}"
 fi
+API_PARAMETERS=(EnvPrefix="${ENV}")
+if grep -q '^  UserPoolClientId:' "${TEMPLATE_DIR}/${API_TEMPLATE}"; then
+  # The HTTP API's JWT authorizer (generated only for Cognito-protected routes) trusts tokens of
+  # this environment's user pool and app client
+  read -r USER_POOL_ID USER_POOL_CLIENT_ID < <(aws cloudformation describe-stacks \
+    --stack-name "${COGNITO_STACK_NAME}" \
+    --query "[Stacks[0].Outputs[?OutputKey=='KashishopUserPoolId'].OutputValue | [0], Stacks[0].Outputs[?OutputKey=='Kashishop2UserPoolClientId'].OutputValue | [0]]" \
+    --output text --region "${REGION}")
+  API_PARAMETERS+=(UserPoolId="${USER_POOL_ID}" UserPoolClientId="${USER_POOL_CLIENT_ID}")
+fi
 aws cloudformation deploy \
-  --template-file "${TEMPLATE_DIR}/api-gateway-template.yaml" \
+  --template-file "${TEMPLATE_DIR}/${API_TEMPLATE}" \
   --stack-name "${API_STACK_NAME}" \
-  --parameter-overrides EnvPrefix="${ENV}" \
+  --parameter-overrides "${API_PARAMETERS[@]}" \
   --capabilities CAPABILITY_NAMED_IAM \
   --region "${REGION}" \
   --s3-bucket "${TEMPLATE_BUCKET}"
 echo "✅ API Gateway Stack deployed."
 
 # 7️⃣ Deploy Lambda functions
-echo "🛠️ Deploying Lambdas..."
-"${LAMBDA_SCRIPT}" "${ENV}"
+echo "🛠️ Deploying Lambdas (${LAMBDA_MODE} mode)..."
+"${LAMBDA_SCRIPT}" "${ENV}" ${LAMBDA_OPTIONS[@]+"${LAMBDA_OPTIONS[@]}"}
 echo "✅ Lambdas deployed."
 
+# 7️⃣b Enable image variant generation on uploads
+echo "🖼️ Configuring image variant generation..."
+"${IMAGE_VARIANTS_SCRIPT}" "${ENV}" "${PILLOW_LAYER_ARN:-}"
+echo "✅ Image variant trigger configured."
+
+# 7️⃣c Deliver queued mail from the outbox table
+echo "📨 Configuring mail outbox delivery..."
+"${MAIL_OUTBOX_SCRIPT}" "${ENV}"
+echo "✅ Mail outbox delivery configured."
+
+# 7️⃣d Keep latency-critical functions warm (keepWarm in lambda/functions.yaml)
+echo "🔥 Scheduling keep-warm pings..."
+python3 "${KEEP_WARM_SCRIPT}" "${ENV}" --region "${REGION}" ${LAMBDA_OPTIONS[@]+"${LAMBDA_OPTIONS[@]}"}
+echo "✅ Keep-warm pings scheduled."
+
+# 7️⃣e Seed the tables from a snapshot (optional: SEED_SNAPSHOT=<snapshot dir> ./deploy-all.sh <ENV>)
+# Runs after 7️⃣b so the copied images get their variants from the S3 trigger
+if [[ -n "${SEED_SNAPSHOT:-}" ]]; then
+  echo "🌱 Seeding ${ENV} from snapshot ${SEED_SNAPSHOT}..."
+  python3 "${SNAPSHOT_SCRIPT}" restore "${SEED_SNAPSHOT}" "${ENV}" --region "${REGION}"
+  echo "✅ Snapshot restored."
+fi
+
 # 8️⃣ Update Cognito callback URL
 echo "🔄 Updating Cognito callback URL via external script..."
 "${UPDATE_COGNITO_SCRIPT}" "${ENV}"
@@ -148,8 +205,12 @@ echo "✅ Cognito App Client core settings applied."
 
 # 1️⃣2️⃣ Enable CORS on API Gateway
 API_NAME="${ENV}Kashishop2API"
-API_ID=$(aws apigateway get-rest-apis --query "items[?name=='${API_NAME}'].id" --output text --region "${REGION}")
-if [[ -n "${API_ID}" && -f "${ENABLE_CORS_SCRIPT}" ]]; then
+if [[ "${API_TYPE}" == "http" ]]; then
+  API_ID=$(aws apigatewayv2 get-apis --query "Items[?Name=='${API_NAME}'].ApiId" --output text --region "${REGION}")
+else
+  API_ID=$(aws apigateway get-rest-apis --query "items[?name=='${API_NAME}'].id" --output text --region "${REGION}")
+fi
+if [[ "${API_TYPE}" != "http" && -n "${API_ID}" && -f "${ENABLE_CORS_SCRIPT}" ]]; then
   python3 "${ENABLE_CORS_SCRIPT}" --api-id "${API_ID}" --region "${REGION}" --stage "${ENV}"
 fi
 
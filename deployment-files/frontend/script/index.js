@@ -88,7 +88,7 @@ document.addEventListener("DOMContentLoaded", () => {
         const itemCard = document.createElement("div");
         itemCard.classList.add("item-card");
         itemCard.innerHTML = `
-            <img src="${item.image}" alt="${item.item_name}" class="item-image">
+            ${itemImageMarkup(item)}
             <div class="item-details">
               <h3 class="item-name">${item.item_name}</h3>
               <p class="item-description">${item.item_description}</p>
@@ -195,6 +195,35 @@ document.addEventListener("DOMContentLoaded", () => {
   });
 });
 
+// Card images are 250px wide (see .item-image in main.css)
+const ITEM_IMAGE_SIZES = "250px";
+
+function buildSrcset(variants) {
+  return Object.entries(variants)
+    .map(([width, url]) => `${url} ${width}w`)
+    .join(", ");
+}
+
+function itemImageMarkup(item) {
+  const variants = item.imageVariants || {};
+  if (!variants.webp || !variants.jpg) {
+    return `<img src="${item.image}" alt="${item.item_name}" class="item-image" loading="lazy">`;
+  }
+  return `
+            <picture>
+              <source type="image/webp" srcset="${buildSrcset(variants.webp)}" sizes="${ITEM_IMAGE_SIZES}">
+              <source type="image/jpeg" srcset="${buildSrcset(variants.jpg)}" sizes="${ITEM_IMAGE_SIZES}">
+              <img src="${item.image}" alt="${item.item_name}" class="item-image" loading="lazy" onerror="useOriginalImage(this)">
+            </picture>`;
+}
+
+// Variants are generated asynchronously after upload; fall back to the original until they exist
+function useOriginalImage(img) {
+  img.onerror = null;
+  img.parentElement.querySelectorAll("source").forEach((source) => source.remove());
+  img.src = img.getAttribute("src");
+}
+
 async function buyItem(itemID) {
   if (currentUserID == null) {
     createPopupWarning("You must be logged in to buy an item!");
@@ -286,44 +315,16 @@ async function buyItem(itemID) {
         restoreButton(buyBtn);
         button.innerHTML = "Pending";
       }
-      console.log("Success:", data);
-    })
-    .catch((error) => {
-      console.error("Error occurred:", error);
-      restoreButton(buyBtn);
-    });
-  fetch(API + `Users/get_email?userID=` + item.seller, {
-
-    method: "GET",
-  })
-    .then((response) => {
-      if (!response.ok) {
-
-        return response.json().then((errorData) => {
-          console.error("Error response data:", errorData);
-          restoreButton(buyBtn);
-          throw new Error(`Error: ${errorData.message || "Unknown error"}`);
-        });
+      if (!data.transactionExists) {
+        // The seller is notified by email in their next offer digest (see add_transaction)
+        createPopupSuccess("Offer sent successfully!");
+        buyBtn.innerHTML = "Pending";
       }
-      return response.json();
-    })
-    .then(async (data) => {
       console.log("Success:", data);
-      const email = data.body;
-      console.log("email:", email);
-      await sendEmail(
-        email,
-        `You have a new offer for ${item.item_name}!`,
-        `You have a new offer for your item, ${item.item_name}! Please check your offers in your profile.`
-      );
-      createPopupSuccess("Offer sent successfully!");
-
-      buyBtn.innerHTML = "Pending";
     })
     .catch((error) => {
       console.error("Error occurred:", error);
-      createPopupError("Error occurred:", error);
-      restoreButton(buyBtn)
+      restoreButton(buyBtn);
     });
   console.log("supposed success but maybe not unless no CORS");
 
@@ -582,34 +582,7 @@ async function buyItem(itemID) {
     return;
   }
 
-  try {
-    const emailResponse = await fetch(
-      API + `Users/get_email?userID=${item.seller}`,
-      {
-        method: "GET",
-      }
-    );
-
-    if (!emailResponse.ok) {
-      const errorData = await emailResponse.json();
-      console.error("Error response data:", errorData);
-      throw new Error(
-        `Error: ${errorData.message || "Unknown error while fetching email."}`
-      );
-    }
-
-    const emailData = await emailResponse.json();
-    const email = emailData.body;
-    console.log("Email:", email);
-
-    await sendEmail(
-      email,
-      `You have a new offer for your item, ${item.item_name} on Kashishop!`,
-      `You have a new offer for your item! Please check your offers in your profile.`
-    );
-  } catch (error) {
-    console.error("Error occurred while sending email:", error);
-  }
+  // The seller is notified by email in their next offer digest (see add_transaction)
 
   console.log("Item purchase process completed.");
 }
@@ -2,32 +2,25 @@ import boto3
 import json
 from datetime import datetime
 import uuid
+from kashishop_common import config
+from kashishop_common.warmup import skip_warmup
+from kashishop_common.events import accepts_http_api
 
 def generate_uuid():
     return str(uuid.uuid4())
 
+@skip_warmup
+@accepts_http_api
 def lambda_handler(event, context):
     """
     Lambda function to add a new item to the DynamoDB table "Items".
     """
     
     dynamodb = boto3.resource('dynamodb')
-    table_name = "Items"
+    table_name = config.ITEMS_TABLE
     table = dynamodb.Table(table_name)
 
-    # Handle preflight OPTIONS request
-    if event.get('httpMethod') == 'OPTIONS':
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'POST, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type',
-                'Access-Control-Allow-Credentials': 'true',
-            },
-            'body': json.dumps({'message': 'CORS preflight request successful'})
-        }
-
+    # Preflight requests are answered by API Gateway and never reach the function
     try:
         # Extracting the item details from the event body
         item = json.loads(event['body'])
@@ -1,12 +1,41 @@
 import boto3
 import json
+import os
+import time
+import uuid
 from boto3.dynamodb.conditions import Attr
 from botocore.exceptions import ClientError
+from kashishop_common import config
+from kashishop_common.warmup import skip_warmup
+from kashishop_common.events import accepts_http_api
 
 # Initialize DynamoDB resource
 dynamodb = boto3.resource('dynamodb', region_name='us-east-1')  # Update with your region
-transaction_table_name = "TransactionHistory"  # Replace with your Transactions table name
+transaction_table_name = config.TRANSACTIONS_TABLE
+outbox_table_name = config.MAIL_OUTBOX_TABLE
 
+# Offer notifications for a seller are collected and mailed as one digest per window
+# by send_offer_digests (0 = send with the next scheduled run)
+OFFER_DIGEST_WINDOW_SECONDS = int(os.environ.get('OFFER_DIGEST_WINDOW_SECONDS', '600'))
+
+def record_offer_notification(transaction):
+    now = int(time.time())
+    window = OFFER_DIGEST_WINDOW_SECONDS
+    window_end = now if window <= 0 else (now // window + 1) * window
+    dynamodb.Table(outbox_table_name).put_item(Item={
+        'messageID': str(uuid.uuid4()),
+        'status': 'digest',
+        'digestRecipient': transaction['sellerID'],
+        'nextAttemptAt': window_end,
+        'ItemID': transaction['ItemID'],
+        'buyerID': transaction['buyerID'],
+        'price': transaction['price'],
+        'transactionDate': transaction['transactionDate'],
+        'createdAt': now
+    })
+
+@skip_warmup
+@accepts_http_api
 def lambda_handler(event, context):
     try:
         # Parse the request body
@@ -77,6 +106,12 @@ def lambda_handler(event, context):
         # If no such transaction exists, allow the transaction to be created
         transaction_table.put_item(Item=body)
         
+        # Queue the seller notification; a failure here must not fail the offer itself
+        try:
+            record_offer_notification(body)
+        except Exception as e:
+            print(f"Error recording offer notification: {str(e)}")
+        
         # Return success response
         return {
             "statusCode": 200,
@@ -1,17 +1,22 @@
 import boto3
 import json
 import logging
+from kashishop_common import config
+from kashishop_common.warmup import skip_warmup
+from kashishop_common.events import accepts_http_api
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+@skip_warmup
+@accepts_http_api(non_proxy=True)
 def lambda_handler(event, context):
     dynamodb = boto3.resource('dynamodb')
     
-    items_table = dynamodb.Table('Items')
-    users_table = dynamodb.Table('Users')
-    transactions_table = dynamodb.Table('TransactionHistory')
+    items_table = dynamodb.Table(config.ITEMS_TABLE)
+    users_table = dynamodb.Table(config.USERS_TABLE)
+    transactions_table = dynamodb.Table(config.TRANSACTIONS_TABLE)
 
     try:
         # Scan the Items table to count the total number of items
@@ -1,14 +1,17 @@
 import boto3
 import json
+from kashishop_common import config
+from kashishop_common.warmup import skip_warmup
 
 # Initialize the Cognito client
 cognito_client = boto3.client('cognito-idp', region_name='us-east-1')
 
 # User pool ID
-USER_POOL_ID = 'us-east-1_l8Fw4ESc3'
+USER_POOL_ID = config.USER_POOL_ID
 ADMINS_GROUP = 'Admins'
 
 
+@skip_warmup
 def lambda_handler(event, context):
     try:
         # Extract the identity of the caller
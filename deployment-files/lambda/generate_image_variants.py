@@ -0,0 +1,104 @@
+import boto3
+import io
+import json
+import re
+from urllib.parse import unquote_plus
+from PIL import Image, ImageOps
+from kashishop_common.warmup import skip_warmup
+from kashishop_common.images import SOURCE_PREFIXES, VARIANT_WIDTHS, variant_key
+
+# Triggered by s3:ObjectCreated:* on the item-images and profile-photos prefixes.
+# For every uploaded original it writes resized WebP + JPEG copies next to it:
+#   images/item-images/<name>.png -> images/item-images/<name>-320w.webp, <name>-320w.jpg, ...
+# Pillow is not part of the Lambda runtime and must be attached as a layer.
+
+s3 = boto3.client('s3')
+
+# Source prefixes, widths and variant keys are shared with the item read endpoints
+# (kashishop_common.images); every extension of its VARIANT_EXTENSIONS needs an entry here.
+# extension -> (Pillow format, Content-Type, save options)
+VARIANT_FORMATS = {
+    'webp': ('WEBP', 'image/webp', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', 'image/jpeg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+# Originals are content-addressed by upload_image.py, so their variants never change either
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Variants land under the same prefixes as originals, so the trigger fires for them too
+VARIANT_KEY_PATTERN = re.compile(r"-\d+w\.(webp|jpg)$")
+
+
+def is_source_key(key):
+    return key.startswith(SOURCE_PREFIXES) and not VARIANT_KEY_PATTERN.search(key)
+
+
+def render_variants(image_bytes):
+    """
+    Decode an original once and yield (width, ext, content_type, data) for every variant.
+
+    Originals narrower than a target width are not upscaled; that width is encoded
+    at the original size so the variant set is always complete.
+    """
+    with Image.open(io.BytesIO(image_bytes)) as original:
+        # Respect camera orientation before dropping EXIF metadata
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+
+        for width in VARIANT_WIDTHS:
+            if image.width > width:
+                height = max(1, round(image.height * width / image.width))
+                resized = image.resize((width, height), Image.LANCZOS)
+            else:
+                resized = image
+
+            for ext, (pil_format, content_type, save_options) in VARIANT_FORMATS.items():
+                buffer = io.BytesIO()
+                resized.save(buffer, pil_format, **save_options)
+                yield width, ext, content_type, buffer.getvalue()
+
+
+def process_object(bucket, key):
+    original = s3.get_object(Bucket=bucket, Key=key)
+    written = []
+    for width, ext, content_type, data in render_variants(original['Body'].read()):
+        target_key = variant_key(key, width, ext)
+        s3.put_object(
+            Bucket=bucket,
+            Key=target_key,
+            Body=data,
+            ContentType=content_type,
+            CacheControl=CACHE_CONTROL,
+            ACL="public-read"
+        )
+        written.append(target_key)
+    return written
+
+
+@skip_warmup
+def lambda_handler(event, context):
+    # S3 notifications arrive as Records; a manual backfill can pass {"bucket": ..., "keys": [...]}
+    targets = []
+    for record in event.get('Records', []):
+        targets.append((record['s3']['bucket']['name'], unquote_plus(record['s3']['object']['key'])))
+    for key in event.get('keys', []):
+        targets.append((event['bucket'], key))
+
+    processed = {}
+    failed = {}
+    for bucket, key in targets:
+        if not is_source_key(key):
+            print(f"Skipping {key}: not an original under {SOURCE_PREFIXES}")
+            continue
+        try:
+            processed[key] = process_object(bucket, key)
+            print(f"Generated {len(processed[key])} variants for {key}")
+        except Exception as e:
+            print(f"Error generating variants for {key}: {str(e)}")
+            failed[key] = str(e)
+
+    return {
+        'statusCode': 500 if failed else 200,
+        'body': json.dumps({'processed': processed, 'failed': failed})
+    }
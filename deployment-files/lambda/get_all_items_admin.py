@@ -1,16 +1,21 @@
 import boto3
 import json
 import logging
+from kashishop_common import config
+from kashishop_common.warmup import skip_warmup
+from kashishop_common.events import accepts_http_api
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+@skip_warmup
+@accepts_http_api(non_proxy=True)
 def lambda_handler(event, context):
     dynamodb = boto3.resource('dynamodb')
     
-    items_table_name = 'Items'
-    users_table_name = 'Users'
+    items_table_name = config.ITEMS_TABLE
+    users_table_name = config.USERS_TABLE
     items_table = dynamodb.Table(items_table_name)
     users_table = dynamodb.Table(users_table_name)
 
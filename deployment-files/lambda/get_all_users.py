@@ -1,10 +1,15 @@
 import boto3
 import json
+from kashishop_common import config
+from kashishop_common.warmup import skip_warmup
+from kashishop_common.events import accepts_http_api
 
+@skip_warmup
+@accepts_http_api(non_proxy=True)
 def lambda_handler(event, context):
     dynamodb = boto3.resource('dynamodb')
-    items_table = dynamodb.Table('Items')
-    users_table = dynamodb.Table('Users')
+    items_table = dynamodb.Table(config.ITEMS_TABLE)
+    users_table = dynamodb.Table(config.USERS_TABLE)
 
     cors_headers = {
         'Access-Control-Allow-Origin': '*',
@@ -1,13 +1,19 @@
 import boto3
 import json
+from kashishop_common import config
+from kashishop_common.warmup import skip_warmup
+from kashishop_common.events import accepts_http_api
+from kashishop_common.images import image_variants
 
 # Initialize DynamoDB client
 dynamodb = boto3.resource('dynamodb')
 
+@skip_warmup
+@accepts_http_api(non_proxy=True)
 def lambda_handler(event, context):
     # Table names
-    items_table_name = "Items"
-    users_table_name = "Users"
+    items_table_name = config.ITEMS_TABLE
+    users_table_name = config.USERS_TABLE
 
     # Access the DynamoDB tables
     items_table = dynamodb.Table(items_table_name)
@@ -41,6 +47,7 @@ def lambda_handler(event, context):
             # Convert all item properties to strings and add sellerUsername
             updated_item = {key: str(value) for key, value in item.items()}
             updated_item['sellerUsername'] = seller_username
+            updated_item['imageVariants'] = image_variants(updated_item.get('image'))
             updated_items.append(updated_item)
 
         # Sort items by 'itemID' as a string
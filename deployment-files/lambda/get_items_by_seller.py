@@ -1,6 +1,14 @@
 import boto3
 import json
+from kashishop_common.http import json_response
+from kashishop_common.pagination import query_all
+from kashishop_common import config
+from kashishop_common.warmup import skip_warmup
+from kashishop_common.events import accepts_http_api
+from kashishop_common.images import image_variants
 
+@skip_warmup
+@accepts_http_api(non_proxy=True)
 def lambda_handler(event, context):
     """
     Lambda function to query items in a DynamoDB table by seller ID.
@@ -17,7 +25,7 @@ def lambda_handler(event, context):
     
     # Extracting parameters from the query string
     try:
-        table_name = "Items"
+        table_name = config.ITEMS_TABLE
         seller_id = str(event['queryStringParameters']['sellerID'])
     except KeyError:
         return {
@@ -28,7 +36,9 @@ def lambda_handler(event, context):
     table = dynamodb.Table(table_name)
     
     try:
-        response = table.query(
+        # Sellers with many items span several pages
+        items = query_all(
+            table,
             IndexName='seller-creationDate-index',  # Adjust to match your DynamoDB table's GSI
             KeyConditionExpression='seller = :val1',
             ExpressionAttributeValues={
@@ -36,39 +46,19 @@ def lambda_handler(event, context):
             }
         )
         
-        for item in response.get('Items', []):
+        for item in items:
             item['itemID'] = str(item['itemID'])  # Convert itemID to string for JSON serialization
             item['seller'] = str(item['seller'])  # Convert seller to string for JSON serialization
             item['price'] = str(item['price'])  # Convert price to string for JSON serialization
+            item['imageVariants'] = image_variants(item.get('image'))
             
     except Exception as e:
-        return {
-            'statusCode': 500,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, Authorization'
-            },
-            'body': json.dumps({'error': str(e)}),
-        }
-        
-        
-                
+        return json_response(500, {'error': str(e)})
 
-    return {
-        'statusCode': 200,
-        'headers': {
-            'Content-Type': 'application/json',
-            'Access-Control-Allow-Origin': '*',
-            'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
-            'Access-Control-Allow-Headers': 'Content-Type, Authorization'
-        },
-        'body': json.dumps({
-            'items': response.get('Items', []),
-            'count': len(response.get('Items', []))
-        })
-    }
+    return json_response(200, {
+        'items': items,
+        'count': len(items)
+    })
 
 # def test_lambda_handler():
 #     # Mock event with query string parameters
@@ -1,10 +1,13 @@
 import boto3
 import json
+from kashishop_common.warmup import skip_warmup
+from kashishop_common.images import image_variants
 
 
 # Initialize DynamoDB client
 dynamodb = boto3.resource('dynamodb')
 
+@skip_warmup
 def lambda_handler(event, context):
     # Get the table name from environment variables
     table_name = event['queryStringParameters'].get('table_name')
@@ -39,6 +42,10 @@ def lambda_handler(event, context):
 
         # Slice the items to ensure the correct range is returned
         selected_items = items[:end_index - start_index]
+        # Any table can be read; only rows with an image get variant URLs
+        for item in selected_items:
+            if 'image' in item:
+                item['imageVariants'] = image_variants(item['image'])
 
         return {
             'statusCode': 200,
@@ -1,13 +1,18 @@
 import boto3
 from botocore.exceptions import ClientError
 import json
+from kashishop_common import config
+from kashishop_common.warmup import skip_warmup
+from kashishop_common.events import accepts_http_api
 
+@skip_warmup
+@accepts_http_api(non_proxy=True)
 def lambda_handler(event, context):
     # Initialize the DynamoDB client
     dynamodb = boto3.client('dynamodb')
 
     # Table and index names
-    table_name = 'TransactionHistory'
+    table_name = config.TRANSACTIONS_TABLE
     index_name = 'buyerID-index'
 
     # Validate input from query string parameters
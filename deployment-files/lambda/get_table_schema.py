@@ -21,12 +21,13 @@ def get_table_schema(table_name):
         print(f"Error getting table schema: {e}")
         return None
 
-# Example Usage:
-table_name = 'Items'
-table_schema = get_table_schema(table_name)
+if __name__ == '__main__':
+    # Example Usage:
+    table_name = 'Items'
+    table_schema = get_table_schema(table_name)
 
-if table_schema:
-    print("Table Schema:")
-    print(table_schema)
-else:
-    print(f"Table '{table_name}' not found.")
\ No newline at end of file
+    if table_schema:
+        print("Table Schema:")
+        print(table_schema)
+    else:
+        print(f"Table '{table_name}' not found.")
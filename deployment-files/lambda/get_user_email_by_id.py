@@ -1,10 +1,15 @@
 import boto3
 import json
+from kashishop_common import config
+from kashishop_common.warmup import skip_warmup
+from kashishop_common.events import accepts_http_api
 
+@skip_warmup
+@accepts_http_api(non_proxy=True)
 def lambda_handler(event, context):
     # Initialize the DynamoDB resource
     dynamodb = boto3.resource('dynamodb')
-    users_table = dynamodb.Table('Users')
+    users_table = dynamodb.Table(config.USERS_TABLE)
 
     # CORS headers
     cors_headers = {
@@ -1,12 +1,17 @@
 import boto3
 import json
+from kashishop_common import config
+from kashishop_common.warmup import skip_warmup
+from kashishop_common.events import accepts_http_api
 
+@skip_warmup
+@accepts_http_api(non_proxy=True)
 def lambda_handler(event, context):
     # Initialize DynamoDB resource and table references
     dynamodb = boto3.resource('dynamodb')
-    transactions_table = dynamodb.Table('TransactionHistory')
-    items_table = dynamodb.Table('Items')
-    users_table = dynamodb.Table('Users')
+    transactions_table = dynamodb.Table(config.TRANSACTIONS_TABLE)
+    items_table = dynamodb.Table(config.ITEMS_TABLE)
+    users_table = dynamodb.Table(config.USERS_TABLE)
 
     # CORS headers
     cors_headers = {
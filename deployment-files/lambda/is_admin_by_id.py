@@ -1,16 +1,21 @@
 import boto3
 import json
+from kashishop_common import config
+from kashishop_common.warmup import skip_warmup
+from kashishop_common.events import accepts_http_api
 
 # Initialize DynamoDB and Cognito clients
 dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
 cognito_client = boto3.client('cognito-idp', region_name='us-east-1')
 
 # Configuration
-USERS_TABLE_NAME = 'Users'
+USERS_TABLE_NAME = config.USERS_TABLE
 USER_ID_INDEX = 'userID-index'
-USER_POOL_ID = 'us-east-1_l8Fw4ESc3'
+USER_POOL_ID = config.USER_POOL_ID
 ADMINS_GROUP = 'Admins'
 
+@skip_warmup
+@accepts_http_api(non_proxy=True)
 def lambda_handler(event, context):
     try:
         # Extract userID from the query string parameters
@@ -35,9 +35,10 @@ def stringify_json(json_obj):
     
     return json.dumps(json_obj)
 
-json1 = """{
+if __name__ == '__main__':
+    json1 = """{
   "imageName": "test-image.jpg",
   "imageBase64": "bW9jayBpbWFnZSBkYXRh",
   "destinationFolder": "images/item-images"
   }"""
-print(json.dumps(json1))
\ No newline at end of file
+    print(json.dumps(json1))
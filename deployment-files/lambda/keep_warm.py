@@ -0,0 +1,48 @@
+import boto3
+import json
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor
+from kashishop_common.warmup import WARMUP_KEY
+
+# Scheduled by scripts/configure-keep-warm.py. The rule's input lists the functions to keep
+# warm and how many containers each needs (keepWarm in lambda/functions.yaml):
+#   {"targets": [{"function": "dev-get_items", "qualifier": "live", "concurrency": 3}, ...]}
+# Every container gets its own synchronous ping, all sent at once so they overlap; handlers
+# recognize the ping (kashishop_common.warmup) and return without doing any work.
+
+MAX_PARALLEL_PINGS = 50
+
+lambda_client = boto3.client('lambda', config=Config(max_pool_connections=MAX_PARALLEL_PINGS))
+
+
+def ping(target):
+    invoke_args = {
+        'FunctionName': target['function'],
+        'InvocationType': 'RequestResponse',
+        'Payload': json.dumps({WARMUP_KEY: {'concurrency': target['concurrency']}})
+    }
+    if target.get('qualifier'):
+        invoke_args['Qualifier'] = target['qualifier']
+    try:
+        response = lambda_client.invoke(**invoke_args)
+        return response.get('FunctionError')
+    except Exception as e:
+        return str(e)
+
+
+def lambda_handler(event, context):
+    targets = event.get('targets', [])
+    pings = [target for target in targets for _ in range(target['concurrency'])]
+    if not pings:
+        return {'pinged': 0, 'errors': {}}
+
+    with ThreadPoolExecutor(max_workers=min(MAX_PARALLEL_PINGS, len(pings))) as executor:
+        results = list(executor.map(ping, pings))
+
+    errors = {}
+    for target, error in zip(pings, results):
+        if error:
+            errors.setdefault(target['function'], error)
+    for function_name, error in errors.items():
+        print(f"Keep-warm ping to {function_name} failed: {error}")
+    return {'pinged': len(pings), 'errors': errors}
@@ -1,16 +1,19 @@
 import boto3
 import json
 from datetime import datetime
+from kashishop_common import config
+from kashishop_common.warmup import skip_warmup
 
 # Initialize DynamoDB resource
 dynamodb = boto3.resource('dynamodb')
 
 # Specify your DynamoDB table name
-USER_TABLE = "Users"
+USER_TABLE = config.USERS_TABLE
 
 # Reference to the DynamoDB table
 user_table = dynamodb.Table(USER_TABLE)
 
+@skip_warmup
 def lambda_handler(event, context):
     # Extract user details from the Cognito event
     username = event['userName']  # Unique identifier for the user
@@ -28,7 +31,7 @@ def lambda_handler(event, context):
         'name': user_attributes.get('name', 'Unknown'),
         'phone_number': user_attributes.get('phone_number', 'Unknown'),
         'address': user_attributes.get('address', 'Unknown'),
-        'picture': user_attributes.get('picture', 'https://kashishop2.s3.us-east-1.amazonaws.com/images/profile-photos/default-user.png'),
+        'picture': user_attributes.get('picture', f'https://{config.BUCKET_NAME}.s3.us-east-1.amazonaws.com/images/profile-photos/default-user.png'),
         'creationDate': creation_date,  # Add the current creation date in the desired format
         'isActive': 'true'
     }
@@ -1,51 +1,321 @@
 import os
 import smtplib
 import json
+import random
+import time
+import uuid
+import boto3
+from boto3.dynamodb.conditions import Key
+from boto3.dynamodb.types import TypeDeserializer
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from kashishop_common import config
+from kashishop_common.warmup import skip_warmup
+from kashishop_common.events import accepts_http_api
 
-def lambda_handler(event, context):
-    # Gmail SMTP server details
-    smtp_server = "smtp.gmail.com"
-    smtp_port = 587
+# API requests only enqueue into the outbox table; the same function drains it when
+# invoked by the table's stream (new messages) or by the scheduled sweep (retries)
+dynamodb = boto3.resource('dynamodb')
+outbox_table_name = config.MAIL_OUTBOX_TABLE
+OUTBOX_DUE_INDEX = "status-nextAttemptAt-index"
 
-    # Sender email credentials (use environment variables for security)
-    sender_email = os.environ['GMAIL_ADDRESS']
-    sender_password = os.environ['GMAIL_PASSWORD']
+# A claimed message stays invisible to other consumers for this long (like an SQS visibility timeout)
+OUTBOX_LEASE_SECONDS = 60
+OUTBOX_MAX_ATTEMPTS = 6
+OUTBOX_RETRY_BASE_SECONDS = float(os.environ.get('OUTBOX_RETRY_BASE_SECONDS', '30'))
+OUTBOX_RETRY_MAX_SECONDS = 3600
+OUTBOX_SWEEP_LIMIT = 100
+# Messages that exhausted their retries are kept this long for inspection (table TTL)
+OUTBOX_FAILED_RETENTION_SECONDS = 14 * 24 * 3600
 
-    body = json.loads(event.get('body'))
+# Gmail SMTP server details (overridable for a local SMTP stand-in)
+SMTP_SERVER = os.environ.get('SMTP_HOST', 'smtp.gmail.com')
+SMTP_PORT = int(os.environ.get('SMTP_PORT', '587'))
+SMTP_STARTTLS = os.environ.get('SMTP_STARTTLS', 'true').lower() == 'true'
+
+# Sessions idle longer than this are checked with NOOP before reuse
+# (Gmail closes idle connections after a few minutes)
+SESSION_PING_AFTER = 30
+SMTP_TIMEOUT = 10
+
+
+class SmtpSessionPool:
+    """
+    Authenticated SMTP sessions kept alive across warm invocations.
+
+    Connecting, STARTTLS and LOGIN cost several round trips, so sessions are
+    returned to the pool after use and only rebuilt when the server has
+    dropped them.
+    """
+
+    def __init__(self, max_idle_sessions=2):
+        self.max_idle_sessions = max_idle_sessions
+        self._idle = []  # (session, last_used)
+
+    def _connect(self):
+        server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=SMTP_TIMEOUT)
+        if SMTP_STARTTLS:
+            server.starttls()  # Upgrade the connection to secure
+        server.login(os.environ['GMAIL_ADDRESS'], os.environ['GMAIL_PASSWORD'])
+        return server
+
+    @staticmethod
+    def _is_alive(server):
+        try:
+            return server.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    @staticmethod
+    def _close(server):
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+    def acquire(self):
+        while self._idle:
+            server, last_used = self._idle.pop()
+            if time.monotonic() - last_used < SESSION_PING_AFTER or self._is_alive(server):
+                return server
+            self._close(server)
+        return self._connect()
+
+    def release(self, server):
+        if len(self._idle) < self.max_idle_sessions:
+            self._idle.append((server, time.monotonic()))
+        else:
+            self._close(server)
 
-    # Email content
-    recipient_email = body.get('recipient_email')
-    subject = body.get('subject')
-    body = body.get('mail_body')
+    def discard(self, server):
+        self._close(server)
 
-    # Create email
+    def send(self, sender, recipient, message):
+        """Send one message, replacing the session once if the server dropped it."""
+        for attempt in range(2):
+            server = self.acquire()
+            try:
+                server.sendmail(sender, recipient, message)
+            except (smtplib.SMTPServerDisconnected, ConnectionError):
+                self.discard(server)
+                if attempt:
+                    raise
+                continue
+            except smtplib.SMTPException:
+                # The session itself is still usable (e.g. a refused recipient)
+                self.release(server)
+                raise
+            self.release(server)
+            return
+
+
+# Module scope, so the authenticated session survives between warm invocations
+smtp_pool = SmtpSessionPool()
+
+
+def build_message(sender_email, recipient_email, subject, mail_body):
     message = MIMEMultipart()
     message['From'] = sender_email
     message['To'] = recipient_email
     message['Subject'] = subject
-    message.attach(MIMEText(body, 'plain'))
+    message.attach(MIMEText(mail_body, 'plain'))
+    return message.as_string()
 
-    try:
-        # Connect to the Gmail SMTP server
-        server = smtplib.SMTP(smtp_server, smtp_port)
-        server.starttls()  # Upgrade the connection to secure
-        server.login(sender_email, sender_password)  # Log in to Gmail
-        server.sendmail(sender_email, recipient_email, message.as_string())  # Send email
-        server.quit()  # Close the connection
 
+class DynamoOutbox:
+    """
+    Outbox storage on the MailOutbox table.
+
+    Messages are due when nextAttemptAt <= now. Claiming pushes nextAttemptAt
+    forward by the lease with a conditional update, so a message picked up by
+    both the stream consumer and the sweep is only sent once, and a consumer
+    that dies mid-send releases it when the lease runs out.
+    """
+
+    def __init__(self, table_name):
+        self.table = dynamodb.Table(table_name)
+
+    def enqueue(self, message):
+        self.table.put_item(Item=message)
+
+    def due(self, now, limit):
+        response = self.table.query(
+            IndexName=OUTBOX_DUE_INDEX,
+            KeyConditionExpression=Key('status').eq('pending') & Key('nextAttemptAt').lte(now),
+            Limit=limit
+        )
+        return response.get('Items', [])
+
+    def claim(self, message, now):
+        try:
+            self.table.update_item(
+                Key={'messageID': message['messageID']},
+                UpdateExpression="SET nextAttemptAt = :lease",
+                ConditionExpression="#s = :pending AND nextAttemptAt <= :now AND attempts = :attempts",
+                ExpressionAttributeNames={'#s': 'status'},
+                ExpressionAttributeValues={
+                    ':lease': now + OUTBOX_LEASE_SECONDS,
+                    ':pending': 'pending',
+                    ':now': now,
+                    ':attempts': message['attempts']
+                }
+            )
+            return True
+        except self.table.meta.client.exceptions.ConditionalCheckFailedException:
+            return False
+
+    def complete(self, message):
+        self.table.delete_item(Key={'messageID': message['messageID']})
+
+    def reschedule(self, message, recipients, next_attempt_at, error):
+        self.table.update_item(
+            Key={'messageID': message['messageID']},
+            UpdateExpression="SET recipient_email = :r, attempts = attempts + :one, nextAttemptAt = :next, lastError = :e",
+            ExpressionAttributeValues={
+                ':r': recipients,
+                ':one': 1,
+                ':next': next_attempt_at,
+                ':e': error
+            }
+        )
+
+    def fail(self, message, recipients, error, expires_at):
+        self.table.update_item(
+            Key={'messageID': message['messageID']},
+            UpdateExpression="SET #s = :failed, recipient_email = :r, attempts = attempts + :one, lastError = :e, expiresAt = :exp",
+            ExpressionAttributeNames={'#s': 'status'},
+            ExpressionAttributeValues={
+                ':failed': 'failed',
+                ':r': recipients,
+                ':one': 1,
+                ':e': error,
+                ':exp': expires_at
+            }
+        )
+
+
+outbox = DynamoOutbox(outbox_table_name)
+deserializer = TypeDeserializer()
+
+
+def send_to_recipients(recipients, subject, mail_body):
+    """Send one message per recipient over the pooled session; returns (sent, failed)."""
+    sender_email = os.environ['GMAIL_ADDRESS']
+    sent = []
+    failed = {}
+    for recipient_email in recipients:
+        try:
+            smtp_pool.send(sender_email, recipient_email,
+                           build_message(sender_email, recipient_email, subject, mail_body))
+            sent.append(recipient_email)
+        except Exception as e:
+            failed[recipient_email] = str(e)
+    return sent, failed
+
+
+def retry_delay(attempts):
+    # Exponential backoff with full jitter
+    return random.uniform(0, min(OUTBOX_RETRY_MAX_SECONDS, OUTBOX_RETRY_BASE_SECONDS * 2 ** attempts))
+
+
+def deliver(messages):
+    """Claim and send a batch of outbox messages; returns a summary count per outcome."""
+    summary = {'sent': 0, 'retried': 0, 'failed': 0, 'skipped': 0}
+    for message in messages:
+        now = int(time.time())
+        # Offer-digest entries share the table; send_offer_digests turns them into messages
+        if message.get('status') != 'pending' or not outbox.claim(message, now):
+            summary['skipped'] += 1
+            continue
+
+        _, failed = send_to_recipients(message['recipient_email'], message['subject'], message['mail_body'])
+        if not failed:
+            outbox.complete(message)
+            summary['sent'] += 1
+            continue
+
+        attempts = int(message['attempts']) + 1
+        error = json.dumps(failed)
+        if attempts >= OUTBOX_MAX_ATTEMPTS:
+            print(f"Giving up on message {message['messageID']} after {attempts} attempts: {error}")
+            outbox.fail(message, list(failed), error, now + OUTBOX_FAILED_RETENTION_SECONDS)
+            summary['failed'] += 1
+        else:
+            # Only the recipients that failed are retried
+            outbox.reschedule(message, list(failed), now + int(retry_delay(attempts)), error)
+            summary['retried'] += 1
+    return summary
+
+
+def enqueue_request(event):
+    body = json.loads(event.get('body'))
+
+    # Email content; recipient_email may be a single address or a list
+    recipients = body.get('recipient_email')
+    if isinstance(recipients, str):
+        recipients = [recipients]
+
+    if not recipients or not body.get('subject') or body.get('mail_body') is None:
         return {
-            'statusCode': 200,
+            'statusCode': 400,
             'headers': {
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Headers': 'Content-Type',
                 'Access-Control-Allow-Methods': 'OPTIONS,POST'
             },
-            'body': json.dumps({
-                'message': f"Email sent successfully to {recipient_email}"
-            })
+            'body': json.dumps({'message': 'recipient_email, subject and mail_body are required'})
         }
+
+    now = int(time.time())
+    message = {
+        'messageID': str(uuid.uuid4()),
+        'recipient_email': recipients,
+        'subject': body['subject'],
+        'mail_body': body['mail_body'],
+        'status': 'pending',
+        'attempts': 0,
+        'createdAt': now,
+        'nextAttemptAt': now
+    }
+    # The only work on the request path: one write
+    outbox.enqueue(message)
+
+    return {
+        'statusCode': 202,
+        'headers': {
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Headers': 'Content-Type',
+            'Access-Control-Allow-Methods': 'OPTIONS,POST'
+        },
+        'body': json.dumps({
+            'message': f"Email to {', '.join(recipients)} queued for delivery",
+            'messageID': message['messageID']
+        })
+    }
+
+
+@skip_warmup
+@accepts_http_api
+def lambda_handler(event, context):
+    # DynamoDB stream batch: deliver newly inserted messages right away
+    if event.get('Records'):
+        messages = [
+            {k: deserializer.deserialize(v) for k, v in record['dynamodb']['NewImage'].items()}
+            for record in event['Records']
+            if record.get('eventName') == 'INSERT'
+        ]
+        summary = deliver(messages)
+        print(f"Outbox stream batch: {summary}")
+        return summary
+
+    # Scheduled sweep: retries whose backoff has elapsed and messages whose lease expired
+    if event.get('source') == 'aws.events':
+        summary = deliver(outbox.due(int(time.time()), OUTBOX_SWEEP_LIMIT))
+        print(f"Outbox sweep: {summary}")
+        return summary
+
+    try:
+        return enqueue_request(event)
     except Exception as e:
         return {
             'statusCode': 500,
@@ -55,7 +325,7 @@ def lambda_handler(event, context):
                 'Access-Control-Allow-Methods': 'OPTIONS,POST'
             },
             'body': json.dumps({
-                'message': f"Failed to send email: {str(e)}",
+                'message': f"Failed to queue email: {str(e)}",
                 'event': event
             })
         }
@@ -0,0 +1,141 @@
+import boto3
+import json
+import time
+from string import Template
+from boto3.dynamodb.conditions import Key
+from kashishop_common import config
+from kashishop_common.warmup import skip_warmup
+
+# Scheduled batch job: turns the offer notifications recorded by add_transaction
+# (MailOutbox entries with status "digest") into one email per seller per window.
+# The digest itself is queued as a regular outbox message, so delivery, retries and
+# SMTP session reuse stay in send_mail.
+
+dynamodb = boto3.resource('dynamodb')
+outbox_table_name = config.MAIL_OUTBOX_TABLE
+users_table_name = config.USERS_TABLE
+items_table_name = config.ITEMS_TABLE
+OUTBOX_DUE_INDEX = "status-nextAttemptAt-index"
+
+# Compiled once per container, rendered once per recipient
+DIGEST_SUBJECT = Template("You have $count new offer$plural on Kashishop!")
+DIGEST_BODY = Template(
+    "Hi $username,\n\n"
+    "You received $count new offer$plural for your items:\n\n"
+    "$lines\n\n"
+    "Please check your offers in your profile.\n"
+)
+DIGEST_LINE = Template("  • $item_name: offered $$$price on $date")
+
+outbox_table = dynamodb.Table(outbox_table_name)
+users_table = dynamodb.Table(users_table_name)
+
+
+def due_digest_entries(now):
+    entries = []
+    query_args = {
+        'IndexName': OUTBOX_DUE_INDEX,
+        'KeyConditionExpression': Key('status').eq('digest') & Key('nextAttemptAt').lte(now)
+    }
+    while True:
+        response = outbox_table.query(**query_args)
+        entries.extend(response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            return entries
+        query_args['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def item_names(item_ids):
+    # BatchGetItem accepts up to 100 keys per request
+    names = {}
+    item_ids = list(item_ids)
+    for i in range(0, len(item_ids), 100):
+        request = {items_table_name: {
+            'Keys': [{'itemID': item_id} for item_id in item_ids[i:i + 100]],
+            'ProjectionExpression': 'itemID, item_name'
+        }}
+        while request:
+            response = dynamodb.batch_get_item(RequestItems=request)
+            for item in response['Responses'].get(items_table_name, []):
+                names[item['itemID']] = item.get('item_name', 'your item')
+            request = response.get('UnprocessedKeys')
+    return names
+
+
+def find_user(user_id):
+    response = users_table.query(
+        IndexName="userID-index",
+        KeyConditionExpression=Key('userID').eq(user_id)
+    )
+    items = response.get('Items', [])
+    return items[0] if items else None
+
+
+def render_digest(user, entries, names):
+    count = len(entries)
+    plural = '' if count == 1 else 's'
+    lines = "\n".join(
+        DIGEST_LINE.substitute(
+            item_name=names.get(entry['ItemID'], 'your item'),
+            price=entry.get('price', '?'),
+            date=entry.get('transactionDate', '')
+        )
+        for entry in sorted(entries, key=lambda e: e.get('transactionDate', ''))
+    )
+    subject = DIGEST_SUBJECT.substitute(count=count, plural=plural)
+    body = DIGEST_BODY.substitute(username=user.get('username', ''), count=count, plural=plural, lines=lines)
+    return subject, body
+
+
+@skip_warmup
+def lambda_handler(event, context):
+    now = int(time.time())
+    entries = due_digest_entries(now)
+
+    by_recipient = {}
+    for entry in entries:
+        by_recipient.setdefault(entry['digestRecipient'], []).append(entry)
+    names = item_names({entry['ItemID'] for entry in entries})
+
+    queued = 0
+    duplicates = 0
+    skipped = 0
+    for recipient_id, recipient_entries in by_recipient.items():
+        user = find_user(recipient_id)
+        if user and user.get('email'):
+            subject, body = render_digest(user, recipient_entries, names)
+            window_end = max(int(entry['nextAttemptAt']) for entry in recipient_entries)
+            try:
+                # Deterministic ID: a rerun after a partial failure doesn't queue the digest twice
+                outbox_table.put_item(
+                    Item={
+                        'messageID': f"digest-{recipient_id}-{window_end}",
+                        'recipient_email': [user['email']],
+                        'subject': subject,
+                        'mail_body': body,
+                        'status': 'pending',
+                        'attempts': 0,
+                        'createdAt': now,
+                        'nextAttemptAt': now
+                    },
+                    ConditionExpression='attribute_not_exists(messageID)'
+                )
+                queued += 1
+            except outbox_table.meta.client.exceptions.ConditionalCheckFailedException:
+                # Queued by an earlier run that failed before deleting the entries
+                duplicates += 1
+        else:
+            print(f"No email found for user {recipient_id}; dropping {len(recipient_entries)} offer notifications")
+            skipped += 1
+
+        with outbox_table.batch_writer() as batch:
+            for entry in recipient_entries:
+                batch.delete_item(Key={'messageID': entry['messageID']})
+
+    summary = {'notifications': len(entries), 'digestsQueued': queued, 'digestsAlreadyQueued': duplicates,
+               'recipientsSkipped': skipped}
+    print(f"Offer digests: {summary}")
+    return {
+        'statusCode': 200,
+        'body': json.dumps(summary)
+    }
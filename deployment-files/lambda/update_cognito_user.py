@@ -1,9 +1,14 @@
 import boto3
 from botocore.exceptions import BotoCoreError, ClientError
 import json
+from kashishop_common import config
+from kashishop_common.warmup import skip_warmup
+from kashishop_common.events import accepts_http_api
 
+@skip_warmup
+@accepts_http_api(non_proxy=True)
 def lambda_handler(event, context):
-    user_pool_id = 'us-east-1_l8Fw4ESc3'  # Replace with your User Pool ID
+    user_pool_id = config.USER_POOL_ID
 
     # Extract userID from query string parameters
     user_id = event.get('queryStringParameters', {}).get('userID')
@@ -36,7 +41,7 @@ def lambda_handler(event, context):
     try:
         # Fetch the username from the DynamoDB Users table using the userID-index
         response = dynamodb_client.query(
-            TableName='Users',
+            TableName=config.USERS_TABLE,
             IndexName='userID-index',
             KeyConditionExpression='userID = :userID',
             ExpressionAttributeValues={
@@ -74,7 +79,7 @@ def lambda_handler(event, context):
         expression_attribute_values = {f":val_{i}": {'S': value} for i, value in enumerate(attributes.values())}
 
         dynamodb_client.update_item(
-            TableName='Users',
+            TableName=config.USERS_TABLE,
             Key={'username': {'S': username}},
             UpdateExpression=dynamodb_update_expression,
             ExpressionAttributeNames=expression_attribute_names,
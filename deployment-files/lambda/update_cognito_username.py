@@ -1,9 +1,12 @@
 import boto3
 from botocore.exceptions import BotoCoreError, ClientError
 import json
+from kashishop_common import config
+from kashishop_common.warmup import skip_warmup
 
+@skip_warmup
 def lambda_handler(event, context):
-    user_pool_id = 'us-east-1_dhjcBYrYa'  # Replace with your User Pool ID
+    user_pool_id = config.USER_POOL_ID
 
     # Extract old and new usernames from the request body
     try:
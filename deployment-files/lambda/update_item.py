@@ -1,9 +1,12 @@
 import json
 import boto3
 from botocore.exceptions import ClientError
+from kashishop_common import config
+from kashishop_common.warmup import skip_warmup
 
 dynamodb = boto3.resource('dynamodb')
 
+@skip_warmup
 def lambda_handler(event, context):
     try:
         # Get the itemID from the query string parameters
@@ -15,7 +18,7 @@ def lambda_handler(event, context):
             }
 
         # Get the DynamoDB table
-        table = dynamodb.Table('Items')
+        table = dynamodb.Table(config.ITEMS_TABLE)
 
         # Check if the item exists
         try:
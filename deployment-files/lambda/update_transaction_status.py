@@ -2,12 +2,17 @@ import boto3
 import json
 from botocore.exceptions import ClientError
 from boto3.dynamodb.conditions import Attr
+from kashishop_common import config
+from kashishop_common.warmup import skip_warmup
+from kashishop_common.events import accepts_http_api
 
+@skip_warmup
+@accepts_http_api
 def lambda_handler(event, context):
     # Initialize DynamoDB resources
     dynamodb = boto3.resource('dynamodb')
-    transactions_table = dynamodb.Table('TransactionHistory')
-    items_table = dynamodb.Table('Items')
+    transactions_table = dynamodb.Table(config.TRANSACTIONS_TABLE)
+    items_table = dynamodb.Table(config.ITEMS_TABLE)
 
     try:
         # Parse the request body
@@ -1,28 +1,19 @@
 import boto3
 import json
 from boto3.dynamodb.conditions import Attr
+from kashishop_common import config
+from kashishop_common.warmup import skip_warmup
 
 # Initialize AWS resources
 dynamodb = boto3.resource('dynamodb')
-users_table = dynamodb.Table('Users')
+users_table = dynamodb.Table(config.USERS_TABLE)
 cognito_client = boto3.client('cognito-idp')
 
-USER_POOL_ID = 'us-east-1_dhjcBYrYa'
+USER_POOL_ID = config.USER_POOL_ID
 
+@skip_warmup
 def lambda_handler(event, context):
-    # Handle preflight CORS requests
-    if event['httpMethod'] == 'OPTIONS':
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, Authorization',
-            },
-            'body': json.dumps({'message': 'CORS preflight successful'}),
-        }
-    
+    # Preflight requests are answered by API Gateway and never reach the function
     try:
         # Parse input data
         body = json.loads(event['body'])
@@ -95,17 +86,18 @@ def lambda_handler(event, context):
         }
         
         
-# Mock event for testing the lambda function
-test_event = {
-    'httpMethod': 'POST',
-    'body': json.dumps({
-        'email': 'test@example.com',
-        'phone_number': '+1234567890',
-        'photo_url': 'https://example.com/photo.jpg',
-        'userID': '0408e418-e061-7026-a190-dfd66d5734dc'
-    })
-}
+if __name__ == '__main__':
+    # Mock event for testing the lambda function
+    test_event = {
+        'httpMethod': 'POST',
+        'body': json.dumps({
+            'email': 'test@example.com',
+            'phone_number': '+1234567890',
+            'photo_url': 'https://example.com/photo.jpg',
+            'userID': '0408e418-e061-7026-a190-dfd66d5734dc'
+        })
+    }
 
-# Call the lambda handler with mock event
-response = lambda_handler(test_event, None)
-print(response)
\ No newline at end of file
+    # Call the lambda handler with mock event
+    response = lambda_handler(test_event, None)
+    print(response)
@@ -1,43 +1,170 @@
 import boto3
 import base64
+import hashlib
 import json
 import mimetypes
+import re
+from botocore.exceptions import ClientError
+from kashishop_common import config
+from kashishop_common.warmup import skip_warmup
+from kashishop_common.events import accepts_http_api
 
 s3 = boto3.client('s3')
 
+# Keys are derived from the content hash, so an object never changes once written
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# S3 multipart parts must be at least 5 MB (except the last one)
+PART_SIZE = 5 * 1024 * 1024
+# Base64 characters decoded per step; a multiple of 4 so every slice decodes on its own
+DECODE_CHUNK_CHARS = 256 * 1024
+
+IMAGE_FIELD_PATTERN = re.compile(r'"imageBase64"\s*:\s*"')
+
+# Image types stored and the key extension of each; anything else is stored as image/jpeg (.jpg).
+# The extension is never taken from imageName itself, so the client can't put '/', '..' or '?'
+# into the key, and .jpeg/.jpg uploads of the same bytes share one object
+KEY_EXTENSIONS = {'image/jpeg': 'jpg', 'image/png': 'png', 'image/gif': 'gif', 'image/webp': 'webp'}
+
 def get_content_type(image_name):
     # Use mimetypes library to guess the MIME type based on the file extension
     mime_type, _ = mimetypes.guess_type(image_name)
-    if not mime_type:
-        # Default to image/jpeg if MIME type can't be guessed
+    if mime_type not in KEY_EXTENSIONS:
+        # Default to image/jpeg if MIME type can't be guessed or isn't an image type we store
         mime_type = "image/jpeg"
     return mime_type
 
+def content_addressed_key(destination_folder, digest, content_type):
+    # <folder>/<2 hex chars>/<sha256>.<ext>: the hash fan-out spreads writes and reads
+    # of a hot folder over 256 prefixes, each with its own S3 request-rate budget
+    extension = KEY_EXTENSIONS.get(content_type, 'jpg')
+    return f"{destination_folder}/{digest[:2]}/{digest}.{extension}"
+
+def hash_decoded(chunks):
+    digest = hashlib.sha256()
+    for data in chunks:
+        digest.update(data)
+    return digest.hexdigest()
+
+def object_exists(bucket, key):
+    try:
+        s3.head_object(Bucket=bucket, Key=key)
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+            return False
+        raise
+
+def split_image_field(raw_body):
+    """
+    Parse the request body without copying the base64 payload.
+
+    Returns the remaining fields plus the (start, end) span of the imageBase64
+    value inside raw_body. json.loads on the full body would materialize a second
+    copy of the (largest) string, so the value is cut out before parsing.
+    """
+    match = IMAGE_FIELD_PATTERN.search(raw_body)
+    if not match:
+        return json.loads(raw_body), None
+    start = match.end()
+    end = raw_body.index('"', start)
+    fields = json.loads(raw_body[:start] + raw_body[end:])
+    return fields, (start, end)
+
+def iter_decoded_chunks(raw_body, span):
+    # Decode a bounded slice at a time instead of the whole string at once
+    start, end = span
+    for pos in range(start, end, DECODE_CHUNK_CHARS):
+        yield base64.b64decode(raw_body[pos:min(pos + DECODE_CHUNK_CHARS, end)], validate=True)
+
+def upload_stream(bucket, key, chunks, content_type):
+    """
+    Upload decoded chunks holding at most one part in memory.
+
+    Images smaller than one part go out as a single put_object; larger ones
+    use a multipart upload, which is aborted if any part fails.
+    """
+    pending = []
+    pending_size = 0
+    upload_id = None
+    parts = []
+
+    try:
+        for data in chunks:
+            pending.append(data)
+            pending_size += len(data)
+            if pending_size < PART_SIZE:
+                continue
+
+            if upload_id is None:
+                upload_id = s3.create_multipart_upload(
+                    Bucket=bucket,
+                    Key=key,
+                    ContentType=content_type,
+                    CacheControl=CACHE_CONTROL,
+                    ACL="public-read"
+                )['UploadId']
+            part_number = len(parts) + 1
+            response = s3.upload_part(
+                Bucket=bucket,
+                Key=key,
+                UploadId=upload_id,
+                PartNumber=part_number,
+                Body=b"".join(pending)
+            )
+            parts.append({'ETag': response['ETag'], 'PartNumber': part_number})
+            pending = []
+            pending_size = 0
+
+        if upload_id is None:
+            # Small image: a single request is cheaper than a multipart upload
+            s3.put_object(
+                Bucket=bucket,
+                Key=key,
+                Body=b"".join(pending),
+                ContentType=content_type,
+                CacheControl=CACHE_CONTROL,
+                ACL="public-read"  # Make the object publicly readable
+            )
+            return
+
+        if pending:
+            part_number = len(parts) + 1
+            response = s3.upload_part(
+                Bucket=bucket,
+                Key=key,
+                UploadId=upload_id,
+                PartNumber=part_number,
+                Body=b"".join(pending)
+            )
+            parts.append({'ETag': response['ETag'], 'PartNumber': part_number})
+
+        s3.complete_multipart_upload(
+            Bucket=bucket,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={'Parts': parts}
+        )
+    except Exception:
+        if upload_id is not None:
+            s3.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+        raise
+
+@skip_warmup
+@accepts_http_api
 def lambda_handler(event, context):
-    BUCKET_NAME = "kashishop2"  # Corrected bucket name
-    
-    # Handle OPTIONS preflight request
-    if event.get('httpMethod') == 'OPTIONS':
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'POST, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type',
-                'Access-Control-Allow-Credentials': 'true',
-            },
-            'body': json.dumps({'message': 'CORS preflight request successful'})
-        }
-    
+    BUCKET_NAME = config.BUCKET_NAME
+
+    # Preflight requests are answered by API Gateway and never reach the function
     try:
-        # Parse the body from JSON string to dictionary
-        body = json.loads(event['body']) if isinstance(event['body'], str) else event['body']
+        # Parse the body, leaving the base64 image in place inside the raw string
+        raw_body = event['body'] if isinstance(event['body'], str) else json.dumps(event['body'])
+        body, image_span = split_image_field(raw_body)
         
         image_name = body.get('imageName')
-        image_base64 = body.get('imageBase64')
         destination_folder = body.get('destinationFolder')
         
-        if not image_name or not image_base64 or not destination_folder:
+        if not image_name or not image_span or image_span[0] == image_span[1] or not destination_folder:
             return {
                 "statusCode": 400,
                 "headers": {
@@ -49,19 +176,17 @@ def lambda_handler(event, context):
                 "body": json.dumps({"error": "imageName, imageBase64, and destinationFolder are required"})
             }
         
-        # Decode the base64 image data
-        image_data = base64.b64decode(image_base64)
         content_type = get_content_type(image_name)
-        object_key = f"{destination_folder}/{image_name}"
         
-        # Upload the image to S3
-        s3.put_object(
-            Bucket=BUCKET_NAME,
-            Key=object_key,
-            Body=image_data,
-            ContentType=content_type,
-            ACL="public-read"  # Make the object publicly readable
-        )
+        # First pass: hash the decoded bytes to get the content-addressed key
+        digest = hash_decoded(iter_decoded_chunks(raw_body, image_span))
+        object_key = content_addressed_key(destination_folder, digest, content_type)
+        
+        # Second pass: decode and upload chunk by chunk, unless identical bytes are already stored
+        if object_exists(BUCKET_NAME, object_key):
+            print(f"Image already stored, skipping upload: {object_key}")
+        else:
+            upload_stream(BUCKET_NAME, object_key, iter_decoded_chunks(raw_body, image_span), content_type)
         
         # Generate the public URL
         image_url = f"https://{BUCKET_NAME}.s3.amazonaws.com/{object_key}"
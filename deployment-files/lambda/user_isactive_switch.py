@@ -1,9 +1,14 @@
 import boto3
 import json
+from kashishop_common import config
+from kashishop_common.warmup import skip_warmup
+from kashishop_common.events import accepts_http_api
 
+@skip_warmup
+@accepts_http_api
 def lambda_handler(event, context):
     dynamodb = boto3.resource('dynamodb')
-    table_name = 'Users'
+    table_name = config.USERS_TABLE
     table = dynamodb.Table(table_name)
 
     cors_headers = {
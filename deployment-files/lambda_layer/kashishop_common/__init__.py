@@ -0,0 +1,4 @@
+# Shared runtime code for the Kashishop Lambda functions.
+# deploy-lambda.py publishes this directory as the <EnvPrefix>-kashishop-common layer
+# (unpacked under /opt/python, which is on the Lambda Python path) and attaches it to
+# every function, so handlers can simply `from kashishop_common.http import json_response`.
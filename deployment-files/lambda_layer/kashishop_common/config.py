@@ -0,0 +1,24 @@
+import os
+import re
+
+# Names of the resources of the current environment. deploy-lambda.py sets these as
+# Lambda environment variables, so the same artifact runs under any EnvPrefix.
+# The defaults are the unprefixed names, for running handlers locally.
+
+
+def table_env_var(base_name):
+    """Environment variable holding a table name, e.g. TransactionHistory -> TRANSACTION_HISTORY_TABLE."""
+    return re.sub(r'(?<!^)(?=[A-Z])', '_', base_name).upper() + '_TABLE'
+
+
+def table_name(base_name):
+    return os.environ.get(table_env_var(base_name), base_name)
+
+
+ITEMS_TABLE = table_name('Items')
+TRANSACTIONS_TABLE = table_name('TransactionHistory')
+USERS_TABLE = table_name('Users')
+MAIL_OUTBOX_TABLE = table_name('MailOutbox')
+
+USER_POOL_ID = os.environ.get('USER_POOL_ID', '')
+BUCKET_NAME = os.environ.get('BUCKET_NAME', 'kashishop2')
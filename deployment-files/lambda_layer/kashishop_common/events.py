@@ -0,0 +1,95 @@
+import base64
+import functools
+import json
+
+from kashishop_common.http import DecimalEncoder
+
+# The API is served either by the REST API (api-gateway-template.yaml) or by the HTTP API
+# (apigw_to_cf.py --http-api), which sends Lambda proxy events in payload format 2.0.
+# Handlers wrapped in @accepts_http_api see the REST shape either way: a 2.0 event is
+# rewritten to the fields the REST API passes, and for handlers the REST API calls through a
+# non-proxy integration the response keeps the shape clients of that integration receive.
+
+HTTP_API_VERSION = '2.0'
+
+
+def is_http_api(event):
+    return isinstance(event, dict) and event.get('version') == HTTP_API_VERSION and 'routeKey' in event
+
+
+def request_body(event):
+    """The request body of a 2.0 event as text."""
+    body = event.get('body')
+    if body is not None and event.get('isBase64Encoded'):
+        body = base64.b64decode(body).decode('utf-8')
+    return body
+
+
+def to_rest_event(event, non_proxy=False):
+    """
+    REST API view of a payload format 2.0 event.
+
+    Args:
+        event (dict): HTTP API event.
+        non_proxy (bool): Build what the REST API's request templates pass instead: the query
+            string parameters and the parsed JSON body.
+
+    Returns:
+        dict: The event in the REST API's shape.
+    """
+    context = event.get('requestContext') or {}
+    method = (context.get('http') or {}).get('method')
+    resource = event['routeKey'].split(' ', 1)[-1]
+    body = request_body(event)
+    if non_proxy:
+        rest_event = {'queryStringParameters': event.get('queryStringParameters') or {}}
+        if body:
+            rest_event['body'] = json.loads(body)
+        return rest_event
+
+    headers = dict(event.get('headers') or {})
+    if event.get('cookies'):
+        headers['cookie'] = '; '.join(event['cookies'])
+    rest_context = {**context, 'httpMethod': method, 'resourcePath': resource}
+    claims = ((context.get('authorizer') or {}).get('jwt') or {}).get('claims')
+    if claims is not None:
+        rest_context['authorizer'] = {'claims': claims}
+    return {
+        'resource': resource,
+        'path': event.get('rawPath'),
+        'httpMethod': method,
+        'headers': headers,
+        'queryStringParameters': event.get('queryStringParameters'),
+        'pathParameters': event.get('pathParameters'),
+        'stageVariables': event.get('stageVariables'),
+        'requestContext': rest_context,
+        'body': body,
+        'isBase64Encoded': False
+    }
+
+
+def accepts_http_api(handler=None, *, non_proxy=False):
+    """
+    Let a REST API handler serve HTTP API (payload format 2.0) events too.
+
+    Args:
+        non_proxy (bool): The REST API calls the handler through a non-proxy integration, whose
+            clients receive the returned dict itself as the JSON body. The HTTP API's proxy
+            integration would unwrap it, so it is sent back wrapped in a 200 response.
+    """
+    if handler is None:
+        return functools.partial(accepts_http_api, non_proxy=non_proxy)
+
+    @functools.wraps(handler)
+    def wrapper(event, context):
+        if not is_http_api(event):
+            return handler(event, context)
+        result = handler(to_rest_event(event, non_proxy), context)
+        if not non_proxy:
+            return result
+        return {
+            'statusCode': 200,
+            'headers': {'Content-Type': 'application/json'},
+            'body': json.dumps(result, cls=DecimalEncoder)
+        }
+    return wrapper
@@ -0,0 +1,39 @@
+import json
+from decimal import Decimal
+
+CORS_HEADERS = {
+    'Content-Type': 'application/json',
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
+    'Access-Control-Allow-Headers': 'Content-Type, Authorization'
+}
+
+
+class DecimalEncoder(json.JSONEncoder):
+    """Encodes DynamoDB numbers (Decimal) as int or float and sets as lists."""
+
+    def default(self, o):
+        if isinstance(o, Decimal):
+            return int(o) if o == o.to_integral_value() else float(o)
+        if isinstance(o, (set, frozenset)):
+            return sorted(o)
+        return super().default(o)
+
+
+def json_response(status_code, body, headers=None):
+    """
+    Build an API Gateway proxy response with the standard CORS headers.
+
+    Args:
+        status_code (int): HTTP status code.
+        body: Any JSON-serializable value; Decimals and sets are handled.
+        headers (dict): Extra or overriding headers.
+
+    Returns:
+        dict: statusCode, headers and the JSON-encoded body.
+    """
+    return {
+        'statusCode': status_code,
+        'headers': {**CORS_HEADERS, **(headers or {})},
+        'body': json.dumps(body, cls=DecimalEncoder)
+    }
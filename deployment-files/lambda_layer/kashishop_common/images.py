@@ -0,0 +1,26 @@
+import posixpath
+
+# Resized copies of uploaded images: generate_image_variants.py writes them, the item
+# read endpoints return their URLs. Both sides name them with variant_key.
+
+# Folders of the originals that get variants
+SOURCE_PREFIXES = ('images/item-images/', 'images/profile-photos/')
+VARIANT_WIDTHS = (160, 320, 640, 1024)
+VARIANT_EXTENSIONS = ('webp', 'jpg')
+
+
+def variant_key(original, width, ext):
+    """Key (or URL) of one variant: images/a/<name>.png -> images/a/<name>-320w.webp."""
+    # Only the file name's extension: a dot in a folder name is not one
+    stem = posixpath.splitext(original)[0]
+    return f"{stem}-{width}w.{ext}"
+
+
+def image_variants(image_url):
+    """Variant URLs of an uploaded image by format and width, or {} for images without variants."""
+    if not image_url or not any(f"/{prefix}" in image_url for prefix in SOURCE_PREFIXES):
+        return {}
+    return {
+        ext: {str(width): variant_key(image_url, width, ext) for width in VARIANT_WIDTHS}
+        for ext in VARIANT_EXTENSIONS
+    }
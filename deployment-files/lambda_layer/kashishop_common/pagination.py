@@ -0,0 +1,20 @@
+def query_all(table, **kwargs):
+    """Run a DynamoDB query and follow LastEvaluatedKey until every page is read."""
+    items = []
+    while True:
+        response = table.query(**kwargs)
+        items.extend(response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            return items
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def scan_all(table, **kwargs):
+    """Run a DynamoDB scan and follow LastEvaluatedKey until every page is read."""
+    items = []
+    while True:
+        response = table.scan(**kwargs)
+        items.extend(response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            return items
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
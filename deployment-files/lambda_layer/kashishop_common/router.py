@@ -0,0 +1,82 @@
+import functools
+import importlib
+import json
+import os
+
+import boto3
+
+from kashishop_common.http import json_response
+from kashishop_common.warmup import skip_warmup
+
+# Entry point of the single router function (deploy-lambda.py --monolith). Its zip carries
+# every API handler as handlers/<name>.py and routes.json, which maps "<METHOD> <resource>"
+# to a handler; apigw_to_cf.py --router-function points every API method (or HTTP API
+# route) at it. Events are passed on unchanged; handlers adapt HTTP API events themselves.
+#
+# Handlers are imported on their first request, so a cold start only pays for the route it
+# serves. boto3.client()/boto3.resource() calls with just a service name return one shared
+# instance, so handlers that create clients at import (or on every request) reuse the
+# container's clients and their connection pools.
+
+ROUTES_FILE = 'routes.json'
+HANDLER_PACKAGE = 'handlers'
+
+_shared = {}
+
+
+def _shared_factory(factory):
+    @functools.wraps(factory)
+    def shared(*args, **kwargs):
+        if kwargs or len(args) != 1:
+            return factory(*args, **kwargs)
+        key = (factory.__name__, args[0])
+        if key not in _shared:
+            _shared[key] = factory(args[0])
+        return _shared[key]
+    return shared
+
+
+boto3.client = _shared_factory(boto3.client)
+boto3.resource = _shared_factory(boto3.resource)
+
+
+def load_routes():
+    task_root = os.environ.get('LAMBDA_TASK_ROOT', os.getcwd())
+    with open(os.path.join(task_root, ROUTES_FILE)) as f:
+        return json.load(f)
+
+
+ROUTES = load_routes()
+_handlers = {}
+
+
+def route_key(event):
+    """
+    "<METHOD> <resource>" of an API Gateway event.
+
+    Proxy integrations carry httpMethod and resource; for the others apigw_to_cf.py adds
+    both to the request template in router mode. HTTP API events (payload format 2.0) name
+    the route in routeKey.
+    """
+    if event.get('routeKey'):
+        return event['routeKey']
+    context = event.get('requestContext') or {}
+    method = event.get('httpMethod') or context.get('httpMethod')
+    resource = event.get('resource') or context.get('resourcePath')
+    return f"{method} {resource}"
+
+
+def handler_for(name):
+    if name not in _handlers:
+        _handlers[name] = importlib.import_module(f"{HANDLER_PACKAGE}.{name}").lambda_handler
+    return _handlers[name]
+
+
+@skip_warmup
+def lambda_handler(event, context):
+    key = route_key(event)
+    name = ROUTES.get(key)
+    if name is None:
+        print(f"No route for {key}")
+        return json_response(404, {'message': f"No handler for {key}"})
+    return handler_for(name)(event, context)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+import argparse
+import importlib.util
+import io
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from PIL import Image
+
+# Local throughput benchmark for lambda/generate_image_variants.py
+# 1. Generates (or reads) a batch of sample originals
+# 2. Stores them in a directory-backed S3 stand-in
+# 3. Replays S3 ObjectCreated events through the handler and reports images/sec
+# Usage: python3 scripts/bench-image-variants.py [--count 50] [--size 3024x4032] [--images DIR]
+
+
+class LocalS3:
+    """Minimal stand-in for the boto3 S3 client backed by a local directory."""
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def _path(self, bucket, key):
+        return self.root / bucket / key
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        path = self._path(Bucket, Key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(Body if isinstance(Body, bytes) else Body.read())
+        return {}
+
+    def get_object(self, Bucket, Key):
+        return {'Body': io.BytesIO(self._path(Bucket, Key).read_bytes())}
+
+
+def load_handler_module():
+    script_dir = Path(__file__).parent
+    # The shared layer is on the path in Lambda (/opt/python); mirror that locally
+    sys.path.insert(0, str((script_dir / '..' / 'lambda_layer').resolve()))
+    handler_path = (script_dir / '..' / 'lambda' / 'generate_image_variants.py').resolve()
+    spec = importlib.util.spec_from_file_location('generate_image_variants', handler_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def sample_image(width, height):
+    # Noise + gradient, so encoders can't trivially compress it away
+    image = Image.effect_noise((width, height), random.randint(20, 80)).convert('RGB')
+    overlay = Image.linear_gradient('L').resize((width, height)).convert('RGB')
+    return Image.blend(image, overlay, 0.5)
+
+
+def s3_event(bucket, key):
+    return {'Records': [{'s3': {'bucket': {'name': bucket}, 'object': {'key': key}}}]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark image variant generation against a local S3 stand-in')
+    parser.add_argument('--count', type=int, default=20, help='Number of generated sample images')
+    parser.add_argument('--size', default='3024x4032', help='Generated image size, WIDTHxHEIGHT')
+    parser.add_argument('--images', help='Directory of real sample images to use instead of generated ones')
+    args = parser.parse_args()
+
+    module = load_handler_module()
+    bucket = 'bench-kashishop2'
+
+    with tempfile.TemporaryDirectory() as tmp:
+        module.s3 = LocalS3(tmp)
+
+        keys = []
+        if args.images:
+            for path in sorted(Path(args.images).iterdir()):
+                if path.suffix.lower() in ('.jpg', '.jpeg', '.png', '.webp'):
+                    key = f"images/item-images/{path.name}"
+                    module.s3.put_object(Bucket=bucket, Key=key, Body=path.read_bytes())
+                    keys.append(key)
+        else:
+            width, height = (int(v) for v in args.size.lower().split('x'))
+            for i in range(args.count):
+                buffer = io.BytesIO()
+                sample_image(width, height).save(buffer, 'JPEG', quality=92)
+                key = f"images/item-images/sample-{i:04d}.jpg"
+                module.s3.put_object(Bucket=bucket, Key=key, Body=buffer.getvalue())
+                keys.append(key)
+
+        if not keys:
+            print("❌ No sample images found.", file=sys.stderr)
+            sys.exit(1)
+
+        input_bytes = sum((Path(tmp) / bucket / key).stat().st_size for key in keys)
+        print(f"Processing {len(keys)} originals ({input_bytes / 1e6:.1f} MB)...", file=sys.stderr)
+
+        start = time.perf_counter()
+        for key in keys:
+            result = module.lambda_handler(s3_event(bucket, key), None)
+            if result['statusCode'] != 200:
+                print(f"❌ {key}: {json.loads(result['body'])['failed']}", file=sys.stderr)
+                sys.exit(1)
+        elapsed = time.perf_counter() - start
+
+        variants = [p for p in (Path(tmp) / bucket).rglob('*') if module.VARIANT_KEY_PATTERN.search(p.name)]
+        output_bytes = sum(p.stat().st_size for p in variants)
+
+    print(f"  • Variants written: {len(variants)} ({output_bytes / 1e6:.1f} MB)", file=sys.stderr)
+    print(f"  • Elapsed:          {elapsed:.2f}s", file=sys.stderr)
+    print(f"  • Throughput:       {len(keys) / elapsed:.2f} images/s, "
+          f"{len(variants) / elapsed:.2f} variants/s", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+import argparse
+import importlib.util
+import io
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import zipfile
+from pathlib import Path
+
+# Artifact size and init duration of the Lambda packaging
+# "source" is the zip deploy-lambda.py used to build (the raw .py file), "precompiled" is
+# `deploy-lambda.py --precompile`: local test code stripped and .pyc files compiled by --python.
+# Every artifact is unpacked next to the shared layer (built the same way), like /var/task and
+# /opt in Lambda, and fresh interpreters time `import lambda_function` with bytecode writing
+# disabled: both directories are read-only in Lambda, so nothing compiled by one cold start is
+# reused by the next. boto3 is imported before the timer starts, since the runtime ships it
+# precompiled. The interpreter needs boto3 (PYTHONPATH is passed through).
+# Usage: python3 scripts/bench-package-init.py [get_items ...] [--python python3.13] [--runs 5]
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+MEASURE_INIT = (
+    "import time\n"
+    "import boto3\n"
+    "started = time.perf_counter()\n"
+    "import lambda_function\n"
+    "print(time.perf_counter() - started)\n"
+)
+
+
+def load_deploy_lambda():
+    spec = importlib.util.spec_from_file_location('deploy_lambda', SCRIPT_DIR / 'deploy-lambda.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def unpack(zip_bytes, target):
+    with zipfile.ZipFile(io.BytesIO(zip_bytes)) as z:
+        z.extractall(target)
+
+
+def benchmark_environment(task_dir, opt_dir):
+    # Both unpacked directories on the path, like /var/task and /opt/python in Lambda
+    python_path = [str(task_dir), str(Path(opt_dir) / 'python')] + \
+        ([os.environ['PYTHONPATH']] if os.environ.get('PYTHONPATH') else [])
+    return dict(os.environ, PYTHONPATH=os.pathsep.join(python_path), PYTHONDONTWRITEBYTECODE='1',
+                AWS_DEFAULT_REGION=os.environ.get('AWS_DEFAULT_REGION', 'us-east-1'))
+
+
+def measure_init(python, function_zip, layer_zip, runs):
+    """Median seconds to import the handler in a fresh interpreter, or the import error."""
+    with tempfile.TemporaryDirectory() as tmp:
+        task_dir, opt_dir = Path(tmp, 'task'), Path(tmp, 'opt')
+        unpack(function_zip, task_dir)
+        if layer_zip:
+            unpack(layer_zip, opt_dir)
+        env = benchmark_environment(task_dir, opt_dir)
+        samples = []
+        for _ in range(runs):
+            result = subprocess.run([python, '-c', MEASURE_INIT], cwd=task_dir, env=env, capture_output=True,
+                                    text=True)
+            if result.returncode != 0:
+                return None, (result.stderr.strip().splitlines() or ['failed'])[-1]
+            samples.append(float(result.stdout.strip()))
+    return statistics.median(samples), None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare artifact size and init duration of the Lambda packaging')
+    parser.add_argument('functions', nargs='*', help='Handlers to measure (default: all)')
+    parser.add_argument('--python', default='python3.13', help='Interpreter of the Lambda runtime version')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters per artifact')
+    args = parser.parse_args()
+
+    deploy_lambda = load_deploy_lambda()
+    try:
+        compiler = deploy_lambda.Precompiler(args.python)
+    except RuntimeError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+
+    root = SCRIPT_DIR.parent
+    paths = sorted((root / 'lambda').glob('*.py'))
+    if args.functions:
+        paths = [path for path in paths if path.stem in args.functions]
+    layer_dir = root / deploy_lambda.LAYER_DIR_NAME
+    layers = {
+        'source': deploy_lambda.zip_lambda_code(deploy_lambda.layer_files(layer_dir)),
+        'precompiled': deploy_lambda.build_layer(layer_dir, compiler)
+    }
+
+    print(f"{'Function':<32}{'Source':>10}{'Precompiled':>13}{'Init source':>13}{'Init precompiled':>18}",
+          file=sys.stderr)
+    totals = {'source': [], 'precompiled': []}
+    for path in paths:
+        source = path.read_bytes()
+        artifacts = {
+            'source': deploy_lambda.zip_lambda_code({'lambda_function.py': source}),
+            'precompiled': deploy_lambda.package_function(source, compiler)
+        }
+        inits = {}
+        for mode, zip_bytes in artifacts.items():
+            inits[mode], error = measure_init(args.python, zip_bytes, layers[mode], args.runs)
+            if error:
+                print(f"  ⚠️ {path.stem} ({mode}): {error}", file=sys.stderr)
+        if all(inits.values()):
+            for mode in totals:
+                totals[mode].append(inits[mode])
+        init_text = {mode: f"{value * 1000:.1f} ms" if value else 'n/a' for mode, value in inits.items()}
+        sizes = {mode: len(zip_bytes) / 1024 for mode, zip_bytes in artifacts.items()}
+        print(f"{path.stem:<32}{sizes['source']:>7.1f} KB{sizes['precompiled']:>10.1f} KB"
+              f"{init_text['source']:>13}{init_text['precompiled']:>18}", file=sys.stderr)
+
+    print(f"Layer: {len(layers['source']) / 1024:.1f} KB source, "
+          f"{len(layers['precompiled']) / 1024:.1f} KB precompiled", file=sys.stderr)
+    if totals['source']:
+        before, after = statistics.median(totals['source']), statistics.median(totals['precompiled'])
+        print(f"✅ Median handler init: {before * 1000:.1f} ms → {after * 1000:.1f} ms "
+              f"({(after / before - 1) * 100:+.0f}%) across {len(totals['source'])} functions", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+import argparse
+import importlib.util
+import json
+import math
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+# Cold starts of one function per route vs. the single router (deploy-lambda.py --monolith)
+# 1. Measures init: the import of each handler in a fresh interpreter, and for the router its
+#    own import plus the first import of each handler inside an already running router
+#    (where handlers share boto3 clients)
+# 2. Replays a traffic mix, either a trace (--trace: JSON lines {"time": <seconds>, "route":
+#    "GET /Items"}, e.g. from API Gateway access logs) or sessions generated from the pages in
+#    router-traffic-mix.json at the rates in --profile
+# 3. Simulates Lambda's containers for both layouts: a request takes an idle container of its
+#    function or starts a new one; containers idle for --idle-minutes are recycled
+# 4. Reports cold-start rates and the init time requests waited for
+# Usage: python3 scripts/bench-router-cold-starts.py [--profile 10:2,10:30,10:2] [--trace <file>]
+#                                                    [--idle-minutes 10] [--python python3.13]
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+ROUTER_INIT = (
+    "import importlib, json, sys, time\n"
+    "import boto3\n"
+    "started = time.perf_counter()\n"
+    "import lambda_function\n"
+    "timings = {'router': time.perf_counter() - started}\n"
+    "for name in sys.argv[1:]:\n"
+    "    started = time.perf_counter()\n"
+    "    importlib.import_module('handlers.' + name)\n"
+    "    timings[name] = time.perf_counter() - started\n"
+    "print(json.dumps(timings))\n"
+)
+
+
+def load_script(file_name, module_name):
+    # The scripts have dashes in their names, so they can't be imported directly
+    spec = importlib.util.spec_from_file_location(module_name, SCRIPT_DIR / file_name)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+deploy_lambda = load_script('deploy-lambda.py', 'deploy_lambda')
+bench_init = load_script('bench-package-init.py', 'bench_package_init')
+
+
+def measure_router(python, router_zip, layer_zip, handler_names, runs):
+    """Median seconds of the router's own import and of each handler's first import inside it."""
+    samples = []
+    with tempfile.TemporaryDirectory() as tmp:
+        task_dir = Path(tmp, 'task')
+        bench_init.unpack(router_zip, task_dir)
+        bench_init.unpack(layer_zip, Path(tmp, 'opt'))
+        env = bench_init.benchmark_environment(task_dir, Path(tmp, 'opt'))
+        for run in range(runs):
+            # Rotate the order: the first handler imported in a container creates the shared clients
+            order = handler_names[run % len(handler_names):] + handler_names[:run % len(handler_names)]
+            result = subprocess.run([python, '-c', ROUTER_INIT, *order], cwd=task_dir, env=env,
+                                    capture_output=True, text=True)
+            if result.returncode != 0:
+                raise RuntimeError(f"router import failed: {(result.stderr.strip().splitlines() or ['?'])[-1]}")
+            samples.append(json.loads(result.stdout))
+    return {key: statistics.median(sample[key] for sample in samples) for key in samples[0]}
+
+
+def generate_trace(mix, profile, pages_per_session, think_seconds, rng):
+    """Requests of sessions arriving at the rates of profile [(minutes, sessions per minute), ...]."""
+    pages = list(mix['pages'].values())
+    weights = [page['weight'] for page in pages]
+    requests = []
+    segment_start = 0.0
+    for minutes, rate in profile:
+        t = segment_start
+        end = segment_start + minutes * 60
+        while rate > 0:
+            t += rng.expovariate(rate / 60)
+            if t >= end:
+                break
+            page_time = t
+            for _ in range(max(1, round(rng.expovariate(1 / pages_per_session)))):
+                page = rng.choices(pages, weights)[0]
+                requests.extend((page_time + rng.uniform(0, 0.05), route) for route in page['calls'])
+                action_time = page_time + rng.uniform(3, 15)
+                for route in page.get('actions', []):
+                    requests.append((action_time, route))
+                    action_time += 1
+                page_time = action_time + rng.expovariate(1 / think_seconds)
+        segment_start = end
+    return sorted(requests)
+
+
+def load_trace(path):
+    with open(path) as f:
+        return sorted((float(entry['time']), entry['route']) for entry in map(json.loads, f) if entry.strip())
+
+
+def simulate(trace, routes, function_of, container_init, handler_init, duration, idle_seconds):
+    """
+    Replay the trace against Lambda-like containers.
+
+    routes maps a route to its handler and function_of a handler to the function serving it.
+    A new container costs container_init; a container that hasn't run a handler yet costs
+    handler_init(handler) on top (the import, lazy in the router).
+
+    Returns:
+        dict: request count, new containers, handler first imports and the init seconds per request.
+    """
+    pools = {}
+    stats = {'requests': 0, 'containers': 0, 'imports': 0, 'waits': []}
+    for t, route in trace:
+        handler = routes[route]
+        pool = pools.setdefault(function_of(handler), [])
+        # Recycle containers idle for longer than Lambda keeps them
+        pool[:] = [c for c in pool if c['free_at'] > t or t - c['free_at'] < idle_seconds]
+        idle = [c for c in pool if c['free_at'] <= t]
+        wait = 0.0
+        if idle:
+            container = max(idle, key=lambda c: c['free_at'])
+        else:
+            container = {'free_at': t, 'loaded': set()}
+            pool.append(container)
+            stats['containers'] += 1
+            wait += container_init
+        if handler not in container['loaded']:
+            container['loaded'].add(handler)
+            if idle:
+                stats['imports'] += 1
+            wait += handler_init(handler)
+        container['free_at'] = t + wait + duration
+        stats['requests'] += 1
+        stats['waits'].append(wait)
+    return stats
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1)] if ordered else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare cold starts of per-route functions and the single router')
+    parser.add_argument('--trace', default=None, help='JSON lines {"time": seconds, "route": "GET /Items"} to replay')
+    parser.add_argument('--mix', default=str(SCRIPT_DIR / 'router-traffic-mix.json'), help='Pages and their calls')
+    parser.add_argument('--profile', default='10:2,10:30,10:2',
+                        help='minutes:sessions-per-minute segments, e.g. a quiet period, a ramp and back')
+    parser.add_argument('--pages-per-session', type=float, default=3, help='Mean pages per session')
+    parser.add_argument('--think-seconds', type=float, default=20, help='Mean time between pages')
+    parser.add_argument('--idle-minutes', type=float, default=10, help='How long an idle container is kept')
+    parser.add_argument('--runtime-init-ms', type=float, default=250,
+                        help='Container start before the handler import (runtime, boto3)')
+    parser.add_argument('--duration-ms', type=float, default=80, help='Warm duration of a request')
+    parser.add_argument('--python', default=deploy_lambda.RUNTIME, help='Interpreter used to time the imports')
+    parser.add_argument('--runs', type=int, default=3, help='Fresh interpreters per measurement')
+    parser.add_argument('--seed', type=int, default=1, help='Seed of the generated sessions')
+    args = parser.parse_args()
+
+    lambda_dir = SCRIPT_DIR.parent / 'lambda'
+    routes = deploy_lambda.load_routes()
+    if args.trace:
+        trace = load_trace(args.trace)
+    else:
+        mix = json.loads(Path(args.mix).read_text())
+        profile = [tuple(float(part) for part in segment.split(':')) for segment in args.profile.split(',')]
+        trace = generate_trace(mix, profile, args.pages_per_session, args.think_seconds, random.Random(args.seed))
+    unknown = sorted({route for _, route in trace} - set(routes))
+    if unknown:
+        print(f"❌ Routes not in the API template: {', '.join(unknown)}", file=sys.stderr)
+        sys.exit(1)
+
+    # 1) Init costs
+    handler_names = sorted({routes[route] for _, route in trace})
+    layer_dir = SCRIPT_DIR.parent / deploy_lambda.LAYER_DIR_NAME
+    layer_zip = deploy_lambda.zip_lambda_code(deploy_lambda.layer_files(layer_dir))
+    function_init = {}
+    for name in handler_names:
+        zip_bytes = deploy_lambda.zip_lambda_code({'lambda_function.py': (lambda_dir / f"{name}.py").read_bytes()})
+        function_init[name], error = bench_init.measure_init(args.python, zip_bytes, layer_zip, args.runs)
+        if error:
+            print(f"❌ {name}: {error}", file=sys.stderr)
+            sys.exit(1)
+    router_zip = deploy_lambda.package_router(
+        {name: (lambda_dir / f"{name}.py").read_bytes() for name in handler_names}, routes)
+    try:
+        router_init = measure_router(args.python, router_zip, layer_zip, handler_names, args.runs)
+    except RuntimeError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+
+    # 2) Replay
+    runtime = args.runtime_init_ms / 1000
+    duration = args.duration_ms / 1000
+    idle = args.idle_minutes * 60
+    results = {
+        'functions': simulate(trace, routes, lambda handler: handler, runtime, function_init.get, duration, idle),
+        'router': simulate(trace, routes, lambda handler: deploy_lambda.ROUTER_FUNCTION,
+                           runtime + router_init['router'], router_init.get, duration, idle)
+    }
+
+    print(f"{'Handler':<32}{'Own function':>14}{'In router':>12}", file=sys.stderr)
+    for name in handler_names:
+        print(f"{name:<32}{function_init[name] * 1000:>11.1f} ms{router_init[name] * 1000:>9.1f} ms", file=sys.stderr)
+    print(f"{'router itself':<32}{'':>14}{router_init['router'] * 1000:>9.1f} ms", file=sys.stderr)
+    print("----------------------------------------", file=sys.stderr)
+    print(f"{len(trace)} requests over {(trace[-1][0] - trace[0][0]) / 60 if trace else 0:.0f} min "
+          f"({'trace ' + args.trace if args.trace else 'profile ' + args.profile}), containers recycled after "
+          f"{args.idle_minutes:g} min idle", file=sys.stderr)
+    print(f"{'Layout':<12}{'Containers':>11}{'Cold starts':>13}{'Lazy imports':>14}{'p99 wait':>10}{'Max wait':>10}"
+          f"{'Init total':>12}", file=sys.stderr)
+    for layout, stats in results.items():
+        waits = stats['waits']
+        print(f"{layout:<12}{stats['containers']:>11}{stats['containers'] / max(1, stats['requests']) * 100:>12.2f}%"
+              f"{stats['imports']:>14}{percentile(waits, 0.99) * 1000:>7.0f} ms{max(waits, default=0) * 1000:>7.0f} ms"
+              f"{sum(waits):>10.1f} s", file=sys.stderr)
+    print("Cold starts: requests that started a container. Lazy imports: first request of a handler in a "
+          "running router container. Wait: init time a request waited for.", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
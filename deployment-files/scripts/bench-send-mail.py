@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+import argparse
+import importlib.util
+import os
+import smtplib
+import sys
+import time
+from pathlib import Path
+
+from local_smtp_server import LocalSmtpServer
+
+# Messages/sec for lambda/send_mail.py against the local SMTP stand-in:
+#   per-message: a fresh connection + login for every message (the old handler)
+#   pooled:      one warm-container session reused across outbox deliveries
+#   batch:       one delivery with a list of recipients
+# Usage: python3 scripts/bench-send-mail.py [--messages 200] [--rtt-ms 5]
+
+
+def load_handler_module():
+    script_dir = Path(__file__).parent
+    # The shared layer is on the path in Lambda (/opt/python); mirror that locally
+    sys.path.insert(0, str((script_dir / '..' / 'lambda_layer').resolve()))
+    handler_path = (script_dir / '..' / 'lambda' / 'send_mail.py').resolve()
+    spec = importlib.util.spec_from_file_location('send_mail', handler_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def per_message(module, count):
+    # Reproduces the original handler: connect, login, send, quit for each message
+    for i in range(count):
+        server = smtplib.SMTP(module.SMTP_SERVER, module.SMTP_PORT)
+        server.login(os.environ['GMAIL_ADDRESS'], os.environ['GMAIL_PASSWORD'])
+        recipient = f"buyer{i}@example.com"
+        server.sendmail(os.environ['GMAIL_ADDRESS'], recipient,
+                        module.build_message(os.environ['GMAIL_ADDRESS'], recipient, 'Offer', 'Body'))
+        server.quit()
+
+
+def pooled(module, count):
+    for i in range(count):
+        _, failed = module.send_to_recipients([f"buyer{i}@example.com"], 'Offer', 'Body')
+        assert not failed, failed
+
+
+def batch(module, count):
+    _, failed = module.send_to_recipients([f"buyer{i}@example.com" for i in range(count)], 'Offer', 'Body')
+    assert not failed, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark send_mail against a local SMTP stand-in')
+    parser.add_argument('--messages', type=int, default=200)
+    parser.add_argument('--rtt-ms', type=float, default=5, help='Simulated delay before every SMTP reply')
+    args = parser.parse_args()
+
+    smtp = LocalSmtpServer(rtt_ms=args.rtt_ms)
+    port = smtp.start()
+    os.environ.update({
+        'SMTP_HOST': '127.0.0.1',
+        'SMTP_PORT': str(port),
+        'SMTP_STARTTLS': 'false',
+        'GMAIL_ADDRESS': 'kashishop@example.com',
+        'GMAIL_PASSWORD': 'local',
+    })
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    module = load_handler_module()
+
+    print(f"{args.messages} messages, {args.rtt_ms} ms simulated RTT", file=sys.stderr)
+    for name, run in (('per-message', per_message), ('pooled', pooled), ('batch', batch)):
+        connections_before = smtp.connections
+        start = time.perf_counter()
+        run(module, args.messages)
+        elapsed = time.perf_counter() - start
+        print(f"  • {name:<12} {args.messages / elapsed:>8.1f} msg/s "
+              f"({smtp.connections - connections_before} connections)", file=sys.stderr)
+
+    # Dead-session replacement: the server drops the pooled connection between invocations
+    smtp.drop_connections()
+    module.SESSION_PING_AFTER = 0
+    connections_before = smtp.connections
+    pooled(module, 1)
+    print(f"  • server-side disconnect: session replaced "
+          f"({smtp.connections - connections_before} new connection)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+import argparse
+import base64
+import importlib.util
+import json
+import os
+import sys
+import tracemalloc
+from pathlib import Path
+
+from botocore.exceptions import ClientError
+
+# Peak-memory comparison for lambda/upload_image.py
+# "before" reproduces the original handler path (json.loads + b64decode + single put_object),
+# "after" runs the current streaming handler. Both use an S3 stand-in that keeps every
+# request body alive for the duration of the call, like botocore does while signing/sending.
+# Usage: python3 scripts/bench-upload-memory.py [--sizes 5 10 20]
+
+
+class CountingS3:
+    """Stand-in for the boto3 S3 client that only records how many bytes it was sent."""
+
+    def __init__(self):
+        self.bytes_received = 0
+
+    def _receive(self, Body):
+        self.bytes_received += len(Body)
+
+    def head_object(self, Bucket, Key):
+        # Nothing is ever stored, so dedup-on-write always proceeds to the upload
+        raise ClientError({'Error': {'Code': '404', 'Message': 'Not Found'}}, 'HeadObject')
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self._receive(Body)
+        return {}
+
+    def create_multipart_upload(self, Bucket, Key, **kwargs):
+        return {'UploadId': 'local-upload'}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self._receive(Body)
+        return {'ETag': f'"etag-{PartNumber}"'}
+
+    def complete_multipart_upload(self, **kwargs):
+        return {}
+
+    def abort_multipart_upload(self, **kwargs):
+        return {}
+
+
+def load_handler_module():
+    script_dir = Path(__file__).parent
+    # The shared layer is on the path in Lambda (/opt/python); mirror that locally
+    sys.path.insert(0, str((script_dir / '..' / 'lambda_layer').resolve()))
+    handler_path = (script_dir / '..' / 'lambda' / 'upload_image.py').resolve()
+    spec = importlib.util.spec_from_file_location('upload_image', handler_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def legacy_upload(s3, event):
+    # The pre-streaming handler body, kept verbatim for comparison
+    body = json.loads(event['body'])
+    image_data = base64.b64decode(body.get('imageBase64'))
+    s3.put_object(Bucket='kashishop2', Key=f"{body['destinationFolder']}/{body['imageName']}",
+                  Body=image_data, ContentType='image/jpeg', ACL='public-read')
+
+
+def measure(fn):
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline, _ = tracemalloc.get_traced_memory()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak - baseline
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure upload_image peak memory before/after streaming')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[5, 10, 20], help='Image sizes in MB')
+    args = parser.parse_args()
+
+    module = load_handler_module()
+
+    print(f"{'image':>8} {'event body':>11} {'before':>10} {'after':>10}")
+    for size_mb in args.sizes:
+        image_bytes = os.urandom(size_mb * 1024 * 1024)
+        event = {
+            'httpMethod': 'POST',
+            'body': json.dumps({
+                'imageName': 'bench.jpg',
+                'imageBase64': base64.b64encode(image_bytes).decode(),
+                'destinationFolder': 'images/item-images',
+            })
+        }
+        del image_bytes
+
+        legacy_s3 = CountingS3()
+        before = measure(lambda: legacy_upload(legacy_s3, event))
+
+        module.s3 = CountingS3()
+        after = measure(lambda: module.lambda_handler(event, None))
+        assert module.s3.bytes_received == legacy_s3.bytes_received, "streamed upload size mismatch"
+
+        body_mb = len(event['body']) / 1e6
+        print(f"{size_mb:>6}MB {body_mb:>9.1f}MB {before / 1e6:>8.1f}MB {after / 1e6:>8.1f}MB")
+
+    print("\n(peak is measured on top of the event body, which API Gateway hands to every invocation)")
+
+
+if __name__ == '__main__':
+    main()
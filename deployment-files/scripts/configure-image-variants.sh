@@ -0,0 +1,112 @@
+#!/usr/bin/env bash
+#
+# configure-image-variants.sh
+#
+# Usage: ./configure-image-variants.sh <ENV> [<PILLOW_LAYER_ARN>]
+#
+# Wires the <ENV>-generate_image_variants Lambda to the site bucket:
+#   1. Attaches the Pillow layer (if given); memory, timeout and architecture
+#      come from lambda/functions.yaml (applied by deploy-lambda.py)
+#   2. Allows S3 to invoke the function
+#   3. Registers s3:ObjectCreated:* notifications for the item-images and
+#      profile-photos prefixes, merged into the bucket's existing notification
+#      configuration (needs jq)
+#
+set -euo pipefail
+
+if [[ $# -lt 1 || $# -gt 2 ]]; then
+  echo "❌ Usage: $0 <ENV> [<PILLOW_LAYER_ARN>]"
+  exit 1
+fi
+
+ENV="$1"
+PILLOW_LAYER_ARN="${2:-${PILLOW_LAYER_ARN:-}}"
+REGION=$(aws configure get region 2>/dev/null || echo "us-east-1")
+ACCOUNT_ID=$(aws sts get-caller-identity --query Account --output text)
+S3_STACK_NAME="${ENV}-kashishop-s3"
+FUNCTION_NAME="${ENV}-generate_image_variants"
+
+BUCKET_NAME=$(aws cloudformation describe-stacks \
+  --stack-name "${S3_STACK_NAME}" \
+  --query "Stacks[0].Outputs[?OutputKey=='Kashishop2BucketName'].OutputValue | [0]" \
+  --output text --region "${REGION}")
+
+if [[ -z "${BUCKET_NAME}" || "${BUCKET_NAME}" == "None" ]]; then
+  echo "❌ Could not find Kashishop2BucketName in stack ${S3_STACK_NAME}."
+  exit 1
+fi
+
+FUNCTION_ARN=$(aws lambda get-function \
+  --function-name "${FUNCTION_NAME}" \
+  --query "Configuration.FunctionArn" \
+  --output text --region "${REGION}")
+
+# 1) Image decoding needs Pillow from a layer
+echo "⚙️  Configuring ${FUNCTION_NAME} (layers)..."
+if [[ -n "${PILLOW_LAYER_ARN}" ]]; then
+  # Keep the layers already attached (deploy-lambda.py adds ${ENV}-kashishop-common)
+  CURRENT_LAYERS=$(aws lambda get-function-configuration \
+    --function-name "${FUNCTION_NAME}" \
+    --query "Layers[].Arn" \
+    --output text --region "${REGION}")
+  LAYERS=("${PILLOW_LAYER_ARN}")
+  for LAYER in ${CURRENT_LAYERS}; do
+    if [[ "${LAYER}" != "None" && "${LAYER%:*}" != "${PILLOW_LAYER_ARN%:*}" ]]; then
+      LAYERS+=("${LAYER}")
+    fi
+  done
+  aws lambda update-function-configuration \
+    --function-name "${FUNCTION_NAME}" \
+    --layers "${LAYERS[@]}" \
+    --region "${REGION}" >/dev/null
+  aws lambda wait function-updated --function-name "${FUNCTION_NAME}" --region "${REGION}"
+else
+  echo "  • No Pillow layer given; make sure one is attached to ${FUNCTION_NAME}."
+fi
+
+# 2) Allow the bucket to invoke the function (ignore if the permission already exists)
+aws lambda add-permission \
+  --function-name "${FUNCTION_NAME}" \
+  --statement-id "s3-image-variants" \
+  --action "lambda:InvokeFunction" \
+  --principal s3.amazonaws.com \
+  --source-arn "arn:aws:s3:::${BUCKET_NAME}" \
+  --source-account "${ACCOUNT_ID}" \
+  --region "${REGION}" >/dev/null 2>&1 || true
+
+# 3) Register the notifications (variants are written under the same prefixes;
+#    the handler skips keys that are already variants). The put replaces the bucket's whole
+#    notification configuration, so ours are merged into the current one: entries with our
+#    Ids are replaced, everything else is kept.
+echo "🔔 Registering ObjectCreated notifications on s3://${BUCKET_NAME}..."
+VARIANT_CONFIGS=$(cat <<EOF
+[
+  {
+    "Id": "item-image-variants",
+    "LambdaFunctionArn": "${FUNCTION_ARN}",
+    "Events": ["s3:ObjectCreated:*"],
+    "Filter": {"Key": {"FilterRules": [{"Name": "prefix", "Value": "images/item-images/"}]}}
+  },
+  {
+    "Id": "profile-photo-variants",
+    "LambdaFunctionArn": "${FUNCTION_ARN}",
+    "Events": ["s3:ObjectCreated:*"],
+    "Filter": {"Key": {"FilterRules": [{"Name": "prefix", "Value": "images/profile-photos/"}]}}
+  }
+]
+EOF
+)
+CURRENT_CONFIG=$(aws s3api get-bucket-notification-configuration \
+  --bucket "${BUCKET_NAME}" \
+  --output json --region "${REGION}")
+# An empty configuration prints nothing
+NOTIFICATION_CONFIG=$(echo "${CURRENT_CONFIG:-"{}"}" | jq --argjson ours "${VARIANT_CONFIGS}" '
+  ($ours | map(.Id)) as $ids
+  | .LambdaFunctionConfigurations =
+      ([(.LambdaFunctionConfigurations // [])[] | select(.Id as $id | $ids | index($id) | not)] + $ours)')
+aws s3api put-bucket-notification-configuration \
+  --bucket "${BUCKET_NAME}" \
+  --notification-configuration "${NOTIFICATION_CONFIG}" \
+  --region "${REGION}"
+
+echo "✅ Image variant generation enabled for ${BUCKET_NAME}."
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+import argparse
+import importlib.util
+import json
+import sys
+from pathlib import Path
+
+import boto3
+
+# Schedules the keep-warm pings of one environment
+# 1. Reads keepWarm (and provisionedConcurrency) per function from lambda/functions.yaml
+# 2. Puts the EventBridge rule <ENV>-keep-warm, every 5 minutes, with the list of functions
+#    and containers as its input; the rule is disabled when no function asks for pings
+# 3. Lets the rule invoke <ENV>-keep_warm, which sends the pings
+# Functions with provisioned concurrency are pinged on their `live` alias, the one API
+# Gateway invokes. With --monolith (deploy-all.sh LAMBDA_MODE=router) the API only reaches
+# <ENV>-router, which gets the keepWarm of the handlers it serves (as in deploy-lambda.py --monolith).
+# Run after deploy-lambda.py; run again after changing keepWarm.
+# Usage: python3 scripts/configure-keep-warm.py <ENV> [--schedule "rate(5 minutes)"] [--monolith]
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+WARMER_FUNCTION = 'keep_warm'
+
+
+def load_deploy_lambda():
+    # deploy-lambda.py has a dash in its name, so it can't be imported directly
+    spec = importlib.util.spec_from_file_location('deploy_lambda', SCRIPT_DIR / 'deploy-lambda.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def warm_targets(env, function_settings, live_alias):
+    return [
+        {
+            'function': f"{env}-{name}",
+            'qualifier': live_alias if settings['provisionedConcurrency'] else None,
+            'concurrency': settings['keepWarm']
+        }
+        for name, settings in sorted(function_settings.items())
+        if settings['keepWarm'] and name != WARMER_FUNCTION
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Schedule keep-warm pings for the functions in lambda/functions.yaml')
+    parser.add_argument('env', help='EnvPrefix, e.g. dev')
+    parser.add_argument('--schedule', default='rate(5 minutes)', help='EventBridge schedule expression')
+    parser.add_argument('--region', default=None, help='AWS region')
+    parser.add_argument('--monolith', action='store_true',
+                        help='The API is served by <ENV>-router (deploy-lambda.py --monolith)')
+    args = parser.parse_args()
+
+    lambda_dir = Path.cwd() / 'lambda'
+    if not lambda_dir.is_dir():
+        print(f"❌ Directory '{lambda_dir}' not found. Run from repo root.", file=sys.stderr)
+        sys.exit(1)
+
+    deploy_lambda = load_deploy_lambda()
+    routes = deploy_lambda.load_routes() if args.monolith else None
+    targets = warm_targets(args.env, deploy_lambda.load_function_settings(lambda_dir, routes),
+                           deploy_lambda.LIVE_ALIAS)
+    rule_name = f"{args.env}-keep-warm"
+    warmer_name = f"{args.env}-{WARMER_FUNCTION}"
+    events = boto3.client('events', region_name=args.region)
+    lambda_client = boto3.client('lambda', region_name=args.region)
+
+    rule_arn = events.put_rule(Name=rule_name, ScheduleExpression=args.schedule,
+                               State='ENABLED' if targets else 'DISABLED',
+                               Description='Keep-warm pings for keepWarm in lambda/functions.yaml')['RuleArn']
+    if not targets:
+        print(f"  • No function has keepWarm set; {rule_name} is disabled", file=sys.stderr)
+        return
+
+    warmer_arn = lambda_client.get_function(FunctionName=warmer_name)['Configuration']['FunctionArn']
+    try:
+        lambda_client.add_permission(FunctionName=warmer_name, StatementId='keep-warm',
+                                     Action='lambda:InvokeFunction', Principal='events.amazonaws.com',
+                                     SourceArn=rule_arn)
+    except lambda_client.exceptions.ResourceConflictException:
+        pass  # Already allowed
+    events.put_targets(Rule=rule_name, Targets=[
+        {'Id': 'keep-warm', 'Arn': warmer_arn, 'Input': json.dumps({'targets': targets})}
+    ])
+
+    for target in targets:
+        qualifier = f":{target['qualifier']}" if target['qualifier'] else ''
+        print(f"  ✓ {target['function']}{qualifier}: {target['concurrency']} container(s)", file=sys.stderr)
+    print(f"✅ {rule_name} pings {sum(t['concurrency'] for t in targets)} containers ({args.schedule}).",
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
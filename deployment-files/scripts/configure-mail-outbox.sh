@@ -0,0 +1,119 @@
+#!/usr/bin/env bash
+#
+# configure-mail-outbox.sh
+#
+# Usage: ./configure-mail-outbox.sh <ENV>
+#
+# Connects the <ENV>-send_mail Lambda to the <ENV>-MailOutbox table so queued
+# messages get delivered:
+#   1. Event source mapping on the table stream (INSERTs only) for prompt delivery
+#   2. EventBridge rule every minute for retries and expired leases
+#   3. EventBridge rule every minute for <ENV>-send_offer_digests, which turns
+#      closed offer-notification windows into one queued digest per seller
+#
+set -euo pipefail
+
+if [[ $# -ne 1 ]]; then
+  echo "❌ Usage: $0 <ENV>"
+  exit 1
+fi
+
+ENV="$1"
+REGION=$(aws configure get region 2>/dev/null || echo "us-east-1")
+FUNCTION_NAME="${ENV}-send_mail"
+TABLE_NAME="${ENV}-MailOutbox"
+RULE_NAME="${ENV}-mail-outbox-sweep"
+DIGEST_FUNCTION_NAME="${ENV}-send_offer_digests"
+DIGEST_RULE_NAME="${ENV}-offer-digests"
+
+STREAM_ARN=$(aws dynamodb describe-table \
+  --table-name "${TABLE_NAME}" \
+  --query "Table.LatestStreamArn" \
+  --output text --region "${REGION}")
+
+if [[ -z "${STREAM_ARN}" || "${STREAM_ARN}" == "None" ]]; then
+  echo "❌ Table ${TABLE_NAME} has no stream enabled."
+  exit 1
+fi
+
+FUNCTION_ARN=$(aws lambda get-function \
+  --function-name "${FUNCTION_NAME}" \
+  --query "Configuration.FunctionArn" \
+  --output text --region "${REGION}")
+
+# 1) Stream → send_mail (the filter is reapplied if a mapping for this stream already exists)
+# Only inserted messages waiting for delivery: offer-digest entries (status "digest") share the
+# table but are sent by send_offer_digests
+STREAM_FILTER='{"Filters": [{"Pattern": "{\"eventName\": [\"INSERT\"], \"dynamodb\": {\"NewImage\": {\"status\": {\"S\": [\"pending\"]}}}}"}]}'
+EXISTING_MAPPING=$(aws lambda list-event-source-mappings \
+  --function-name "${FUNCTION_NAME}" \
+  --event-source-arn "${STREAM_ARN}" \
+  --query "EventSourceMappings[0].UUID" \
+  --output text --region "${REGION}")
+
+if [[ -z "${EXISTING_MAPPING}" || "${EXISTING_MAPPING}" == "None" ]]; then
+  echo "📨 Creating stream mapping ${TABLE_NAME} → ${FUNCTION_NAME}..."
+  aws lambda create-event-source-mapping \
+    --function-name "${FUNCTION_NAME}" \
+    --event-source-arn "${STREAM_ARN}" \
+    --starting-position LATEST \
+    --batch-size 25 \
+    --maximum-batching-window-in-seconds 1 \
+    --filter-criteria "${STREAM_FILTER}" \
+    --region "${REGION}" >/dev/null
+else
+  echo "  • Stream mapping already exists (${EXISTING_MAPPING}); updating its filter"
+  aws lambda update-event-source-mapping \
+    --uuid "${EXISTING_MAPPING}" \
+    --filter-criteria "${STREAM_FILTER}" \
+    --region "${REGION}" >/dev/null
+fi
+
+# 2) Scheduled sweep for retries
+echo "⏰ Scheduling outbox sweep (${RULE_NAME})..."
+RULE_ARN=$(aws events put-rule \
+  --name "${RULE_NAME}" \
+  --schedule-expression "rate(1 minute)" \
+  --query "RuleArn" \
+  --output text --region "${REGION}")
+
+aws lambda add-permission \
+  --function-name "${FUNCTION_NAME}" \
+  --statement-id "mail-outbox-sweep" \
+  --action "lambda:InvokeFunction" \
+  --principal events.amazonaws.com \
+  --source-arn "${RULE_ARN}" \
+  --region "${REGION}" >/dev/null 2>&1 || true
+
+aws events put-targets \
+  --rule "${RULE_NAME}" \
+  --targets "Id"="send-mail","Arn"="${FUNCTION_ARN}" \
+  --region "${REGION}" >/dev/null
+
+# 3) Scheduled offer digests
+echo "⏰ Scheduling offer digests (${DIGEST_RULE_NAME})..."
+DIGEST_FUNCTION_ARN=$(aws lambda get-function \
+  --function-name "${DIGEST_FUNCTION_NAME}" \
+  --query "Configuration.FunctionArn" \
+  --output text --region "${REGION}")
+
+DIGEST_RULE_ARN=$(aws events put-rule \
+  --name "${DIGEST_RULE_NAME}" \
+  --schedule-expression "rate(1 minute)" \
+  --query "RuleArn" \
+  --output text --region "${REGION}")
+
+aws lambda add-permission \
+  --function-name "${DIGEST_FUNCTION_NAME}" \
+  --statement-id "offer-digests" \
+  --action "lambda:InvokeFunction" \
+  --principal events.amazonaws.com \
+  --source-arn "${DIGEST_RULE_ARN}" \
+  --region "${REGION}" >/dev/null 2>&1 || true
+
+aws events put-targets \
+  --rule "${DIGEST_RULE_NAME}" \
+  --targets "Id"="send-offer-digests","Arn"="${DIGEST_FUNCTION_ARN}" \
+  --region "${REGION}" >/dev/null
+
+echo "✅ Mail outbox delivery configured for ${ENV}."
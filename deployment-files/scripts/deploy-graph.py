@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+import argparse
+import hashlib
+import importlib.util
+import json
+import os
+import stat
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+import boto3
+import yaml
+
+# The steps of deploy-all.sh as a dependency graph, run concurrently
+# 1. Declares every step (stacks, Lambdas, triggers, Cognito client settings, frontend edits
+#    and sync) with the steps it needs; independent ones (the DynamoDB, S3 and Cognito stacks,
+#    the Lambda triggers, ...) run at the same time, up to --jobs at once
+# 2. Fingerprints each step's inputs (templates, code, scripts, options) together with the
+#    fingerprints of the steps it depends on, and skips steps whose fingerprint matches the
+#    last successful run in .deploy-state/<ENV>.json; --force runs everything
+# 3. Writes each step's output to .deploy-state/logs/<ENV>/<step>.log; a failed step stops
+#    only the steps that depend on it
+# 4. Prints a timing report: start and duration per step, the critical path and the time the
+#    same steps take one after another (as deploy-all.sh runs them)
+# Steps that edit frontend/ files or the Cognito app client run on every deploy: they are
+# quick, and the files they edit are inputs of the frontend sync. update-api-endpoint.sh and
+# update-login-button.py both edit global.js, and several steps update the same app client,
+# so those run one after another in deploy-all.sh's order.
+# Usage: python3 scripts/deploy-graph.py <ENV> [--jobs 6] [--force] [--lambda-mode router] [--api-type http]
+#                                              [--seed-snapshot <dir>] [--pillow-layer-arn <arn>]
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+STATE_DIR_NAME = '.deploy-state'
+LOG_TAIL_LINES = 15
+SKIPPED_NAMES = ('__pycache__',)
+SKIPPED_SUFFIXES = ('.pyc', '.bak')
+ENSURE_BUCKET = 'aws s3api head-bucket --bucket "$1" 2>/dev/null || aws s3 mb "s3://$1" --region "$2"'
+
+
+def load_script(file_name, module_name):
+    # The deploy scripts have dashes in their names, so they can't be imported directly
+    spec = importlib.util.spec_from_file_location(module_name, SCRIPT_DIR / file_name)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+deploy_pipeline = load_script('deploy-pipeline.py', 'deploy_pipeline')
+deploy_lambda = deploy_pipeline.deploy_lambda
+log = deploy_lambda.log
+
+
+class Step:
+    """
+    One deploy step: a command run once the steps in deps have finished.
+
+    command is called when the step starts, so it can look up what earlier steps created
+    (an API ID, a bucket name). inputs are the files and directories the step reads and
+    args its other settings; both are part of its fingerprint. Steps marked always run
+    even when their fingerprint is unchanged.
+    """
+
+    def __init__(self, name, command, deps=(), inputs=(), args=(), always=False):
+        self.name = name
+        self.command = command
+        self.deps = list(deps)
+        self.inputs = [Path(path) for path in inputs]
+        self.args = [str(arg) for arg in args]
+        self.always = always
+
+
+def hash_inputs(paths):
+    digest = hashlib.sha256()
+    for path in paths:
+        files = sorted(p for p in path.rglob('*') if p.is_file()) if path.is_dir() else [path]
+        for file in files:
+            if any(part in SKIPPED_NAMES for part in file.parts) or file.name.endswith(SKIPPED_SUFFIXES):
+                continue
+            digest.update(file.relative_to(path.parent).as_posix().encode() + b'\0')
+            digest.update(hashlib.sha256(file.read_bytes()).digest() if file.is_file() else b'missing')
+    return digest.hexdigest()
+
+
+def fingerprint(step, dep_fingerprints):
+    return hashlib.sha256(json.dumps(
+        [step.name, step.args, hash_inputs(step.inputs), [dep_fingerprints[dep] for dep in step.deps]]
+    ).encode()).hexdigest()
+
+
+def cloudformation_deploy(template, stack_name, parameters, region, s3_bucket=None):
+    # Unchanged stacks are not an error: a step reruns when any of its inputs changed
+    command = ['aws', 'cloudformation', 'deploy', '--template-file', str(template), '--stack-name', stack_name,
+               '--parameter-overrides', *parameters, '--capabilities', 'CAPABILITY_NAMED_IAM',
+               '--region', region, '--no-fail-on-empty-changeset']
+    if s3_bucket:
+        command += ['--s3-bucket', s3_bucket]
+    return command
+
+
+def required_output(stack_name, output_key, region):
+    value = deploy_lambda.stack_output(boto3.client('cloudformation', region_name=region), stack_name, output_key)
+    if not value or value == 'None':
+        raise RuntimeError(f"output {output_key} not found in stack {stack_name}")
+    return value
+
+
+def required_api_id(env, region):
+    api_id = deploy_pipeline.find_api_id(region, f"{env}Kashishop2API")
+    if not api_id:
+        raise RuntimeError(f"API {env}Kashishop2API not found")
+    return api_id
+
+
+def build_steps(env, region, base_dir, args):
+    """The steps of deploy-all.sh and what each one needs, in deploy-all.sh's order."""
+    templates = base_dir / 'templates'
+    scripts = base_dir / 'scripts'
+    python = sys.executable
+    cognito_stack = f"{env}-kashishop-cognito"
+    s3_stack = f"{env}-kashishop-s3"
+    template_bucket = f"{env}-kashishop-templates"
+    http_api = args.api_type == 'http'
+    api_template = templates / (f"{'api-gateway-http' if http_api else 'api-gateway'}"
+                                f"{'-router' if args.lambda_mode == 'router' else ''}-template.yaml")
+    cognito_full_json = base_dir.parent / 'cognito_full.json'
+    # Only an HTTP API template with Cognito-protected routes has a JWT authorizer and its pool parameters
+    api_uses_user_pool = 'UserPoolClientId' in (yaml.safe_load(api_template.read_text()).get('Parameters') or {})
+
+    def api_command():
+        parameters = [f"EnvPrefix={env}"]
+        if api_uses_user_pool:
+            # The HTTP API's JWT authorizer trusts tokens of this environment's user pool and app client
+            parameters += [f"UserPoolId={required_output(cognito_stack, 'KashishopUserPoolId', region)}",
+                           f"UserPoolClientId={required_output(cognito_stack, 'Kashishop2UserPoolClientId', region)}"]
+        return cloudformation_deploy(api_template, f"{env}-kashishop-api", parameters, region, template_bucket)
+
+    steps = [
+        Step('template-bucket',
+             lambda: ['bash', '-c', ENSURE_BUCKET, 'ensure-bucket', template_bucket, region],
+             args=[template_bucket, region]),
+        Step('dynamodb',
+             lambda: cloudformation_deploy(templates / 'dynamodb-template.yaml', f"{env}-kashishop-dynamo",
+                                           [f"EnvPrefix={env}"], region),
+             inputs=[templates / 'dynamodb-template.yaml'], args=[region]),
+        Step('s3',
+             lambda: cloudformation_deploy(templates / 's3-template.yaml', s3_stack, [f"EnvPrefix={env}"], region),
+             inputs=[templates / 's3-template.yaml'], args=[region]),
+        # Deployed via S3 to work around the 51 200 byte limit
+        Step('cognito',
+             lambda: cloudformation_deploy(templates / 'cognito-template.yaml', cognito_stack, [f"EnvPrefix={env}"],
+                                           region, template_bucket),
+             deps=['template-bucket'], inputs=[templates / 'cognito-template.yaml'], args=[region]),
+        Step('api', api_command,
+             deps=['template-bucket'] + (['cognito'] if api_uses_user_pool else []), inputs=[api_template],
+             args=[region]),
+        # deploy-lambda.py reads the user pool and bucket from the Cognito and S3 stacks, and with
+        # --monolith builds the router from the routes of its API template (load_routes)
+        Step('lambdas',
+             lambda: [python, str(scripts / 'deploy-lambda.py'), env,
+                      *(['--monolith'] if args.lambda_mode == 'router' else [])],
+             deps=['cognito', 's3'],
+             inputs=[base_dir / 'lambda', base_dir / 'lambda' / deploy_lambda.FUNCTION_SETTINGS_FILE,
+                     base_dir / deploy_lambda.LAYER_DIR_NAME, templates / 'dynamodb-template.yaml',
+                     scripts / 'deploy-lambda.py',
+                     *([templates / deploy_lambda.API_TEMPLATE] if args.lambda_mode == 'router' else [])],
+             args=[args.lambda_mode]),
+        Step('image-variants',
+             lambda: [str(scripts / 'configure-image-variants.sh'), env, args.pillow_layer_arn],
+             deps=['lambdas', 's3'], inputs=[scripts / 'configure-image-variants.sh'], args=[args.pillow_layer_arn]),
+        Step('mail-outbox', lambda: [str(scripts / 'configure-mail-outbox.sh'), env],
+             deps=['lambdas', 'dynamodb'], inputs=[scripts / 'configure-mail-outbox.sh']),
+        Step('keep-warm',
+             lambda: [python, str(scripts / 'configure-keep-warm.py'), env, '--region', region,
+                      *(['--monolith'] if args.lambda_mode == 'router' else [])],
+             deps=['lambdas'],
+             inputs=[scripts / 'configure-keep-warm.py', base_dir / 'lambda' / 'functions.yaml',
+                     *([templates / deploy_lambda.API_TEMPLATE] if args.lambda_mode == 'router' else [])],
+             args=[args.lambda_mode]),
+    ]
+    if args.seed_snapshot:
+        # After the image variant trigger, so the copied images get their variants
+        steps.append(Step('seed',
+                          lambda: [python, str(scripts / 'snapshot_env.py'), 'restore', args.seed_snapshot, env,
+                                   '--region', region],
+                          deps=['image-variants', 'dynamodb'], inputs=[Path(args.seed_snapshot)]))
+    steps += [
+        # These four update the same app client; each update replaces its whole configuration
+        Step('cognito-callback', lambda: [str(scripts / 'update-cognito-callback.sh'), env],
+             deps=['cognito', 's3'], inputs=[scripts / 'update-cognito-callback.sh']),
+        Step('admin', lambda: [str(scripts / 'setup-admin.sh'), env, 'admin', 'Admin123!'],
+             deps=['cognito-callback'], inputs=[scripts / 'setup-admin.sh']),
+        Step('client-settings', lambda: [str(scripts / 'cognito-client-settings.sh'), env, region],
+             deps=['admin'], inputs=[scripts / 'cognito-client-settings.sh']),
+    ]
+    if not http_api:
+        # The HTTP API has CORS built in
+        steps.append(Step('cors',
+                          lambda: [python, str(scripts / 'enable-cors-apigw.py'),
+                                   '--api-id', required_api_id(env, region), '--region', region, '--stage', env],
+                          deps=['api'], inputs=[scripts / 'enable-cors-apigw.py']))
+    global_js = base_dir / 'frontend' / 'script' / 'global.js'
+    steps += [
+        Step('api-endpoint', lambda: [str(scripts / 'update-api-endpoint.sh'), env, required_api_id(env, region)],
+             deps=['api'], inputs=[scripts / 'update-api-endpoint.sh', global_js], always=True),
+        Step('callback-js', lambda: [python, str(scripts / 'update-callback.py'), '--env', env, '--region', region],
+             deps=['client-settings', 'api'],
+             inputs=[scripts / 'update-callback.py', base_dir / 'frontend' / 'script' / 'callback.js'], always=True),
+        # Also writes the hosted UI login URL into global.js (update-login-button.py)
+        Step('branding',
+             lambda: [python, str(scripts / 'configure-login.py'), str(cognito_full_json), region,
+                      required_output(s3_stack, 'Kashishop2BucketName', region), env],
+             deps=['client-settings', 'api-endpoint'],
+             inputs=[scripts / 'configure-login.py', scripts / 'update-login-button.py', cognito_full_json, global_js],
+             always=True),
+        Step('frontend', lambda: [str(scripts / 'deploy-frontend.sh'), env],
+             deps=['s3', 'api-endpoint', 'callback-js', 'branding'],
+             inputs=[base_dir / 'frontend', scripts / 'deploy-frontend.sh']),
+    ]
+    return steps
+
+
+def check_graph(steps):
+    """Raise ValueError on unknown dependencies or cycles; the steps must be listed after their deps."""
+    seen = set()
+    for step in steps:
+        for dep in step.deps:
+            if dep not in seen:
+                raise ValueError(f"step {step.name} depends on {dep}, which is not listed before it")
+        seen.add(step.name)
+
+
+def normalize_scripts(scripts_dir):
+    # Same as deploy-all.sh's dos2unix + chmod, before the scripts are fingerprinted
+    for script in sorted(scripts_dir.glob('*.sh')):
+        content = script.read_bytes()
+        if b'\r\n' in content:
+            script.write_bytes(content.replace(b'\r\n', b'\n'))
+        script.chmod(script.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+
+def run_step(step, dep_fingerprints, recorded, force, log_dir, base_dir):
+    """
+    Run one step unless its fingerprint matches the recorded one.
+
+    Returns:
+        tuple: (status, fingerprint after the step, error message or None)
+    """
+    before = fingerprint(step, dep_fingerprints)
+    if not force and not step.always and recorded == before:
+        return 'skipped', before, None
+    log_path = log_dir / f"{step.name}.log"
+    try:
+        command = step.command()
+    except (RuntimeError, KeyError) as e:
+        return 'failed', None, str(e)
+    with open(log_path, 'w') as output:
+        result = subprocess.run(command, cwd=base_dir, stdin=subprocess.DEVNULL, stdout=output,
+                                stderr=subprocess.STDOUT)
+    if result.returncode != 0:
+        tail = log_path.read_text(errors='replace').splitlines()[-LOG_TAIL_LINES:]
+        return 'failed', None, '\n'.join([f"exit code {result.returncode}, log {log_path}:", *tail])
+    # Steps that edit their own inputs (frontend files) are recorded with the edited content
+    return 'ran', fingerprint(step, dep_fingerprints), None
+
+
+def run_graph(steps, state, state_path, force, jobs, log_dir, base_dir):
+    """
+    Run the steps as their dependencies finish.
+
+    Returns:
+        dict: step name -> {'status', 'start', 'end', 'fingerprint'}; status is ran, skipped,
+              failed or blocked (a dependency failed), start and end are seconds from the start.
+    """
+    results = {}
+    pending = {step.name: step for step in steps}
+    running = {}
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        while pending or running:
+            for name, step in list(pending.items()):
+                statuses = [results[dep]['status'] if dep in results else None for dep in step.deps]
+                if any(status in ('failed', 'blocked') for status in statuses):
+                    now = time.perf_counter() - started
+                    results[name] = {'status': 'blocked', 'start': now, 'end': now, 'fingerprint': None}
+                    log(f"  ⏭️  {name}: not run, a step it depends on failed")
+                    del pending[name]
+                elif all(status in ('ran', 'skipped') for status in statuses) and len(running) < jobs:
+                    dep_fingerprints = {dep: results[dep]['fingerprint'] for dep in step.deps}
+                    future = executor.submit(run_step, step, dep_fingerprints, state['fingerprints'].get(name), force,
+                                             log_dir, base_dir)
+                    running[future] = (name, time.perf_counter() - started)
+                    del pending[name]
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, start = running.pop(future)
+                status, step_fingerprint, error = future.result()
+                end = time.perf_counter() - started
+                results[name] = {'status': status, 'start': start, 'end': end, 'fingerprint': step_fingerprint}
+                if status == 'failed':
+                    state['fingerprints'].pop(name, None)
+                    log(f"  ❌ {name} failed after {end - start:.1f}s: {error}")
+                else:
+                    state['fingerprints'][name] = step_fingerprint
+                    outcome = 'unchanged, skipped' if status == 'skipped' else f"done in {end - start:.1f}s"
+                    log(f"  ✓ {name}: {outcome}")
+                # Saved after every step, so an interrupted deploy doesn't repeat finished work
+                tmp_path = state_path.with_suffix('.tmp')
+                tmp_path.write_text(json.dumps(state, indent=2, sort_keys=True))
+                os.replace(tmp_path, state_path)
+    return results
+
+
+def critical_path(steps, results):
+    """The chain of steps that determined the end time: from the last step to finish, back through
+    the dependency each step waited for longest."""
+    by_name = {step.name: step for step in steps}
+    finished = [name for name, result in results.items() if result['status'] in ('ran', 'skipped')]
+    if not finished:
+        return []
+    path = [max(finished, key=lambda name: results[name]['end'])]
+    while by_name[path[-1]].deps:
+        path.append(max(by_name[path[-1]].deps, key=lambda name: results[name]['end']))
+    return path[::-1]
+
+
+def print_report(steps, results, wall_seconds):
+    path = critical_path(steps, results)
+    log("========================================")
+    log(f"{'Step':<18}{'Start':>8}{'Time':>9}  {'Status':<9}Depends on")
+    for step in sorted(steps, key=lambda step: (results[step.name]['start'], step.name)):
+        result = results[step.name]
+        marker = ' ★' if step.name in path else ''
+        log(f"{step.name:<18}{result['start']:>7.1f}s{result['end'] - result['start']:>8.1f}s  "
+            f"{result['status']:<9}{', '.join(step.deps) or '-'}{marker}")
+    log("========================================")
+    if path:
+        chain = ' → '.join(f"{name} {results[name]['end'] - results[name]['start']:.1f}s" for name in path)
+        log(f"★ Critical path: {chain}")
+    serial = sum(result['end'] - result['start'] for result in results.values())
+    skipped = sum(1 for result in results.values() if result['status'] == 'skipped')
+    log(f"Wall time {wall_seconds:.1f}s ({serial:.1f}s if run one after another, as deploy-all.sh does); "
+        f"{skipped} of {len(steps)} steps unchanged and skipped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deploy an environment like deploy-all.sh, running independent "
+                                                 "steps concurrently and skipping unchanged ones")
+    parser.add_argument('env', help='EnvPrefix, e.g. dev')
+    parser.add_argument('--jobs', type=int, default=6, help='Steps run at the same time')
+    parser.add_argument('--force', action='store_true', help='Run every step, even if its inputs are unchanged')
+    parser.add_argument('--region', default=None, help='AWS region')
+    parser.add_argument('--lambda-mode', choices=['functions', 'router'],
+                        default=os.environ.get('LAMBDA_MODE', 'functions'),
+                        help='functions (one Lambda per route) or router (every API route served by <ENV>-router)')
+    parser.add_argument('--api-type', choices=['rest', 'http'], default=os.environ.get('API_TYPE', 'rest'),
+                        help='rest (REST API) or http (HTTP API with built-in CORS)')
+    parser.add_argument('--seed-snapshot', default=os.environ.get('SEED_SNAPSHOT') or None,
+                        help='Snapshot directory restored into the new tables (snapshot_env.py)')
+    parser.add_argument('--pillow-layer-arn', default=os.environ.get('PILLOW_LAYER_ARN', ''),
+                        help='Pillow layer for the image variant function')
+    args = parser.parse_args()
+
+    base_dir = Path.cwd()
+    if not (base_dir / 'templates').is_dir() or not (base_dir / 'lambda').is_dir():
+        print("❌ Run from the directory that contains templates/, scripts/ and lambda/.", file=sys.stderr)
+        sys.exit(1)
+    region = args.region or boto3.session.Session().region_name or 'us-east-1'
+    account = boto3.client('sts', region_name=region).get_caller_identity()['Account']
+    log(f"🚩 AWS Account: {account}, Region: {region}")
+
+    steps = build_steps(args.env, region, base_dir, args)
+    check_graph(steps)
+    normalize_scripts(base_dir / 'scripts')
+
+    # Fingerprints of another account or region say nothing about this one
+    state_path = base_dir / STATE_DIR_NAME / f"{args.env}.json"
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    state = json.loads(state_path.read_text()) if state_path.is_file() else {}
+    if state.get('account') != account or state.get('region') != region:
+        state = {'account': account, 'region': region, 'fingerprints': {}}
+    log_dir = base_dir / STATE_DIR_NAME / 'logs' / args.env
+    log_dir.mkdir(parents=True, exist_ok=True)
+
+    log(f"🚀 Deploying {args.env}: {len(steps)} steps, up to {args.jobs} at a time "
+        f"({args.lambda_mode} mode, {args.api_type} API)")
+    started = time.perf_counter()
+    results = run_graph(steps, state, state_path, args.force, args.jobs, log_dir, base_dir)
+    print_report(steps, results, time.perf_counter() - started)
+
+    if any(result['status'] in ('failed', 'blocked') for result in results.values()):
+        log(f"❌ Deployment of {args.env} incomplete; rerun to retry the failed steps (finished ones are skipped)")
+        sys.exit(1)
+    bucket = deploy_lambda.stack_output(boto3.client('cloudformation', region_name=region),
+                                        f"{args.env}-kashishop-s3", 'Kashishop2BucketName')
+    if bucket:
+        log(f"🌐 Frontend Website URL: https://{bucket}.s3.{region}.amazonaws.com/main/index.html")
+    log(f"🎉 All resources for '{args.env}' have been provisioned and deployed!")
+
+
+if __name__ == '__main__':
+    main()
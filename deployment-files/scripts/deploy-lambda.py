@@ -1,20 +1,104 @@
 #!/usr/bin/env python3
+import ast
+import base64
+import hashlib
+import importlib.util
+import io
+import json
 import os
+import random
 import re
-import sys
-import zipfile
 import subprocess
+import sys
 import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import argparse
+import boto3
 import yaml
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+# This script deploys Lambdas and passes them the resource names of one environment
+# 1. Reads table names from ../templates/dynamodb-template.yaml and looks up the user pool ID
+#    and bucket name in the <EnvPrefix> Cognito and S3 stacks
+# 2. Sets them as environment variables (ITEMS_TABLE=<EnvPrefix>-Items, USER_POOL_ID, BUCKET_NAME, ...),
+#    read by kashishop_common.config; the code itself is the same for every environment
+# 3. Zips each function in memory and deploys it with boto3, --workers functions at a time
+# 4. Retries throttling and in-progress-update conflicts with jittered backoff
+# 5. Skips functions whose deterministic zip matches the deployed CodeSha256
+# 6. Publishes ./lambda_layer/ as the <EnvPrefix>-kashishop-common layer (only when its hash
+#    changed) and attaches it to every function
+# 7. Applies memory, timeout, architecture and reserved concurrency from lambda/functions.yaml;
+#    functions with provisionedConcurrency get a `live` alias that follows every deploy
+#    (keepWarm is scheduled separately by configure-keep-warm.py)
+# 8. Prints a per-function timing and artifact size summary; with --measure-init also the init
+#    duration of each deployed artifact (handler import in fresh --python interpreters next to the
+#    layer, measured locally like scripts/bench-package-init.py)
+# Packaging leaves out local test code (`if __name__ == '__main__':` blocks, unused mock_*/test_*
+# functions). With --precompile the zips also carry .pyc files built by a python3.13 interpreter
+# (--python), so cold starts don't compile the code again; scripts/bench-package-init.py measures it.
+# With --monolith it also deploys <EnvPrefix>-router: every handler the API template routes to,
+# packaged behind kashishop_common.router so all routes share one warm container (use with the
+# API template generated by apigw_to_cf.py --router-function router). The other functions stay
+# deployed for their S3, stream, schedule and Cognito triggers; the provisionedConcurrency and
+# keepWarm of the routed handlers then go to the router, since the API no longer invokes them.
+# Built zips are cached in .build-cache/ by source hash (shared by all environments), and the
+# last deployed state per function is kept in .build-cache/manifests/<EnvPrefix>.json (--trust-cache).
+# Usage: python3 deploy-lambda.py <EnvPrefix> [--workers 8] [--force] [--trust-cache] [--monolith]
+#                                 [--user-pool-id <id>] [--bucket <name>] [--precompile [--python python3.13]]
+#                                 [--measure-init [--runs 3]]
+
+MAX_ATTEMPTS = 8
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 10.0
+# TooManyRequests: account-level control-plane throttling.
+# ResourceConflict: the function is still applying a previous update or being created.
+RETRYABLE_ERRORS = ('TooManyRequestsException', 'ThrottlingException', 'ResourceConflictException',
+                    'ServiceException')
+
+# Bump when the packaging changes, so cached artifacts from older builds are not reused
+BUILD_FORMAT = 3
+# Fixed entry metadata: the same source always produces the same zip bytes (and CodeSha256)
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+ZIP_FILE_MODE = 0o644 << 16
+LAYER_DIR_NAME = 'lambda_layer'
+RUNTIME = 'python3.13'
+LAYER_RUNTIMES = [RUNTIME]
+# Where Lambda unpacks function and layer zips; compiled code records these paths for tracebacks
+TASK_ROOT = '/var/task'
+LAYER_ROOT = '/opt'
+# Top-level functions with these prefixes are local test helpers unless the module uses them
+TEST_FUNCTION_PREFIXES = ('mock_', 'test_')
+# Per-function runtime settings, next to the handlers; functions it doesn't list get its defaults
+FUNCTION_SETTINGS_FILE = 'functions.yaml'
+DEFAULT_SETTINGS = {'memory': 128, 'timeout': 15, 'architecture': 'x86_64', 'reservedConcurrency': None,
+                    'provisionedConcurrency': 0, 'keepWarm': 0}
+ARCHITECTURES = ('arm64', 'x86_64')
+# Alias API Gateway invokes for functions with provisioned concurrency (see apigw_to_cf.py)
+LIVE_ALIAS = 'live'
+# --monolith: one function serving every API route (kashishop_common.router), with the
+# handlers as handlers/<name>.py and the route table from the API template
+ROUTER_FUNCTION = 'router'
+ROUTER_ENTRY = b"from kashishop_common.router import lambda_handler  # noqa: F401\n"
+ROUTER_HANDLER_PACKAGE = 'handlers'
+ROUTES_FILE = 'routes.json'
+API_TEMPLATE = 'api-gateway-template.yaml'
 
-# This script deploys Lambdas but first updates code to prefix DynamoDB table names
-# based on the entries in ../templates/dynamodb-template.yaml
-# 1. Reads table names from the DynamoDB CFN template
-# 2. Rewrites each .py file in ./lambda/ to replace any literal 'TableName' with '<EnvPrefix>-TableName'
-# 3. Zips and deploys via AWS CLI
-# Usage: python3 deploy-lambda.py <EnvPrefix>
+# kashishop_common.config maps table names to environment variables; share its naming
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / LAYER_DIR_NAME))
+from kashishop_common.config import table_env_var  # noqa: E402
+
+print_lock = threading.Lock()
+
+
+def log(message):
+    # Workers print concurrently; keep each line whole
+    with print_lock:
+        print(message, file=sys.stderr)
 
 
 def load_table_names():
@@ -47,70 +131,694 @@ def load_table_names():
     return table_names
 
 
-def modify_lambda_code(original_path, env_prefix, temp_dir, table_names):
-    content = original_path.read_text()
-    # Replace any occurrence of 'TableName' literal with prefix
-    # Match both single and double quoted
-    for tbl in table_names:
-        # regex to match 'tbl' or "tbl"
-        pattern = re.compile(rf"(?P<quote>['\"])({re.escape(tbl)})(?P=quote)")
-        content = pattern.sub(lambda m: f"{m.group('quote')}{env_prefix}-{tbl}{m.group('quote')}", content)
+def validate_settings(settings):
+    unknown = set(settings) - set(DEFAULT_SETTINGS)
+    if unknown:
+        return f"unknown setting(s) {', '.join(sorted(unknown))}"
+    if not isinstance(settings['memory'], int) or not 128 <= settings['memory'] <= 10240:
+        return f"memory must be 128-10240 MB, got {settings['memory']!r}"
+    if not isinstance(settings['timeout'], int) or not 1 <= settings['timeout'] <= 900:
+        return f"timeout must be 1-900 seconds, got {settings['timeout']!r}"
+    if settings['architecture'] not in ARCHITECTURES:
+        return f"architecture must be one of {', '.join(ARCHITECTURES)}, got {settings['architecture']!r}"
+    concurrency = settings['reservedConcurrency']
+    if concurrency is not None and (not isinstance(concurrency, int) or concurrency < 0):
+        return f"reservedConcurrency must be null or >= 0, got {concurrency!r}"
+    for key in ('provisionedConcurrency', 'keepWarm'):
+        if not isinstance(settings[key], int) or settings[key] < 0:
+            return f"{key} must be >= 0, got {settings[key]!r}"
+    if concurrency is not None and settings['provisionedConcurrency'] > concurrency:
+        return (f"provisionedConcurrency ({settings['provisionedConcurrency']}) can't exceed "
+                f"reservedConcurrency ({concurrency})")
+    return None
+
+
+def roll_up_to_router(settings, routes):
+    """
+    Monolith mode: API Gateway only invokes the router, so the provisioned concurrency and
+    keep-warm pings of the handlers it serves move to it (added up, never below the router's
+    own values) and the handlers keep neither.
+    """
+    routed = sorted(set(routes.values()) & set(settings))
+    router = settings[ROUTER_FUNCTION]
+    provisioned = sum(settings[name]['provisionedConcurrency'] for name in routed)
+    keep_warm = sum(settings[name]['keepWarm'] for name in routed)
+    router['provisionedConcurrency'] = max(router['provisionedConcurrency'], provisioned)
+    # Pings are served by the provisioned environments first; the handlers' warm containers come on top
+    router['keepWarm'] = max(router['keepWarm'], keep_warm + router['provisionedConcurrency'] if keep_warm else 0)
+    for name in routed:
+        settings[name] = {**settings[name], 'provisionedConcurrency': 0, 'keepWarm': 0}
+    return settings
+
+
+def load_function_settings(lambda_dir, routes=None):
+    """
+    Runtime settings for every handler in lambda_dir, from lambda_dir/functions.yaml.
+
+    routes: load_routes() result in monolith mode; the hot-path settings of the routed
+    handlers are then applied to the router instead (roll_up_to_router).
+
+    Returns:
+        dict: Function name -> {memory, timeout, architecture, reservedConcurrency,
+              provisionedConcurrency, keepWarm}.
+    """
+    lambda_dir = Path(lambda_dir)
+    path = lambda_dir / FUNCTION_SETTINGS_FILE
+    doc = (yaml.safe_load(path.read_text()) or {}) if path.is_file() else {}
+    defaults = {**DEFAULT_SETTINGS, **(doc.get('defaults') or {})}
+    overrides = doc.get('functions') or {}
+    # The router (--monolith) has no source file of its own but can be configured like the others
+    names = sorted([handler.stem for handler in lambda_dir.glob('*.py')] + [ROUTER_FUNCTION])
+
+    for name in sorted(set(overrides) - set(names)):
+        log(f"  ⚠️ {FUNCTION_SETTINGS_FILE}: no handler lambda/{name}.py for the settings of '{name}'")
+
+    settings = {name: {**defaults, **(overrides.get(name) or {})} for name in names}
+    errors = [f"{name}: {error}" for name, s in settings.items() if (error := validate_settings(s))]
+    if routes is not None and not errors:
+        settings = roll_up_to_router(settings, routes)
+        if error := validate_settings(settings[ROUTER_FUNCTION]):
+            errors.append(f"{ROUTER_FUNCTION} (with the settings of the routed handlers): {error}")
+    if errors:
+        print(f"❌ Invalid {path}:", file=sys.stderr)
+        for error in errors:
+            print(f"   {error}", file=sys.stderr)
+        sys.exit(1)
+    return settings
+
+
+def is_main_guard(node):
+    # if __name__ == '__main__':
+    test = node.test if isinstance(node, ast.If) else None
+    return (isinstance(test, ast.Compare) and isinstance(test.left, ast.Name) and test.left.id == '__name__'
+            and len(test.comparators) == 1 and isinstance(test.comparators[0], ast.Constant)
+            and test.comparators[0].value == '__main__')
+
+
+def strip_test_code(source):
+    """
+    Blank out code that only serves local testing.
+
+    Removes `if __name__ == '__main__':` blocks and top-level mock_*/test_* functions
+    the rest of the module doesn't use. Lines are blanked rather than deleted, so
+    tracebacks from Lambda keep the line numbers of the file in the repo.
+    """
+    text = source.decode('utf-8')
+    tree = ast.parse(text)
+    main_blocks = [node for node in tree.body if is_main_guard(node)]
+    kept = [node for node in tree.body if node not in main_blocks]
+    used = {node.id for top in kept for node in ast.walk(top) if isinstance(node, ast.Name)}
+    helpers = [
+        node for node in kept
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))
+        and node.name.startswith(TEST_FUNCTION_PREFIXES) and node.name not in used
+    ]
+    if not main_blocks and not helpers:
+        return source
+
+    lines = text.splitlines(keepends=True)
+    for node in main_blocks + helpers:
+        start = min([node.lineno] + [decorator.lineno for decorator in getattr(node, 'decorator_list', [])])
+        for index in range(start - 1, node.end_lineno):
+            lines[index] = lines[index][len(lines[index].rstrip('\r\n')):]
+    return ''.join(lines).encode('utf-8')
+
+
+class Precompiler:
+    """
+    Adds .pyc files compiled by an interpreter of the Lambda runtime's Python version.
+
+    /var/task and /opt are read-only in Lambda, so without shipped bytecode every cold
+    start compiles the handler and the layer again. The .pyc files use unchecked-hash
+    invalidation: their bytes only depend on the source, and the import system loads
+    them without comparing timestamps with the source.
+    """
+
+    def __init__(self, python):
+        probe = ("import importlib.util, sys; "
+                 "print(sys.implementation.cache_tag, 'python%d.%d' % sys.version_info[:2], "
+                 "importlib.util.MAGIC_NUMBER.hex(), sys.executable)")
+        try:
+            output = subprocess.run([python, '-c', probe], capture_output=True, text=True, check=True).stdout
+        except (OSError, subprocess.CalledProcessError) as e:
+            raise RuntimeError(f"cannot run {python}: {e}")
+        cache_tag, version, magic, executable = output.split(maxsplit=3)
+        # The resolved interpreter, not a wrapper such as a pyenv shim: it runs once per artifact
+        self.python = executable.strip()
+        if version != RUNTIME:
+            raise RuntimeError(f"{python} is {version}; bytecode for the {RUNTIME} runtime needs a "
+                           f"{RUNTIME} interpreter")
+        # Part of the build cache key: artifacts are rebuilt when the bytecode format changes
+        self.target = f"{cache_tag}-{magic}"
+
+    def compile(self, files, root):
+        """
+        Return files plus __pycache__/<module>.<tag>.pyc for every .py entry.
+
+        root is where Lambda unpacks the zip; it is recorded as the code's file name.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            for name, content in files.items():
+                if name.endswith('.py'):
+                    path = Path(tmp, name)
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    path.write_bytes(content)
+            result = subprocess.run([self.python, '-m', 'compileall', '-q', '-f', '--invalidation-mode',
+                                     'unchecked-hash', '-d', root, tmp], capture_output=True, text=True)
+            if result.returncode != 0:
+                raise RuntimeError(f"compileall failed: {(result.stdout + result.stderr).strip()}")
+            compiled = dict(files)
+            for pyc in Path(tmp).rglob('*.pyc'):
+                compiled[pyc.relative_to(tmp).as_posix()] = pyc.read_bytes()
+        return compiled
+
+
+def zip_lambda_code(files):
+    """
+    Build a deterministic zip in memory from {archive name: content}.
+
+    Entries are written in sorted order with fixed timestamps and permissions,
+    so unchanged code always hashes to the same CodeSha256.
+    """
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as z:
+        for name in sorted(files):
+            info = zipfile.ZipInfo(name, date_time=ZIP_DATE_TIME)
+            info.external_attr = ZIP_FILE_MODE
+            info.create_system = 3
+            info.compress_type = zipfile.ZIP_DEFLATED
+            z.writestr(info, files[name], compresslevel=9)
+    return buffer.getvalue()
+
+
+def code_sha256(zip_bytes):
+    # Same encoding Lambda reports in Configuration.CodeSha256
+    return base64.b64encode(hashlib.sha256(zip_bytes).digest()).decode()
+
+
+class BuildCache:
+    """
+    Built artifacts keyed by a hash of their inputs, plus the CodeSha256 last
+    deployed per function for one EnvPrefix.
+    """
+
+    def __init__(self, root, env_prefix):
+        self.artifacts_dir = Path(root) / 'artifacts'
+        self.manifest_path = Path(root) / 'manifests' / f"{env_prefix}.json"
+        self.artifacts_dir.mkdir(parents=True, exist_ok=True)
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.deployed = json.loads(self.manifest_path.read_text()) if self.manifest_path.is_file() else {}
+
+    def get_or_build(self, input_hash, build):
+        path = self.artifacts_dir / f"{input_hash}.zip"
+        if path.is_file():
+            return path.read_bytes(), True
+        zip_bytes = build()
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(zip_bytes)
+        os.replace(tmp_path, path)
+        return zip_bytes, False
+
+    def deployed_state(self, fn_name):
+        with self.lock:
+            return self.deployed.get(fn_name)
+
+    def record(self, fn_name, state):
+        with self.lock:
+            self.deployed[fn_name] = state
+
+    def save(self):
+        with self.lock:
+            tmp_path = self.manifest_path.with_suffix('.tmp')
+            tmp_path.write_text(json.dumps(self.deployed, indent=2, sort_keys=True))
+            os.replace(tmp_path, self.manifest_path)
+
+
+def package_function(source, compiler=None):
+    files = {'lambda_function.py': strip_test_code(source)}
+    if compiler:
+        files = compiler.compile(files, TASK_ROOT)
+    return zip_lambda_code(files)
+
+
+def build_function(cache, file_path, compiler=None):
+    # The artifact only depends on the source (and bytecode target), so every environment deploys the same zip
+    source = file_path.read_bytes()
+    target = compiler.target if compiler else 'source'
+    input_hash = hashlib.sha256(
+        json.dumps([BUILD_FORMAT, target, hashlib.sha256(source).hexdigest()]).encode()).hexdigest()
+    return cache.get_or_build(input_hash, lambda: package_function(source, compiler))
+
+
+def load_routes(template_path=None):
+    """
+    API routes and the function behind each, from the API Gateway template.
+
+    Returns:
+        dict: "<METHOD> <resource path>" (e.g. "GET /Users/byid") -> function name.
+    """
+    template_path = template_path or Path(__file__).resolve().parent.parent / 'templates' / API_TEMPLATE
+    # The template uses the long form of intrinsic functions (Fn::Sub, Ref), which safe_load reads as-is
+    resources = yaml.safe_load(Path(template_path).read_text()).get('Resources', {})
+
+    def path_of(resource_ref):
+        if 'Ref' not in resource_ref:  # Fn::GetAtt RootResourceId
+            return ''
+        properties = resources[resource_ref['Ref']]['Properties']
+        return f"{path_of(properties['ParentId'])}/{properties['PathPart']}"
+
+    routes = {}
+    for resource in resources.values():
+        if resource.get('Type') != 'AWS::ApiGateway::Method':
+            continue
+        properties = resource['Properties']
+        uri = (properties.get('Integration') or {}).get('Uri') or {}
+        match = re.search(r':function:\$\{EnvPrefix\}-(\w+)', uri.get('Fn::Sub', '') if isinstance(uri, dict) else uri)
+        if match and match.group(1) != ROUTER_FUNCTION:
+            routes[f"{properties['HttpMethod']} {path_of(properties['ResourceId']) or '/'}"] = match.group(1)
+    return dict(sorted(routes.items()))
+
+
+def package_router(sources, routes, compiler=None):
+    files = {
+        'lambda_function.py': ROUTER_ENTRY,
+        f"{ROUTER_HANDLER_PACKAGE}/__init__.py": b'',
+        ROUTES_FILE: json.dumps(routes, indent=2, sort_keys=True).encode()
+    }
+    for name, source in sources.items():
+        files[f"{ROUTER_HANDLER_PACKAGE}/{name}.py"] = strip_test_code(source)
+    if compiler:
+        files = compiler.compile(files, TASK_ROOT)
+    return zip_lambda_code(files)
+
 
-    # Also adjust dynamodb.Table('Name') patterns (redundant if above caught)
-    dt_pattern = re.compile(r"dynamodb\.Table\(\s*['\"](?P<name>[^'\"]+)['\"]\s*\)")
-    content = dt_pattern.sub(lambda m: f"dynamodb.Table('{env_prefix}-{m.group('name')}')", content)
+def build_router(cache, lambda_dir, routes, compiler=None):
+    """Router artifact with every handler the routes use; returns (zip_bytes, cached)."""
+    sources = {}
+    for name in sorted(set(routes.values())):
+        path = Path(lambda_dir) / f"{name}.py"
+        if not path.is_file():
+            raise RuntimeError(f"route handler lambda/{name}.py not found")
+        sources[name] = path.read_bytes()
+    target = compiler.target if compiler else 'source'
+    input_hash = hashlib.sha256(json.dumps(
+        [BUILD_FORMAT, target, ROUTER_FUNCTION, routes,
+         {name: hashlib.sha256(source).hexdigest() for name, source in sources.items()}]).encode()).hexdigest()
+    return cache.get_or_build(input_hash, lambda: package_router(sources, routes, compiler))
 
-    modified_path = temp_dir / 'lambda_function.py'
-    modified_path.write_text(content)
-    return modified_path
+
+def stack_output(cloudformation, stack_name, output_key):
+    try:
+        stacks = cloudformation.describe_stacks(StackName=stack_name)['Stacks']
+    except ClientError:
+        return None
+    for output in stacks[0].get('Outputs', []):
+        if output['OutputKey'] == output_key:
+            return output['OutputValue']
+    return None
+
+
+def runtime_environment(env_prefix, table_names, user_pool_id=None, bucket=None):
+    """Environment variables read by kashishop_common.config."""
+    cloudformation = boto3.client('cloudformation')
+    user_pool_id = user_pool_id or stack_output(cloudformation, f"{env_prefix}-kashishop-cognito",
+                                                'KashishopUserPoolId')
+    bucket = bucket or stack_output(cloudformation, f"{env_prefix}-kashishop-s3",
+                                    'Kashishop2BucketName') or f"{env_prefix}-kashishop2"
+    if not user_pool_id:
+        log(f"  ⚠️ No user pool ID found for {env_prefix} (stack {env_prefix}-kashishop-cognito); "
+            f"pass --user-pool-id")
+    variables = {table_env_var(tbl): f"{env_prefix}-{tbl}" for tbl in table_names}
+    variables.update({'ENV_PREFIX': env_prefix, 'USER_POOL_ID': user_pool_id or '', 'BUCKET_NAME': bucket})
+    return variables
+
+
+def call_with_retry(operation, **kwargs):
+    attempt = 0
+    while True:
+        try:
+            return operation(**kwargs)
+        except ClientError as e:
+            attempt += 1
+            if e.response['Error']['Code'] not in RETRYABLE_ERRORS or attempt >= MAX_ATTEMPTS:
+                raise
+            # Full jitter keeps the workers from retrying in lockstep
+            time.sleep(random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt)))
+
+
+def layer_files(layer_dir):
+    # Lambda unpacks layers into /opt; /opt/python is on the runtime's sys.path
+    return {
+        f"python/{path.relative_to(layer_dir).as_posix()}": path.read_bytes()
+        for path in sorted(layer_dir.rglob('*'))
+        if path.is_file() and '__pycache__' not in path.parts and path.suffix != '.pyc'
+    }
+
+
+def build_layer(layer_dir, compiler=None):
+    files = layer_files(layer_dir)
+    if compiler:
+        files = compiler.compile(files, LAYER_ROOT)
+    return zip_lambda_code(files)
+
+
+def publish_layer(lambda_client, layer_name, zip_bytes, force=False):
+    """
+    Publish a layer zip as a new layer version unless one with the same content exists.
+
+    The content hash is stored in the version description, so the check needs a
+    single ListLayerVersions call.
+
+    Returns:
+        tuple: (LayerVersionArn, 'published' | 'unchanged')
+    """
+    description = f"sha256:{code_sha256(zip_bytes)}"
+    if not force:
+        paginator = lambda_client.get_paginator('list_layer_versions')
+        for page in paginator.paginate(LayerName=layer_name):
+            for version in page.get('LayerVersions', []):
+                if version.get('Description') == description:
+                    return version['LayerVersionArn'], 'unchanged'
+    response = call_with_retry(
+        lambda_client.publish_layer_version,
+        LayerName=layer_name,
+        Description=description,
+        Content={'ZipFile': zip_bytes},
+        CompatibleRuntimes=LAYER_RUNTIMES
+    )
+    return response['LayerVersionArn'], 'published'
+
+
+def unversioned(layer_arn):
+    return layer_arn.rsplit(':', 1)[0]
+
+
+def desired_layers(current_layers, layer_arn):
+    # Keep layers attached by other scripts (e.g. Pillow on generate_image_variants)
+    if not layer_arn:
+        return current_layers
+    return [layer_arn] + [arn for arn in current_layers if unversioned(arn) != unversioned(layer_arn)]
+
+
+def remote_function(lambda_client, function_name):
+    """
+    Deployed function, or None when it does not exist yet.
+
+    GetFunction (unlike GetFunctionConfiguration) also returns the reserved concurrency.
+
+    Returns:
+        tuple: (configuration, reserved concurrency or None) or None
+    """
+    try:
+        response = call_with_retry(lambda_client.get_function, FunctionName=function_name)
+    except lambda_client.exceptions.ResourceNotFoundException:
+        return None
+    return response['Configuration'], response.get('Concurrency', {}).get('ReservedConcurrentExecutions')
+
+
+def apply_reserved_concurrency(lambda_client, full_fn_name, current, desired):
+    """Put or remove the reservation; returns True when something changed."""
+    if current == desired:
+        return False
+    try:
+        if desired is None:
+            call_with_retry(lambda_client.delete_function_concurrency, FunctionName=full_fn_name)
+        else:
+            call_with_retry(lambda_client.put_function_concurrency, FunctionName=full_fn_name,
+                            ReservedConcurrentExecutions=desired)
+    except ClientError as e:
+        # Reservations must leave the account at least 10 unreserved executions; on accounts
+        # with a low limit the function still deploys, just without the reservation
+        if e.response['Error']['Code'] not in ('InvalidParameterValueException', 'LimitExceededException'):
+            raise
+        log(f"  ⚠️ {full_fn_name}: reserved concurrency {desired} not applied: {e.response['Error']['Message']}")
+        return False
+    return True
 
 
-def zip_lambda_code(modified_path, fn_name):
-    zip_path = Path(tempfile.gettempdir()) / f"{fn_name}.zip"
-    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as z:
-        z.write(modified_path, 'lambda_function.py')
-    return zip_path
+def remote_alias(lambda_client, full_fn_name):
+    try:
+        return call_with_retry(lambda_client.get_alias, FunctionName=full_fn_name, Name=LIVE_ALIAS)
+    except lambda_client.exceptions.ResourceNotFoundException:
+        return None
 
 
-def aws_cli_exists(function_name):
+def remote_provisioned_concurrency(lambda_client, full_fn_name):
     try:
-        subprocess.run(['aws', 'lambda', 'get-function', '--function-name', function_name],
-                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
-        return True
-    except subprocess.CalledProcessError:
+        config = call_with_retry(lambda_client.get_provisioned_concurrency_config, FunctionName=full_fn_name,
+                                 Qualifier=LIVE_ALIAS)
+    except lambda_client.exceptions.ProvisionedConcurrencyConfigNotFoundException:
+        return 0
+    return config['RequestedProvisionedConcurrentExecutions']
+
+
+def apply_provisioned_concurrency(lambda_client, full_fn_name, desired):
+    """
+    Point the live alias at the current code and configuration and keep `desired`
+    execution environments of it initialized.
+
+    Provisioned concurrency only exists on published versions, so the alias is created the
+    first time it is asked for and from then on follows every deploy (PublishVersion returns
+    the existing version when nothing changed). Setting it back to 0 keeps the alias.
+
+    Returns:
+        bool: True when the alias or the provisioned concurrency changed.
+    """
+    alias = remote_alias(lambda_client, full_fn_name)
+    if alias is None and not desired:
         return False
+    changed = False
+    # Retried on ResourceConflictException while a code or configuration update is still applying
+    version = call_with_retry(lambda_client.publish_version, FunctionName=full_fn_name)['Version']
+    if alias is None:
+        call_with_retry(lambda_client.create_alias, FunctionName=full_fn_name, Name=LIVE_ALIAS,
+                        FunctionVersion=version)
+        changed = True
+    elif alias['FunctionVersion'] != version:
+        call_with_retry(lambda_client.update_alias, FunctionName=full_fn_name, Name=LIVE_ALIAS,
+                        FunctionVersion=version)
+        changed = True
+
+    if remote_provisioned_concurrency(lambda_client, full_fn_name) == desired:
+        return changed
+    try:
+        if desired:
+            # Lambda initializes the environments in the background; the alias serves on demand meanwhile
+            call_with_retry(lambda_client.put_provisioned_concurrency_config, FunctionName=full_fn_name,
+                            Qualifier=LIVE_ALIAS, ProvisionedConcurrentExecutions=desired)
+        else:
+            call_with_retry(lambda_client.delete_provisioned_concurrency_config, FunctionName=full_fn_name,
+                            Qualifier=LIVE_ALIAS)
+    except ClientError as e:
+        # Like reservations, provisioned concurrency comes out of the account's unreserved pool
+        if e.response['Error']['Code'] not in ('InvalidParameterValueException', 'LimitExceededException'):
+            raise
+        log(f"  ⚠️ {full_fn_name}: provisioned concurrency {desired} not applied: {e.response['Error']['Message']}")
+        return changed
+    return True
+
+
+def deploy_lambda(lambda_client, zip_bytes, full_fn_name, role_arn, sha, layer_arn=None, environment=None,
+                  settings=None, force=False):
+    environment = environment or {}
+    settings = settings or DEFAULT_SETTINGS
+    remote = remote_function(lambda_client, full_fn_name)
+    if remote is not None:
+        remote, reserved_concurrency = remote
+        action = 'unchanged'
+        architecture_changed = remote.get('Architectures', ['x86_64']) != [settings['architecture']]
+        if remote['CodeSha256'] != sha or architecture_changed or force:
+            # The architecture can only be changed together with the code
+            call_with_retry(lambda_client.update_function_code, FunctionName=full_fn_name, ZipFile=zip_bytes,
+                            Architectures=[settings['architecture']])
+            action = 'updated'
+        changes = {}
+        if remote.get('MemorySize') != settings['memory']:
+            changes['MemorySize'] = settings['memory']
+        if remote.get('Timeout') != settings['timeout']:
+            changes['Timeout'] = settings['timeout']
+        current_layers = [layer['Arn'] for layer in remote.get('Layers', [])]
+        layers = desired_layers(current_layers, layer_arn)
+        if layers != current_layers:
+            changes['Layers'] = layers
+        # Variables set by other scripts or by hand (SMTP settings, ...) are kept
+        current_variables = remote.get('Environment', {}).get('Variables', {})
+        variables = {**current_variables, **environment}
+        if variables != current_variables:
+            changes['Environment'] = {'Variables': variables}
+        if changes:
+            # Retried on ResourceConflictException while the code update above is still applying
+            call_with_retry(lambda_client.update_function_configuration, FunctionName=full_fn_name, **changes)
+            action = 'updated' if action == 'updated' else 'reconfigured'
+        if apply_reserved_concurrency(lambda_client, full_fn_name, reserved_concurrency,
+                                      settings['reservedConcurrency']):
+            action = 'updated' if action == 'updated' else 'reconfigured'
+        if apply_provisioned_concurrency(lambda_client, full_fn_name, settings['provisionedConcurrency']):
+            action = 'updated' if action == 'updated' else 'reconfigured'
+        return action
+    call_with_retry(
+        lambda_client.create_function,
+        FunctionName=full_fn_name,
+        Runtime=RUNTIME,
+        Role=role_arn,
+        Handler='lambda_function.lambda_handler',
+        Code={'ZipFile': zip_bytes},
+        Timeout=settings['timeout'],
+        MemorySize=settings['memory'],
+        Architectures=[settings['architecture']],
+        Layers=[layer_arn] if layer_arn else [],
+        Environment={'Variables': environment},
+        Publish=True
+    )
+    apply_reserved_concurrency(lambda_client, full_fn_name, None, settings['reservedConcurrency'])
+    apply_provisioned_concurrency(lambda_client, full_fn_name, settings['provisionedConcurrency'])
+    return 'created'
+
+
+def deploy_function(lambda_client, cache, file_path, env_prefix, role_arn, layer_arn=None, environment=None,
+                    settings=None, force=False, trust_cache=False, artifact=None, compiler=None):
+    fn_name = file_path.stem
+    full_fn_name = f"{env_prefix}-{fn_name}"
+    timing = {'name': fn_name, 'action': 'failed', 'package': 0.0, 'deploy': 0.0, 'size': 0, 'error': None}
+    started = time.perf_counter()
+    try:
+        # artifact: (zip_bytes, cached) built beforehand, e.g. once for several environments
+        zip_bytes, cached = artifact or build_function(cache, file_path, compiler)
+        timing['size'] = len(zip_bytes)
+        settings = settings or DEFAULT_SETTINGS
+        state = {'codeSha256': code_sha256(zip_bytes), 'layer': layer_arn, 'environment': environment,
+                 'settings': settings}
+        packaged = time.perf_counter()
+        timing['package'] = packaged - started
+        if trust_cache and not force and cache.deployed_state(fn_name) == state:
+            # No API call at all: the manifest says this exact zip, layer, environment and settings are live
+            timing['action'] = 'unchanged'
+        else:
+            timing['action'] = deploy_lambda(lambda_client, zip_bytes, full_fn_name, role_arn,
+                                             state['codeSha256'], layer_arn=layer_arn, environment=environment,
+                                             settings=settings, force=force)
+        cache.record(fn_name, state)
+        timing['deploy'] = time.perf_counter() - packaged
+        if timing['action'] != 'unchanged':
+            provisioned = settings['provisionedConcurrency']
+            log(f"  ✓ {timing['action'].capitalize()} {full_fn_name} ({len(zip_bytes) / 1024:.1f} KB, "
+                f"{settings['memory']} MB {settings['architecture']}"
+                f"{f', {provisioned} provisioned on {LIVE_ALIAS}' if provisioned else ''}"
+                f"{', cached build' if cached else ''}, {timing['package'] + timing['deploy']:.1f}s)")
+    except Exception as e:
+        timing['deploy'] = time.perf_counter() - started - timing['package']
+        timing['error'] = str(e)
+        log(f"  ❌ {full_fn_name}: {e}")
+    return timing
+
+
+def deploy_environment(lambda_client, cache, file_paths, env_prefix, role_arn, environment, layer_zip=None,
+                       function_settings=None, workers=8, force=False, trust_cache=False, artifacts=None,
+                       compiler=None):
+    """
+    Publish the layer (if any) and deploy every function of one environment.
 
+    function_settings maps function names to load_function_settings() entries;
+    functions without an entry get DEFAULT_SETTINGS. Functions missing from artifacts
+are built here, precompiled when a Precompiler is given.
 
-def deploy_lambda(zip_path, full_fn_name, role_arn):
-    if aws_cli_exists(full_fn_name):
-        print(f"  • Lambda exists. Updating code for {full_fn_name}", file=sys.stderr)
-        subprocess.run([
-            'aws', 'lambda', 'update-function-code',
-            '--function-name', full_fn_name,
-            '--zip-file', f"fileb://{zip_path}"], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        print(f"  ✓ Updated code for {full_fn_name}", file=sys.stderr)
-    else:
-        print(f"  • Lambda does not exist. Creating {full_fn_name}", file=sys.stderr)
-        subprocess.run([
-            'aws', 'lambda', 'create-function',
-            '--function-name', full_fn_name,
-            '--runtime', 'python3.13',
-            '--role', role_arn,
-            '--handler', 'lambda_function.lambda_handler',
-            '--zip-file', f"fileb://{zip_path}",
-            '--timeout', '15',
-            '--memory-size', '128',
-            '--architecture', 'x86_64',
-            '--publish'], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        print(f"  ✓ Created {full_fn_name}", file=sys.stderr)
+    Returns:
+        tuple: (per-function timings, layer ARN or None)
+    """
+    layer_arn = None
+    if layer_zip is not None:
+        layer_arn, layer_action = publish_layer(lambda_client, f"{env_prefix}-kashishop-common", layer_zip,
+                                                force=force)
+        log(f"  ✓ Layer {layer_action}: {layer_arn}")
+
+    artifacts = artifacts or {}
+    function_settings = function_settings or {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        timings = list(executor.map(
+            lambda path: deploy_function(lambda_client, cache, path, env_prefix, role_arn, layer_arn=layer_arn,
+                                         environment=environment, settings=function_settings.get(path.stem),
+                                         force=force, trust_cache=trust_cache, artifact=artifacts.get(path.stem),
+                                         compiler=compiler),
+            file_paths))
+    cache.save()
+    return timings, layer_arn
+
+
+def load_bench_module():
+    # bench-package-init.py has a dash in its name, so it can't be imported directly
+    spec = importlib.util.spec_from_file_location('bench_package_init',
+                                                  Path(__file__).resolve().parent / 'bench-package-init.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def measure_deployed_init(timings, artifacts, layer_zip, python, runs, workers):
+    """
+    Add the median init duration (handler import, in seconds) of each deployed artifact to its timing.
+
+    artifacts maps function names to their zip bytes; functions that failed to deploy or whose
+    import fails keep no 'init' entry and get a warning.
+    """
+    bench = load_bench_module()
+
+    def measure(timing):
+        try:
+            timing['init'], error = bench.measure_init(python, artifacts[timing['name']], layer_zip, runs)
+        except OSError as e:
+            timing['init'], error = None, str(e)
+        if error:
+            log(f"  ⚠️ Init of {timing['name']} not measured: {error}")
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(measure, [t for t in timings if not t['error']]))
+
+
+def print_summary(timings, wall_time):
+    # Init only appears when --measure-init measured it
+    with_init = any('init' in t for t in timings)
+    log("----------------------------------------")
+    log(f"{'Function':<34}{'Action':<9}{'Size':>10}{'Package':>9}{'Deploy':>9}{'Total':>9}"
+        + (f"{'Init':>11}" if with_init else ''))
+    for t in sorted(timings, key=lambda t: t['package'] + t['deploy'], reverse=True):
+        init = f"{t['init'] * 1000:.1f} ms" if t.get('init') is not None else '-'
+        log(f"{t['name']:<34}{t['action']:<9}{t['size'] / 1024:>7.1f} KB{t['package']:>8.2f}s{t['deploy']:>8.2f}s"
+            f"{t['package'] + t['deploy']:>8.2f}s" + (f"{init:>11}" if with_init else ''))
+    serial_time = sum(t['package'] + t['deploy'] for t in timings)
+    log("----------------------------------------")
+    unchanged = sum(1 for t in timings if t['action'] == 'unchanged')
+    log(f"{len(timings)} functions ({unchanged} unchanged, {sum(t['size'] for t in timings) / 1024:.1f} KB) "
+        f"in {wall_time:.1f}s wall time ({serial_time:.1f}s if run one by one)")
 
 
 def main():
-    parser = argparse.ArgumentParser(description='Deploy Lambdas with EnvPrefix-aware DynamoDB table names')
+    parser = argparse.ArgumentParser(description='Deploy Lambdas with EnvPrefix-aware resource names')
     parser.add_argument('EnvPrefix', help='Prefix to apply to function names and DynamoDB tables')
+    parser.add_argument('--workers', type=int, default=8, help='Functions deployed in parallel')
+    parser.add_argument('--force', action='store_true', help='Upload every function, even if unchanged')
+    parser.add_argument('--trust-cache', action='store_true',
+                        help='Skip functions the local manifest lists as deployed, without asking Lambda')
+    parser.add_argument('--user-pool-id', default=None, help='Cognito user pool ID (default: from the Cognito stack)')
+    parser.add_argument('--bucket', default=None, help='Image bucket (default: from the S3 stack)')
+    parser.add_argument('--precompile', action='store_true', help=f"Ship .pyc files compiled for {RUNTIME}")
+    parser.add_argument('--python', default=RUNTIME, help=f"{RUNTIME} interpreter used by --precompile")
+    parser.add_argument('--monolith', action='store_true',
+                        help=f"Also deploy <EnvPrefix>-{ROUTER_FUNCTION}, one function serving every API route")
+    parser.add_argument('--measure-init', action='store_true',
+                        help='Add the init duration of every deployed artifact to the summary (measured with --python)')
+    parser.add_argument('--runs', type=int, default=3, help='Fresh interpreters per artifact for --measure-init')
     args = parser.parse_args()
     env_prefix = args.EnvPrefix
 
+    compiler = None
+    if args.precompile:
+        try:
+            compiler = Precompiler(args.python)
+        except RuntimeError as e:
+            print(f"❌ --precompile: {e}", file=sys.stderr)
+            sys.exit(1)
+
     table_names = load_table_names()
     if not table_names:
         print("❌ No DynamoDB table names found in template.", file=sys.stderr)
@@ -121,33 +829,49 @@ def main():
         print(f"❌ Directory '{lambda_dir}' not found. Run from repo root.", file=sys.stderr)
         sys.exit(1)
 
-    result = subprocess.run(['aws', 'sts', 'get-caller-identity', '--query', 'Account', '--output', 'text'],
-                             capture_output=True, text=True, check=True)
-    account_id = result.stdout.strip()
+    # One client for all workers; botocore clients are thread-safe
+    config = Config(max_pool_connections=max(10, args.workers), retries={'max_attempts': 5, 'mode': 'adaptive'})
+    lambda_client = boto3.client('lambda', config=config)
+    account_id = boto3.client('sts').get_caller_identity()['Account']
     role_arn = f"arn:aws:iam::{account_id}:role/LabRole"
 
     print(f"Using IAM role: {role_arn}", file=sys.stderr)
-    print(f"Deploying Lambda functions with prefix '{env_prefix}'...", file=sys.stderr)
+    print(f"Deploying Lambda functions with prefix '{env_prefix}' ({args.workers} workers)...", file=sys.stderr)
     print(file=sys.stderr)
 
-    for file_path in lambda_dir.glob('*.py'):
-        fn_name = file_path.stem
-        full_fn_name = f"{env_prefix}-{fn_name}"
-        print("----------------------------------------", file=sys.stderr)
-        print(f"Packaging function: {fn_name}", file=sys.stderr)
+    environment = runtime_environment(env_prefix, table_names, user_pool_id=args.user_pool_id, bucket=args.bucket)
+    cache = BuildCache(Path.cwd() / '.build-cache', env_prefix)
+    file_paths = sorted(lambda_dir.glob('*.py'))
+    started = time.perf_counter()
 
-        with tempfile.TemporaryDirectory() as tmp:
-            temp_dir = Path(tmp)
-            modified_path = modify_lambda_code(file_path, env_prefix, temp_dir, table_names)
-            zip_path = zip_lambda_code(modified_path, fn_name)
-            print(f"  • Zipped {fn_name} → {zip_path}", file=sys.stderr)
-
-            print(f"  • Checking if Lambda '{full_fn_name}' exists...", file=sys.stderr)
-            deploy_lambda(zip_path, full_fn_name, role_arn)
+    artifacts = {}
+    routes = None
+    if args.monolith:
+        # The router has no source file; its artifact is built from every handler the API routes to
+        routes = load_routes()
+        artifacts[ROUTER_FUNCTION] = build_router(cache, lambda_dir, routes, compiler)
+        file_paths.append(lambda_dir / f"{ROUTER_FUNCTION}.py")
+        print(f"🔀 {env_prefix}-{ROUTER_FUNCTION} serves {len(routes)} routes with "
+              f"{len(set(routes.values()))} handlers", file=sys.stderr)
 
-            zip_path.unlink(missing_ok=True)
-        print(file=sys.stderr)
+    layer_dir = Path.cwd() / LAYER_DIR_NAME
+    layer_zip = build_layer(layer_dir, compiler) if layer_dir.is_dir() else None
+    timings, _ = deploy_environment(lambda_client, cache, file_paths, env_prefix, role_arn, environment,
+                                    layer_zip=layer_zip, function_settings=load_function_settings(lambda_dir, routes),
+                                    workers=args.workers, force=args.force, trust_cache=args.trust_cache,
+                                    artifacts=artifacts, compiler=compiler)
+    wall_time = time.perf_counter() - started
+    if args.measure_init:
+        # Build cache hits: the exact zips that were just deployed
+        zips = {path.stem: (artifacts.get(path.stem) or build_function(cache, path, compiler))[0]
+                for path in file_paths if path.stem in {t['name'] for t in timings if not t['error']}}
+        measure_deployed_init(timings, zips, layer_zip, args.python, args.runs, args.workers)
+    print_summary(timings, wall_time)
 
+    failed = [t['name'] for t in timings if t['error']]
+    if failed:
+        print(f"❌ {len(failed)} function(s) failed: {', '.join(failed)}", file=sys.stderr)
+        sys.exit(1)
     print("✅ All Lambda functions deployed.", file=sys.stderr)
 
 if __name__ == '__main__':
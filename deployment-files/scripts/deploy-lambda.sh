@@ -2,18 +2,19 @@
 #
 # deploy-lambda.sh (updated)
 #
-# Usage: ./deploy-lambda.sh <EnvPrefix>
+# Usage: ./deploy-lambda.sh <EnvPrefix> [deploy-lambda.py options, e.g. --monolith]
 #
 # Checks for Python3 and runs deploy-lambda.py if available. Otherwise, prints error and exits.
 #
 set -euo pipefail
 
-if [ "$#" -ne 1 ]; then
-  echo "Usage: $0 <EnvPrefix>"
+if [ "$#" -lt 1 ]; then
+  echo "Usage: $0 <EnvPrefix> [deploy-lambda.py options]"
   exit 1
 fi
 
 EnvPrefix="$1"
+shift
 LambdaDir="$(pwd)/lambda"
 
 if [ ! -d "$LambdaDir" ]; then
@@ -27,7 +28,7 @@ PY_DEPLOY="$SCRIPT_DIR/deploy-lambda.py"
 
 if command -v python3 >/dev/null 2>&1 && [ -f "$PY_DEPLOY" ]; then
   echo "🐍 Python3 detected and deploy-lambda.py found. Running Python-based deployment..."
-  python3 "$PY_DEPLOY" "$EnvPrefix"
+  python3 "$PY_DEPLOY" "$EnvPrefix" "$@"
   exit 0
 else
   echo "❌ Python3 or deploy-lambda.py not found. Please install Python3 and ensure deploy-lambda.py is present in the same directory."
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+import argparse
+import hashlib
+import importlib.util
+import mimetypes
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+# Builds the Lambda artifacts, the shared layer and the frontend bundle once, then rolls
+# them out to several environments at the same time.
+# 1. Build: every lambda/*.py zip (deterministic, cached in .build-cache/), the
+#    lambda_layer/ zip and an in-memory copy of frontend/
+# 2. Deploy, one thread per environment:
+#      • Lambdas through deploy-lambda.py, with that environment's variables
+#      • frontend files with that environment's API endpoint and Cognito values filled in
+#        (the same substitutions as update-api-endpoint.sh and update-callback.py); files
+#        whose ETag already matches are not uploaded again
+# 3. Prints one report covering every environment
+# The stacks of each environment must already exist (deploy-all.sh <ENV> once).
+# Usage: python3 scripts/deploy-pipeline.py dev test prod [--workers 8] [--skip-frontend] [--precompile] [--monolith]
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+UPLOAD_WORKERS = 16
+GLOBAL_JS_KEY = 'script/global.js'
+CALLBACK_JS_KEY = 'script/callback.js'
+SKIPPED_SUFFIXES = ('.bak',)
+
+
+def load_script(file_name, module_name):
+    # The deploy scripts have dashes in their names, so they can't be imported directly
+    spec = importlib.util.spec_from_file_location(module_name, SCRIPT_DIR / file_name)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+deploy_lambda = load_script('deploy-lambda.py', 'deploy_lambda')
+update_callback = load_script('update-callback.py', 'update_callback')
+log = deploy_lambda.log
+
+
+def build_frontend(frontend_dir):
+    """Key -> bytes for every file under frontend/, plus placeholders for empty folders."""
+    bundle = {}
+    for path in sorted(frontend_dir.rglob('*')):
+        key = path.relative_to(frontend_dir).as_posix()
+        if path.is_file() and not path.name.endswith(SKIPPED_SUFFIXES):
+            bundle[key] = path.read_bytes()
+        elif path.is_dir() and not any(path.iterdir()):
+            bundle[f"{key}/"] = b''
+    return bundle
+
+
+def stack_outputs(cloudformation, stack_name):
+    stack = cloudformation.describe_stacks(StackName=stack_name)['Stacks'][0]
+    return {output['OutputKey']: output['OutputValue'] for output in stack.get('Outputs', [])}
+
+
+def find_api_id(region, api_name):
+    apigateway = boto3.client('apigateway', region_name=region)
+    for page in apigateway.get_paginator('get_rest_apis').paginate():
+        for api in page.get('items', []):
+            if api['name'] == api_name:
+                return api['id']
+    # Deployed as an HTTP API (API_TYPE=http)
+    for page in boto3.client('apigatewayv2', region_name=region).get_paginator('get_apis').paginate():
+        for api in page.get('Items', []):
+            if api['Name'] == api_name:
+                return api['ApiId']
+    return None
+
+
+def environment_values(env, region):
+    """Resource names and endpoints of one environment, from its stacks."""
+    cloudformation = boto3.client('cloudformation', region_name=region)
+    cognito = stack_outputs(cloudformation, f"{env}-kashishop-cognito")
+    s3_outputs = stack_outputs(cloudformation, f"{env}-kashishop-s3")
+    user_pool_id = cognito['KashishopUserPoolId']
+    client_id = cognito['Kashishop2UserPoolClientId']
+    domain_prefix = next(value for key, value in cognito.items() if key.endswith('UserPoolDomainId'))
+    client_secret = boto3.client('cognito-idp', region_name=region).describe_user_pool_client(
+        UserPoolId=user_pool_id, ClientId=client_id)['UserPoolClient'].get('ClientSecret', '')
+    api_id = find_api_id(region, f"{env}Kashishop2API")
+    if not api_id:
+        raise RuntimeError(f"API {env}Kashishop2API not found")
+    bucket = s3_outputs['Kashishop2BucketName']
+    return {
+        'user_pool_id': user_pool_id,
+        'client_id': client_id,
+        'client_secret': client_secret,
+        'token_endpoint': f"https://{domain_prefix}.auth.{region}.amazoncognito.com/oauth2/token",
+        'redirect_uri': f"https://{bucket}.s3.{region}.amazonaws.com/main/callback.html",
+        'api_url': f"https://{api_id}.execute-api.{region}.amazonaws.com/{env}",
+        'bucket': bucket
+    }
+
+
+def render_frontend(bundle, values):
+    """Copy of the bundle with the environment-specific JS constants filled in."""
+    files = dict(bundle)
+    if GLOBAL_JS_KEY in files:
+        content = files[GLOBAL_JS_KEY].decode('utf-8')
+        content = re.sub(r'^const API = .*;', f'const API = "{values["api_url"]}/";', content, flags=re.M)
+        files[GLOBAL_JS_KEY] = content.encode('utf-8')
+    if CALLBACK_JS_KEY in files:
+        content = update_callback.apply_callback_values(
+            files[CALLBACK_JS_KEY].decode('utf-8'), values['client_id'], values['client_secret'],
+            values['redirect_uri'], values['token_endpoint'], values['api_url'])
+        files[CALLBACK_JS_KEY] = content.encode('utf-8')
+    return files
+
+
+def upload_frontend(s3, bucket, files):
+    """Upload files whose content differs from the object in the bucket; returns (uploaded, unchanged)."""
+    etags = {}
+    for page in s3.get_paginator('list_objects_v2').paginate(Bucket=bucket):
+        for obj in page.get('Contents', []):
+            etags[obj['Key']] = obj['ETag'].strip('"')
+
+    changed = {key: body for key, body in files.items() if etags.get(key) != hashlib.md5(body).hexdigest()}
+
+    def put(item):
+        key, body = item
+        content_type = mimetypes.guess_type(key)[0] or 'application/octet-stream'
+        s3.put_object(Bucket=bucket, Key=key, Body=body, ContentType=content_type)
+
+    with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as executor:
+        list(executor.map(put, changed.items()))
+    return len(changed), len(files) - len(changed)
+
+
+def deploy_to_environment(env, build, clients, role_arn, table_names, args):
+    report = {'env': env, 'lambda': {}, 'frontend': None, 'seconds': 0.0, 'error': None}
+    started = time.perf_counter()
+    try:
+        values = environment_values(env, args.region)
+        if build['artifacts'] is not None:
+            environment = deploy_lambda.runtime_environment(env, table_names, user_pool_id=values['user_pool_id'],
+                                                            bucket=values['bucket'])
+            cache = deploy_lambda.BuildCache(Path.cwd() / '.build-cache', env)
+            timings, _ = deploy_lambda.deploy_environment(
+                clients['lambda'], cache, build['file_paths'], env, role_arn, environment,
+                layer_zip=build['layer_zip'], function_settings=build['settings'], workers=args.workers,
+                force=args.force, trust_cache=args.trust_cache, artifacts=build['artifacts'])
+            for timing in timings:
+                report['lambda'][timing['action']] = report['lambda'].get(timing['action'], 0) + 1
+            failed = [t['name'] for t in timings if t['error']]
+            if failed:
+                raise RuntimeError(f"{len(failed)} function(s) failed: {', '.join(failed)}")
+        if build['frontend'] is not None:
+            report['frontend'] = upload_frontend(clients['s3'], values['bucket'],
+                                                 render_frontend(build['frontend'], values))
+            log(f"  ✓ {env}: frontend {report['frontend'][0]} uploaded, {report['frontend'][1]} unchanged")
+    except (ClientError, RuntimeError, KeyError, StopIteration) as e:
+        report['error'] = str(e) or type(e).__name__
+        log(f"  ❌ {env}: {report['error']}")
+    report['seconds'] = time.perf_counter() - started
+    return report
+
+
+def print_report(reports, build_seconds, deploy_seconds):
+    log("========================================")
+    log(f"{'Env':<12}{'Lambdas':<44}{'Frontend':<24}{'Time':>8}  Status")
+    for report in reports:
+        lambdas = ', '.join(f"{count} {action}" for action, count in sorted(report['lambda'].items())) or '-'
+        frontend = (f"{report['frontend'][0]} up, {report['frontend'][1]} same" if report['frontend'] else '-')
+        status = '✅' if not report['error'] else f"❌ {report['error']}"
+        log(f"{report['env']:<12}{lambdas:<44}{frontend:<24}{report['seconds']:>7.1f}s  {status}")
+    log("========================================")
+    serial = sum(report['seconds'] for report in reports)
+    log(f"Build once: {build_seconds:.1f}s · deploy to {len(reports)} environments: {deploy_seconds:.1f}s "
+        f"wall time ({serial:.1f}s if run one after another)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build once and deploy to several environments concurrently')
+    parser.add_argument('envs', nargs='+', help='EnvPrefixes to deploy to, e.g. dev test prod')
+    parser.add_argument('--workers', type=int, default=8, help='Functions deployed in parallel per environment')
+    parser.add_argument('--region', default=None, help='AWS region')
+    parser.add_argument('--skip-lambda', action='store_true', help='Only deploy the frontend')
+    parser.add_argument('--skip-frontend', action='store_true', help='Only deploy the Lambdas')
+    parser.add_argument('--force', action='store_true', help='Upload every function, even if unchanged')
+    parser.add_argument('--trust-cache', action='store_true',
+                        help='Skip functions the local manifests list as deployed, without asking Lambda')
+    parser.add_argument('--precompile', action='store_true',
+                        help=f"Ship .pyc files compiled for {deploy_lambda.RUNTIME}")
+    parser.add_argument('--python', default=deploy_lambda.RUNTIME,
+                        help=f"{deploy_lambda.RUNTIME} interpreter used by --precompile")
+    parser.add_argument('--monolith', action='store_true',
+                        help=f"Also deploy <env>-{deploy_lambda.ROUTER_FUNCTION}, one function serving every API route")
+    args = parser.parse_args()
+    args.region = args.region or boto3.session.Session().region_name or 'us-east-1'
+
+    lambda_dir = Path.cwd() / 'lambda'
+    frontend_dir = Path.cwd() / 'frontend'
+    if not lambda_dir.is_dir() or not frontend_dir.is_dir():
+        print("❌ Run from the directory that contains lambda/ and frontend/.", file=sys.stderr)
+        sys.exit(1)
+
+    # 1) Build everything once
+    started = time.perf_counter()
+    build = {'file_paths': sorted(lambda_dir.glob('*.py')), 'artifacts': None, 'layer_zip': None, 'settings': None,
+             'frontend': None}
+    if not args.skip_lambda:
+        try:
+            compiler = deploy_lambda.Precompiler(args.python) if args.precompile else None
+        except RuntimeError as e:
+            print(f"❌ --precompile: {e}", file=sys.stderr)
+            sys.exit(1)
+        routes = deploy_lambda.load_routes() if args.monolith else None
+        build['settings'] = deploy_lambda.load_function_settings(lambda_dir, routes)
+        cache = deploy_lambda.BuildCache(Path.cwd() / '.build-cache', 'pipeline')
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            artifacts = list(executor.map(lambda path: deploy_lambda.build_function(cache, path, compiler),
+                                          build['file_paths']))
+        build['artifacts'] = {path.stem: artifact for path, artifact in zip(build['file_paths'], artifacts)}
+        if args.monolith:
+            router_name = deploy_lambda.ROUTER_FUNCTION
+            build['artifacts'][router_name] = deploy_lambda.build_router(cache, lambda_dir, routes, compiler)
+            build['file_paths'].append(lambda_dir / f"{router_name}.py")
+        layer_dir = Path.cwd() / deploy_lambda.LAYER_DIR_NAME
+        build['layer_zip'] = deploy_lambda.build_layer(layer_dir, compiler) if layer_dir.is_dir() else None
+    if not args.skip_frontend:
+        build['frontend'] = build_frontend(frontend_dir)
+    build_seconds = time.perf_counter() - started
+    log(f"📦 Built {len(build['artifacts'] or {})} Lambda artifacts and "
+        f"{len(build['frontend'] or {})} frontend files in {build_seconds:.1f}s")
+
+    # 2) Deploy to every environment at once; clients are shared (botocore clients are thread-safe)
+    pool_size = max(10, args.workers * len(args.envs), UPLOAD_WORKERS * len(args.envs))
+    config = Config(max_pool_connections=pool_size, retries={'max_attempts': 5, 'mode': 'adaptive'})
+    clients = {
+        'lambda': boto3.client('lambda', region_name=args.region, config=config),
+        's3': boto3.client('s3', region_name=args.region, config=config)
+    }
+    account_id = boto3.client('sts').get_caller_identity()['Account']
+    role_arn = f"arn:aws:iam::{account_id}:role/LabRole"
+    table_names = deploy_lambda.load_table_names()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(args.envs)) as executor:
+        reports = list(executor.map(
+            lambda env: deploy_to_environment(env, build, clients, role_arn, table_names, args), args.envs))
+    print_report(reports, build_seconds, time.perf_counter() - started)
+
+    if any(report['error'] for report in reports):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
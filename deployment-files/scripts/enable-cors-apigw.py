@@ -1,106 +1,156 @@
 #!/usr/bin/env python3
-import boto3
 import argparse
+import importlib.util
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 
-# This script enables CORS for all resources in an existing API Gateway REST API
-# Usage: python enable_cors_apigw.py --api-id <API_ID> --region <REGION> --stage <STAGE_NAME>
+import boto3
+from botocore.config import Config
 
+# This script enables CORS for all resources in an existing API Gateway REST API
+# 1. Reads the whole API in one paginated get_resources(embed=methods) pass: every method with
+#    its method responses, integration and integration responses
+# 2. Compares it with the CORS setup (a MOCK OPTIONS method answering the preflight, the
+#    Access-Control-Allow-Origin header on the 200 response of every non-proxy method) and plans
+#    only the calls that are missing; proxy integrations set their headers in the function
+# 3. Applies the plan --workers resources at a time, retrying throttling with jittered backoff
+# 4. Creates one deployment of the stage, only when something changed
+# Usage: python3 scripts/enable-cors-apigw.py --api-id <API_ID> --region <REGION> --stage <STAGE_NAME>
+#                                             [--workers 4] [--dry-run]
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+# Same values as the OPTIONS methods apigw_to_cf.py generates, so a template-built API needs no changes
 CORS_HEADERS = {
-    'Access-Control-Allow-Headers': "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token'",
+    'Access-Control-Allow-Headers': "'Content-Type,Authorization,X-Api-Key,X-Amz-Date,X-Amz-Security-Token'",
     'Access-Control-Allow-Methods': "'GET,POST,PUT,DELETE,OPTIONS'",
     'Access-Control-Allow-Origin': "'*'"
 }
+# Preflight responses also tell browsers to reuse them for 2 hours (Chromium's cap), so a
+# page's repeated calls to the same resource send one OPTIONS request instead of one each
+CORS_MAX_AGE_SECONDS = 7200
+PREFLIGHT_HEADERS = {**CORS_HEADERS, 'Access-Control-Max-Age': f"'{CORS_MAX_AGE_SECONDS}'"}
+PROXY_INTEGRATIONS = ('AWS_PROXY', 'HTTP_PROXY')
 
 REQUEST_TEMPLATES = {
     'application/json': '{\"statusCode\": 200}'
 }
 
 
-def enable_cors_for_resource(api_client, rest_api_id, resource_id):
-    # 1) Create or ensure OPTIONS method and its responses
-    try:
-        api_client.put_method(
-            restApiId=rest_api_id,
-            resourceId=resource_id,
-            httpMethod='OPTIONS',
-            authorizationType='NONE'
-        )
-    except api_client.exceptions.ConflictException:
-        pass
-
-    try:
-        api_client.put_integration(
-            restApiId=rest_api_id,
-            resourceId=resource_id,
-            httpMethod='OPTIONS',
-            type='MOCK',
-            requestTemplates=REQUEST_TEMPLATES
-        )
-    except api_client.exceptions.ConflictException:
-        pass
-
-    try:
-        api_client.put_method_response(
-            restApiId=rest_api_id,
-            resourceId=resource_id,
-            httpMethod='OPTIONS',
-            statusCode='200',
-            responseModels={'application/json': 'Empty'},
-            responseParameters={f'method.response.header.{k}': False for k in CORS_HEADERS}
-        )
-    except api_client.exceptions.ConflictException:
-        pass
-
-    try:
-        api_client.put_integration_response(
-            restApiId=rest_api_id,
-            resourceId=resource_id,
-            httpMethod='OPTIONS',
-            statusCode='200',
-            responseParameters={f'method.response.header.{k}': v for k, v in CORS_HEADERS.items()}
-        )
-    except api_client.exceptions.ConflictException:
-        pass
-
-    # 2) Patch existing non-OPTIONS methods
-    try:
-        resource = api_client.get_resource(restApiId=rest_api_id, resourceId=resource_id)
-    except api_client.exceptions.NotFoundException:
-        return
-
-    for method_name in resource.get('resourceMethods', {}):
-        if method_name == 'OPTIONS':
+def load_deploy_lambda():
+    # deploy-lambda.py has a dash in its name, so it can't be imported directly
+    spec = importlib.util.spec_from_file_location('deploy_lambda', SCRIPT_DIR / 'deploy-lambda.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def response_parameter(header):
+    return f'method.response.header.{header}'
+
+
+def same_header_value(current, wanted):
+    # Static mappings are quoted lists; their order and case don't matter to browsers
+    def values(mapping):
+        return {value.strip().lower() for value in (mapping or '').strip("'").split(',')}
+    return current is not None and values(current) == values(wanted)
+
+
+def fetch_resources(api_client, rest_api_id):
+    """Every resource of the API with its methods embedded."""
+    paginator = api_client.get_paginator('get_resources')
+    return [
+        item
+        for page in paginator.paginate(restApiId=rest_api_id, embed=['methods'])
+        for item in page.get('items', [])
+    ]
+
+
+def plan_method_response(key, method, headers):
+    """Declare the headers on the method's 200 response: put it, or add the missing declarations."""
+    response = (method.get('methodResponses') or {}).get('200')
+    if response is None:
+        return [('put_method_response', {
+            **key,
+            'statusCode': '200',
+            'responseModels': {'application/json': 'Empty'},
+            'responseParameters': {response_parameter(h): False for h in headers}
+        })]
+    declared = response.get('responseParameters') or {}
+    missing = [response_parameter(h) for h in headers if response_parameter(h) not in declared]
+    if not missing:
+        return []
+    return [('update_method_response', {
+        **key,
+        'statusCode': '200',
+        'patchOperations': [{'op': 'add', 'path': f'/responseParameters/{name}', 'value': 'false'}
+                            for name in missing]
+    })]
+
+
+def plan_integration_response(key, integration, headers, templates=None):
+    """Map the header values on the integration's 200 response: put it, or patch the values that differ."""
+    response = ((integration or {}).get('integrationResponses') or {}).get('200')
+    values = {response_parameter(h): v for h, v in headers.items()}
+    if response is None:
+        kwargs = {**key, 'statusCode': '200', 'responseParameters': values}
+        if templates is not None:
+            kwargs['responseTemplates'] = templates
+        return [('put_integration_response', kwargs)]
+    current = response.get('responseParameters') or {}
+    operations = [
+        {'op': 'replace' if name in current else 'add', 'path': f'/responseParameters/{name}', 'value': value}
+        for name, value in values.items()
+        if not same_header_value(current.get(name), value)
+    ]
+    if not operations:
+        return []
+    return [('update_integration_response', {**key, 'statusCode': '200', 'patchOperations': operations})]
+
+
+def plan_resource(rest_api_id, resource):
+    """
+    The calls that bring one resource in line with the CORS setup, in the order they must run.
+
+    Returns:
+        list: (client method name, kwargs) pairs; empty when the resource is already set up.
+    """
+    methods = resource.get('resourceMethods') or {}
+    steps = []
+
+    # 1) OPTIONS answers the preflight itself
+    key = {'restApiId': rest_api_id, 'resourceId': resource['id'], 'httpMethod': 'OPTIONS'}
+    options = methods.get('OPTIONS')
+    if options is None:
+        steps.append(('put_method', {**key, 'authorizationType': 'NONE'}))
+        options = {}
+    integration = options.get('methodIntegration')
+    if integration is None or integration.get('type') != 'MOCK':
+        # A new integration starts without responses
+        steps.append(('put_integration', {**key, 'type': 'MOCK', 'requestTemplates': REQUEST_TEMPLATES}))
+        integration = None
+    steps += plan_method_response(key, options, PREFLIGHT_HEADERS)
+    steps += plan_integration_response(key, integration, PREFLIGHT_HEADERS)
+
+    # 2) Non-proxy methods pass Access-Control-Allow-Origin through their 200 response
+    for method_name, method in sorted(methods.items()):
+        integration = method.get('methodIntegration')
+        if method_name == 'OPTIONS' or integration is None or integration.get('type') in PROXY_INTEGRATIONS:
             continue
+        key = {'restApiId': rest_api_id, 'resourceId': resource['id'], 'httpMethod': method_name}
+        steps += plan_method_response(key, method, ['Access-Control-Allow-Origin'])
+        steps += plan_integration_response(key, integration,
+                                           {'Access-Control-Allow-Origin': CORS_HEADERS['Access-Control-Allow-Origin']},
+                                           templates={'application/json': ''})
+    return steps
+
 
-        # Ensure MethodResponse exists for status 200 with CORS header
-        try:
-            api_client.put_method_response(
-                restApiId=rest_api_id,
-                resourceId=resource_id,
-                httpMethod=method_name,
-                statusCode='200',
-                responseModels={'application/json': 'Empty'},
-                responseParameters={'method.response.header.Access-Control-Allow-Origin': False}
-            )
-        except api_client.exceptions.ConflictException:
-            pass
-        except api_client.exceptions.NotFoundException:
-            pass
-
-        # Ensure IntegrationResponse for status 200 includes CORS header
-        try:
-            api_client.put_integration_response(
-                restApiId=rest_api_id,
-                resourceId=resource_id,
-                httpMethod=method_name,
-                statusCode='200',
-                responseParameters={'method.response.header.Access-Control-Allow-Origin': CORS_HEADERS['Access-Control-Allow-Origin']},
-                responseTemplates={'application/json': ''}
-            )
-        except api_client.exceptions.ConflictException:
-            pass
-        except api_client.exceptions.NotFoundException:
-            pass
+def apply_steps(api_client, call_with_retry, steps):
+    # The steps of one resource depend on each other; resources are independent
+    for operation, kwargs in steps:
+        call_with_retry(getattr(api_client, operation), **kwargs)
+    return len(steps)
 
 
 def main():
@@ -108,34 +158,58 @@ def main():
     parser.add_argument('--api-id', required=True, help='The ID of the REST API')
     parser.add_argument('--region', default='us-east-1', help='AWS region of the REST API')
     parser.add_argument('--stage', required=True, help='Stage name to redeploy after enabling CORS')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='Resources updated in parallel (API Gateway allows a few control-plane writes per second)')
+    parser.add_argument('--dry-run', action='store_true', help='Print the planned calls without applying them')
     args = parser.parse_args()
 
-    client = boto3.client('apigateway', region_name=args.region)
-
-    # 1) Get list of resources
-    paginator = client.get_paginator('get_resources')
-    page_iterator = paginator.paginate(restApiId=args.api_id)
-
-    resource_ids = []
-    for page in page_iterator:
-        for item in page.get('items', []):
-            resource_ids.append(item['id'])
-
-    # 2) Enable CORS on each resource
-    for res_id in resource_ids:
-        print(f"Enabling CORS for resource: {res_id}")
-        enable_cors_for_resource(client, args.api_id, res_id)
+    deploy_lambda = load_deploy_lambda()
+    config = Config(max_pool_connections=max(10, args.workers), retries={'max_attempts': 5, 'mode': 'adaptive'})
+    client = boto3.client('apigateway', region_name=args.region, config=config)
+
+    # 1) Current state in one pass
+    started = time.perf_counter()
+    resources = fetch_resources(client, args.api_id)
+
+    # 2) Minimal set of changes
+    plans = {resource['path']: plan_resource(args.api_id, resource) for resource in resources}
+    plans = {path: steps for path, steps in sorted(plans.items()) if steps}
+    for path, steps in plans.items():
+        calls = ', '.join(f"{op} {kwargs['httpMethod']}" for op, kwargs in steps)
+        print(f"{path}: {calls}", file=sys.stderr)
+    total = sum(len(steps) for steps in plans.values())
+    if not plans:
+        print(f"✓ CORS already enabled on all {len(resources)} resources; no deployment needed", file=sys.stderr)
+        return
+    if args.dry_run:
+        print(f"✓ Dry run: {total} calls on {len(plans)} of {len(resources)} resources", file=sys.stderr)
+        return
 
-    # 3) Redeploy API to the specified stage
+    # 3) Apply, resources in parallel
+    failed = []
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = {path: executor.submit(apply_steps, client, deploy_lambda.call_with_retry, steps)
+                   for path, steps in plans.items()}
+        for path, future in futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                failed.append(path)
+                print(f"❌ {path}: {e}", file=sys.stderr)
+    if failed:
+        print(f"❌ CORS not enabled on {len(failed)} resources; the stage was not redeployed", file=sys.stderr)
+        sys.exit(1)
+    print(f"✓ Applied {total} calls on {len(plans)} of {len(resources)} resources in "
+          f"{time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    # 4) One deployment for all changes
     try:
-        response = client.create_deployment(
-            restApiId=args.api_id,
-            stageName=args.stage,
-            description='Enable CORS on all resources'
-        )
-        print(f"Deployment created: {response['id']}")
+        response = deploy_lambda.call_with_retry(client.create_deployment, restApiId=args.api_id,
+                                                 stageName=args.stage, description='Enable CORS on all resources')
     except Exception as e:
-        print(f"Error creating deployment: {e}")
+        print(f"❌ Error creating deployment: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(f"✅ Deployment created: {response['id']}", file=sys.stderr)
 
 
 if __name__ == '__main__':
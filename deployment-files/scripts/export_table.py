@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+import argparse
+import base64
+import csv
+import gzip
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from pathlib import Path
+
+import boto3
+from boto3.dynamodb.types import Binary, TypeDeserializer
+from botocore.config import Config
+
+# Exports a DynamoDB table with a parallel segmented scan.
+# 1. Each of --segments scan segments runs in its own worker thread
+# 2. Pages are streamed straight to that segment's output shard, one page in memory at a time
+#    (csv/parquet without --attributes: to a typed JSON spool first; once every segment is done,
+#    the spools are rewritten with the union of all attribute names as the columns, so no
+#    attribute is left out and every shard has the same columns)
+# 3. Formats: jsonl (plain JSON), ddb-json (typed DynamoDB JSON, lossless), csv, parquet
+#    (jsonl/ddb-json/csv are gzip-compressed; parquet needs pyarrow)
+# Usage: python3 scripts/export_table.py <table> <out_dir> [--env dev] [--format jsonl] [--segments 8]
+#                                        [--attributes itemID,item_name,price]
+
+FORMATS = ('jsonl', 'ddb-json', 'csv', 'parquet')
+FILE_SUFFIXES = {'jsonl': '.jsonl.gz', 'ddb-json': '.ddb.jsonl.gz', 'csv': '.csv.gz', 'parquet': '.parquet'}
+PAGE_LIMIT = 1000
+TABLE_FORMATS = ('csv', 'parquet')
+SPOOL_SUFFIX = '.spool.ddb.jsonl.gz'
+
+deserializer = TypeDeserializer()
+
+
+def to_plain(value):
+    # Decimal -> int/float, sets -> sorted lists, Binary -> base64 text
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (set, frozenset)):
+        return sorted(to_plain(v) for v in value)
+    if isinstance(value, list):
+        return [to_plain(v) for v in value]
+    if isinstance(value, dict):
+        return {k: to_plain(v) for k, v in value.items()}
+    if isinstance(value, Binary):
+        return base64.b64encode(value.value).decode()
+    return value
+
+
+def to_text(value):
+    # CSV/Parquet cells: scalars as text, nested values as JSON
+    plain = to_plain(value)
+    if isinstance(plain, (dict, list)):
+        return json.dumps(plain, sort_keys=True)
+    if isinstance(plain, bool):
+        return 'true' if plain else 'false'
+    return str(plain)
+
+
+class ShardWriter:
+    """Streams scanned pages of one segment into one output file (csv/parquet: with fixed columns)."""
+
+    def __init__(self, path, fmt, columns=None):
+        self.path = path
+        self.fmt = fmt
+        self.columns = columns
+        self.rows = 0
+        self._csv = None
+        self._parquet = None
+        if fmt == 'parquet':
+            self._file = None
+        else:
+            self._file = gzip.open(path, 'wt', newline='', compresslevel=6)
+
+    def write_page(self, raw_items):
+        if self.fmt == 'ddb-json':
+            for raw in raw_items:
+                self._file.write(json.dumps(raw, separators=(',', ':')) + '\n')
+        elif self.fmt == 'jsonl':
+            for raw in raw_items:
+                item = {k: to_plain(deserializer.deserialize(v)) for k, v in raw.items()}
+                self._file.write(json.dumps(item, separators=(',', ':')) + '\n')
+        else:
+            rows = [{k: to_text(deserializer.deserialize(v)) for k, v in raw.items()} for raw in raw_items]
+            if rows:
+                self._write_table_rows(rows)
+        self.rows += len(raw_items)
+
+    def _write_table_rows(self, rows):
+        if self.fmt == 'csv':
+            if self._csv is None:
+                self._csv = csv.DictWriter(self._file, fieldnames=self.columns, extrasaction='ignore')
+                self._csv.writeheader()
+            self._csv.writerows(rows)
+            return
+
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        schema = pa.schema([(column, pa.string()) for column in self.columns])
+        if self._parquet is None:
+            self._parquet = pq.ParquetWriter(self.path, schema, compression='zstd')
+        batch = {column: [row.get(column) for row in rows] for column in self.columns}
+        self._parquet.write_table(pa.Table.from_pydict(batch, schema=schema))
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+        if self._file is not None:
+            self._file.close()
+
+
+def export_table(table_name, out_dir, fmt='jsonl', segments=8, attributes=None, region=None, endpoint_url=None,
+                 prefix=None):
+    """
+    Export a table to one shard file per scan segment.
+
+    Args:
+        table_name (str): Full table name (e.g. dev-Items).
+        out_dir (str): Directory the shards are written to.
+        fmt (str): One of FORMATS.
+        segments (int): Number of parallel scan segments (and shards).
+        attributes (list): Optional attribute projection.
+        region (str): AWS region, defaults to the configured one.
+        endpoint_url (str): Alternative endpoint, e.g. DynamoDB Local.
+        prefix (str): Shard file name prefix, defaults to table_name.
+
+    Returns:
+        dict: rows, bytes, seconds and the list of shard paths.
+    """
+    if fmt == 'parquet':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            print("❌ Parquet output needs pyarrow (pip install pyarrow).", file=sys.stderr)
+            sys.exit(1)
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    config = Config(max_pool_connections=max(10, segments), retries={'max_attempts': 10, 'mode': 'adaptive'})
+    client = boto3.client('dynamodb', region_name=region, endpoint_url=endpoint_url, config=config)
+
+    scan_args = {'TableName': table_name, 'TotalSegments': segments, 'Limit': PAGE_LIMIT}
+    if attributes:
+        # Placeholders avoid clashes with reserved words such as "status" or "name"
+        scan_args['ProjectionExpression'] = ', '.join(f"#a{i}" for i in range(len(attributes)))
+        scan_args['ExpressionAttributeNames'] = {f"#a{i}": name for i, name in enumerate(attributes)}
+
+    progress_lock = threading.Lock()
+    progress = {'rows': 0, 'last_report': time.perf_counter()}
+    started = time.perf_counter()
+
+    # Without a projection, the columns are only known once every item has been seen
+    spool = fmt in TABLE_FORMATS and not attributes
+    columns = set()
+
+    def shard_path(segment):
+        return out_dir / f"{prefix or table_name}-{segment:03d}-of-{segments:03d}{FILE_SUFFIXES[fmt]}"
+
+    def scan_segment(segment):
+        path = shard_path(segment)
+        if spool:
+            writer = ShardWriter(path.with_name(path.name + SPOOL_SUFFIX), 'ddb-json')
+        else:
+            writer = ShardWriter(path, fmt, columns=list(attributes) if attributes else None)
+        args = dict(scan_args, Segment=segment)
+        segment_columns = set()
+        try:
+            while True:
+                page = client.scan(**args)
+                writer.write_page(page.get('Items', []))
+                if spool:
+                    segment_columns.update(k for raw in page.get('Items', []) for k in raw)
+                with progress_lock:
+                    progress['rows'] += len(page.get('Items', []))
+                    now = time.perf_counter()
+                    if now - progress['last_report'] >= 5:
+                        print(f"  • {table_name}: {progress['rows']} rows "
+                              f"({progress['rows'] / (now - started):.0f} rows/s)", file=sys.stderr)
+                        progress['last_report'] = now
+                if 'LastEvaluatedKey' not in page:
+                    break
+                args['ExclusiveStartKey'] = page['LastEvaluatedKey']
+        finally:
+            writer.close()
+        with progress_lock:
+            columns.update(segment_columns)
+        return path, writer.rows
+
+    def rewrite_spool(segment):
+        path = shard_path(segment)
+        spool_path = path.with_name(path.name + SPOOL_SUFFIX)
+        writer = ShardWriter(path, fmt, columns=sorted(columns))
+        try:
+            with gzip.open(spool_path, 'rt') as file:
+                page = []
+                for line in file:
+                    page.append(json.loads(line))
+                    if len(page) == PAGE_LIMIT:
+                        writer.write_page(page)
+                        page = []
+                writer.write_page(page)
+        finally:
+            writer.close()
+        spool_path.unlink()
+
+    with ThreadPoolExecutor(max_workers=segments) as executor:
+        results = list(executor.map(scan_segment, range(segments)))
+        if spool:
+            list(executor.map(rewrite_spool, range(segments)))
+
+    elapsed = time.perf_counter() - started
+    shards = [path for path, _ in results]
+    total_bytes = sum(path.stat().st_size for path in shards if path.exists())
+    return {
+        'rows': sum(rows for _, rows in results),
+        'bytes': total_bytes,
+        'seconds': elapsed,
+        'shards': [str(path) for path in shards]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export a DynamoDB table with a parallel segmented scan')
+    parser.add_argument('table', help='Table name (base name when --env is given, e.g. Items)')
+    parser.add_argument('out_dir', help='Directory for the output shards')
+    parser.add_argument('--env', help='EnvPrefix; the table name becomes <env>-<table>')
+    parser.add_argument('--format', choices=FORMATS, default='jsonl')
+    parser.add_argument('--segments', type=int, default=8, help='Parallel scan segments (one shard each)')
+    parser.add_argument('--attributes', help='Comma-separated attribute projection')
+    parser.add_argument('--region', default=None, help='AWS region')
+    parser.add_argument('--endpoint-url', default=None, help='DynamoDB endpoint, e.g. http://localhost:8000')
+    args = parser.parse_args()
+
+    table_name = f"{args.env}-{args.table}" if args.env else args.table
+    attributes = [a.strip() for a in args.attributes.split(',') if a.strip()] if args.attributes else None
+
+    print(f"Exporting {table_name} → {args.out_dir} ({args.format}, {args.segments} segments)", file=sys.stderr)
+    result = export_table(table_name, args.out_dir, fmt=args.format, segments=args.segments,
+                          attributes=attributes, region=args.region, endpoint_url=args.endpoint_url)
+    rate = result['rows'] / result['seconds'] if result['seconds'] else 0
+    print(f"✅ {result['rows']} rows, {result['bytes'] / 1e6:.1f} MB in {result['seconds']:.1f}s "
+          f"({rate:.0f} rows/s) across {len(result['shards'])} shards", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
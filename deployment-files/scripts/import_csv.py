@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+# Bulk-loads a CSV file into a DynamoDB table.
+# 1. Streams the CSV and coerces each column using an optional schema (S, N, BOOL, DATE)
+# 2. Writes 25-item BatchWriteItem chunks across a pool of worker threads
+# 3. Retries UnprocessedItems and throttling errors with jittered exponential backoff
+# 4. Checkpoints the number of rows written, so an interrupted load can --resume
+# Usage: python3 scripts/import_csv.py <csv_file> <table> [--env dev] [--schema schema.json] [--resume]
+
+BATCH_SIZE = 25
+MAX_ATTEMPTS = 10
+BACKOFF_BASE = 0.05
+BACKOFF_MAX = 5.0
+THROTTLING_ERRORS = ('ProvisionedThroughputExceededException', 'ThrottlingException', 'RequestLimitExceeded')
+TRUE_VALUES = ('true', '1', 'yes', 'y', 't')
+FALSE_VALUES = ('false', '0', 'no', 'n', 'f', '')
+
+
+def coerce_value(value, attr_type):
+    """
+    Convert a CSV string to the Python type boto3 serializes as the given DynamoDB type.
+
+    Args:
+        value (str): Raw CSV value.
+        attr_type (str): One of 'S', 'N', 'BOOL' or 'DATE'.
+
+    Returns:
+        The converted value, or None when the attribute should be omitted.
+    """
+    if attr_type == 'S':
+        return value
+    value = value.strip()
+    if attr_type == 'N':
+        return Decimal(value) if value else None
+    if attr_type == 'BOOL':
+        lowered = value.lower()
+        if lowered in TRUE_VALUES:
+            return True
+        if lowered in FALSE_VALUES:
+            return False
+        raise ValueError(f"not a boolean: {value!r}")
+    if attr_type == 'DATE':
+        # Stored the way the handlers write dates: YYYY-MM-DDTHH:MM:SS
+        return datetime.fromisoformat(value).strftime('%Y-%m-%dT%H:%M:%S') if value else None
+    raise ValueError(f"unknown schema type: {attr_type}")
+
+
+def coerce_row(row, schema):
+    item = {}
+    for column, value in row.items():
+        if column is None or value is None:
+            continue
+        converted = coerce_value(value, schema.get(column, 'S'))
+        if converted is not None:
+            item[column] = converted
+    return item
+
+
+def chunked(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class BulkWriter:
+    """
+    Parallel BatchWriteItem loader shared by the import and restore tools.
+
+    write_chunk() is thread-safe; every chunk is retried until DynamoDB has
+    accepted all of its items or MAX_ATTEMPTS is exhausted.
+    """
+
+    def __init__(self, table_name, region=None, workers=8):
+        config = Config(max_pool_connections=max(10, workers * 2), retries={'max_attempts': 3, 'mode': 'standard'})
+        self.dynamodb = boto3.resource('dynamodb', region_name=region, config=config)
+        self.table_name = table_name
+        self.workers = workers
+        self.key_names = [key['AttributeName'] for key in self.dynamodb.Table(table_name).key_schema]
+        self.lock = threading.Lock()
+        self.retries = 0
+
+    def _dedupe(self, items):
+        # BatchWriteItem rejects a request that contains the same key twice; keep the last row
+        by_key = {}
+        for item in items:
+            by_key[tuple(str(item.get(k)) for k in self.key_names)] = item
+        return list(by_key.values())
+
+    def write_chunk(self, items):
+        requests = [{'PutRequest': {'Item': item}} for item in self._dedupe(items)]
+        attempt = 0
+        while requests:
+            try:
+                response = self.dynamodb.batch_write_item(RequestItems={self.table_name: requests})
+                requests = response.get('UnprocessedItems', {}).get(self.table_name, [])
+            except ClientError as e:
+                if e.response['Error']['Code'] not in THROTTLING_ERRORS:
+                    raise
+            if not requests:
+                break
+            attempt += 1
+            if attempt >= MAX_ATTEMPTS:
+                raise RuntimeError(f"{len(requests)} items still unprocessed after {MAX_ATTEMPTS} attempts")
+            with self.lock:
+                self.retries += 1
+            # Full jitter keeps parallel workers from retrying in lockstep
+            time.sleep(random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt)))
+        return len(items)
+
+    def write_all(self, chunks, on_chunk_done=None):
+        """
+        Write an iterable of chunks with at most 2 * workers chunks in flight.
+
+        on_chunk_done(index, count) is called from the calling thread as chunks finish.
+        """
+        in_flight = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for index, chunk in enumerate(chunks):
+                if len(in_flight) >= self.workers * 2:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    self._collect(done, in_flight, on_chunk_done)
+                in_flight[executor.submit(self.write_chunk, chunk)] = index
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                self._collect(done, in_flight, on_chunk_done)
+
+    @staticmethod
+    def _collect(done, in_flight, on_chunk_done):
+        for future in done:
+            index = in_flight.pop(future)
+            count = future.result()
+            if on_chunk_done:
+                on_chunk_done(index, count)
+
+
+class Checkpoint:
+    """
+    Tracks the number of leading CSV rows known to be written.
+
+    Chunks finish out of order, so only the contiguous prefix of finished
+    chunks is recorded; a resumed load may rewrite a few chunks, which is
+    harmless because PutRequest is idempotent.
+    """
+
+    def __init__(self, path, source, table_name, start_row):
+        self.path = Path(path)
+        self.source = str(source)
+        self.table_name = table_name
+        self.rows_done = start_row
+        self.finished = {}
+        self.next_index = 0
+        self.last_saved = 0.0
+
+    @classmethod
+    def load_start_row(cls, path, source, table_name):
+        path = Path(path)
+        if not path.is_file():
+            return 0
+        data = json.loads(path.read_text())
+        if data.get('source') != str(source) or data.get('table') != table_name:
+            print(f"❌ Checkpoint {path} belongs to {data.get('source')} → {data.get('table')}", file=sys.stderr)
+            sys.exit(1)
+        return data['rows_done']
+
+    def chunk_done(self, index, count):
+        self.finished[index] = count
+        while self.next_index in self.finished:
+            self.rows_done += self.finished.pop(self.next_index)
+            self.next_index += 1
+        if time.monotonic() - self.last_saved > 2:
+            self.save()
+
+    def save(self):
+        tmp_path = self.path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps({'source': self.source, 'table': self.table_name, 'rows_done': self.rows_done}))
+        os.replace(tmp_path, self.path)
+        self.last_saved = time.monotonic()
+
+
+def import_csv_to_dynamodb(csv_file, table_name, schema=None, workers=8, region=None, resume=False,
+                           checkpoint_path=None):
+    """
+    Imports data from a CSV file into a specified DynamoDB table.
+
+    Args:
+        csv_file (str): Path to the CSV file.
+        table_name (str): Name of the DynamoDB table.
+        schema (dict): Column name -> 'S' | 'N' | 'BOOL' | 'DATE'; unlisted columns stay strings.
+        workers (int): Number of parallel BatchWriteItem workers.
+        region (str): AWS region, defaults to the configured one.
+        resume (bool): Skip the rows recorded in the checkpoint file.
+        checkpoint_path (str): Defaults to <csv_file>.checkpoint.json.
+
+    Returns:
+        int: Number of rows written by this run.
+    """
+    schema = schema or {}
+    checkpoint_path = checkpoint_path or f"{csv_file}.checkpoint.json"
+    start_row = Checkpoint.load_start_row(checkpoint_path, csv_file, table_name) if resume else 0
+    checkpoint = Checkpoint(checkpoint_path, csv_file, table_name, start_row)
+    writer = BulkWriter(table_name, region=region, workers=workers)
+
+    started = time.perf_counter()
+    last_report = [started]
+
+    def on_chunk_done(index, count):
+        checkpoint.chunk_done(index, count)
+        now = time.perf_counter()
+        if now - last_report[0] >= 5:
+            written = checkpoint.rows_done - start_row
+            print(f"  • {checkpoint.rows_done} rows written ({written / (now - started):.0f} rows/s)", file=sys.stderr)
+            last_report[0] = now
+
+    with open(csv_file, 'r', newline='') as file:
+        reader = csv.DictReader(file)
+        rows = (coerce_row(row, schema) for line_no, row in enumerate(reader) if line_no >= start_row)
+        if start_row:
+            print(f"Resuming after {start_row} rows", file=sys.stderr)
+        try:
+            writer.write_all(chunked(rows, BATCH_SIZE), on_chunk_done)
+        finally:
+            checkpoint.save()
+
+    elapsed = time.perf_counter() - started
+    written = checkpoint.rows_done - start_row
+    print(f"✅ Imported {written} rows into {table_name} in {elapsed:.1f}s "
+          f"({written / elapsed if elapsed else 0:.0f} rows/s, {writer.retries} retried batches)", file=sys.stderr)
+    Path(checkpoint_path).unlink(missing_ok=True)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk-import a CSV file into a DynamoDB table')
+    parser.add_argument('csv_file', help='Path to the CSV file')
+    parser.add_argument('table', help='Table name (base name when --env is given, e.g. Items)')
+    parser.add_argument('--env', help='EnvPrefix; the table name becomes <env>-<table>')
+    parser.add_argument('--schema', help='JSON file mapping column names to S, N, BOOL or DATE')
+    parser.add_argument('--workers', type=int, default=8, help='Parallel BatchWriteItem workers')
+    parser.add_argument('--region', default=None, help='AWS region')
+    parser.add_argument('--resume', action='store_true', help='Continue from the last checkpoint')
+    args = parser.parse_args()
+
+    table_name = f"{args.env}-{args.table}" if args.env else args.table
+    schema = json.loads(Path(args.schema).read_text()) if args.schema else {}
+    import_csv_to_dynamodb(args.csv_file, table_name, schema=schema, workers=args.workers,
+                           region=args.region, resume=args.resume)
+
+
+if __name__ == '__main__':
+    main()
+
+# aws s3api list-objects --bucket kashishop --prefix images/item-images --output text | awk '{print "https://" $3}'
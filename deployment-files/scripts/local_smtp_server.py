@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+import argparse
+import socketserver
+import threading
+import time
+
+# In-process SMTP stand-in for exercising send_mail and the mail outbox locally.
+# Speaks enough SMTP for smtplib (EHLO, AUTH PLAIN, MAIL/RCPT/DATA, NOOP, RSET, QUIT),
+# accepts any credentials, never does TLS (run handlers with SMTP_STARTTLS=false),
+# can add a per-reply delay to simulate the round trips to a real server, and can
+# answer the next N messages with a temporary failure to exercise retries.
+# Usage: python3 scripts/local_smtp_server.py [--port 1025] [--rtt-ms 0]
+
+
+class _SmtpHandler(socketserver.StreamRequestHandler):
+
+    def _reply(self, text):
+        if self.server.rtt:
+            time.sleep(self.server.rtt)
+        self.wfile.write(text.encode() + b"\r\n")
+
+    def handle(self):
+        with self.server.lock:
+            self.server.connections += 1
+            self.server.open_sockets.add(self.connection)
+        try:
+            self._session()
+        except OSError:
+            pass
+        finally:
+            with self.server.lock:
+                self.server.open_sockets.discard(self.connection)
+
+    def _session(self):
+        self._reply("220 localhost local SMTP stand-in")
+        sender, recipients = None, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors='replace').strip()
+            verb = command.split(' ', 1)[0].upper()
+
+            if verb in ('EHLO', 'HELO'):
+                self._reply("250-localhost\r\n250-AUTH PLAIN\r\n250 8BITMIME")
+            elif verb == 'AUTH':
+                with self.server.lock:
+                    self.server.logins += 1
+                self._reply("235 2.7.0 Authentication successful")
+            elif verb == 'MAIL':
+                sender, recipients = command[10:].strip('<> '), []
+                self._reply("250 OK")
+            elif verb == 'RCPT':
+                recipients.append(command[8:].strip('<> '))
+                self._reply("250 OK")
+            elif verb == 'DATA':
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                while True:
+                    data_line = self.rfile.readline()
+                    if not data_line or data_line in (b".\r\n", b".\n"):
+                        break
+                    lines.append(data_line)
+                with self.server.lock:
+                    rejected = self.server.pending_failures > 0
+                    if rejected:
+                        self.server.pending_failures -= 1
+                    else:
+                        self.server.messages.append((sender, recipients, b"".join(lines)))
+                if rejected:
+                    self._reply("451 4.3.0 Temporary local failure")
+                else:
+                    self._reply("250 OK queued")
+            elif verb in ('NOOP', 'RSET'):
+                self._reply("250 OK")
+            elif verb == 'QUIT':
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("502 Command not implemented")
+
+
+class LocalSmtpServer(socketserver.ThreadingTCPServer):
+    """Threaded SMTP stand-in; start() runs it in the background and returns the bound port."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0, rtt_ms=0):
+        super().__init__((host, port), _SmtpHandler)
+        self.rtt = rtt_ms / 1000
+        self.lock = threading.Lock()
+        self.messages = []
+        self.connections = 0
+        self.logins = 0
+        self.open_sockets = set()
+        self.pending_failures = 0
+
+    def fail_next(self, count):
+        with self.lock:
+            self.pending_failures += count
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self.server_address[1]
+
+    def drop_connections(self):
+        # Simulate the server closing idle sessions
+        with self.lock:
+            for sock in list(self.open_sockets):
+                try:
+                    sock.shutdown(2)
+                except OSError:
+                    pass
+            self.open_sockets.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a local SMTP stand-in')
+    parser.add_argument('--port', type=int, default=1025)
+    parser.add_argument('--rtt-ms', type=float, default=0, help='Delay before every reply')
+    args = parser.parse_args()
+
+    server = LocalSmtpServer(port=args.port, rtt_ms=args.rtt_ms)
+    print(f"Local SMTP stand-in listening on 127.0.0.1:{args.port} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(f"Received {len(server.messages)} messages over {server.connections} connections")
+
+
+if __name__ == '__main__':
+    main()
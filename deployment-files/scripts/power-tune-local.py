@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+import argparse
+import ast
+import importlib.util
+import json
+import math
+import os
+import random
+import re
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import yaml
+
+# Local power tuning for the Lambda handlers
+# 1. Creates the tables of ../templates/dynamodb-template.yaml in moto's in-process AWS and
+#    seeds them with synthetic rows, or with a snapshot written by snapshot_env.py
+# 2. Imports each handler (its init) and invokes it with the events in power-tune-events.json,
+#    recording CPU time, peak Python memory and the number of AWS calls
+# 3. Models the duration per memory size (Lambda allocates CPU in proportion to memory, one
+#    vCPU at 1769 MB, and every AWS call adds --call-ms) and suggests memory, timeout and
+#    architecture; reserved concurrency depends on traffic and is left as configured
+# 4. Compares the suggestions with lambda/functions.yaml and the deployed values in
+#    lambda_full.json, and prints the changed entries as functions.yaml overrides on stdout
+# CPU spent inside AWS calls (moto emulating DynamoDB) does not count as handler CPU time.
+# Needs moto (pip install moto).
+# Usage: python3 scripts/power-tune-local.py [get_items get_user_by_id ...] [--items 2000] [--runs 5]
+#                                            [--snapshot snapshots/dev] [--output report.json]
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+ROOT_DIR = SCRIPT_DIR.parent
+LAMBDA_DIR = ROOT_DIR / 'lambda'
+EVENTS_PATH = SCRIPT_DIR / 'power-tune-events.json'
+LAMBDA_EXPORT_PATH = ROOT_DIR.parent / 'lambda_full.json'
+ENV_PREFIX = 'tune'
+REGION = 'us-east-1'
+
+FULL_VCPU_MB = 1769
+MEMORY_STEPS = (128, 256, 512, 768, 1024, 1536, 1769, 2048, 3008)
+# us-east-1 price per GB-second
+GB_SECOND_PRICE = {'arm64': 0.0000133334, 'x86_64': 0.0000166667}
+MEMORY_HEADROOM = 1.5
+# Timeout = cold start + this many times the estimated warm duration
+TIMEOUT_FACTOR = 5
+API_TIMEOUT_LIMIT = 29
+# Packages every handler may import without tying it to an architecture
+RUNTIME_PACKAGES = {'boto3', 'botocore', 'kashishop_common'}
+# create_table arguments taken from the template (streams and TTL play no part in the profile)
+TABLE_PROPERTIES = ('AttributeDefinitions', 'KeySchema', 'GlobalSecondaryIndexes', 'LocalSecondaryIndexes',
+                    'BillingMode', 'ProvisionedThroughput')
+MB = 1024 * 1024
+
+
+def load_script(file_name, module_name):
+    # The deploy scripts have dashes in their names, so they can't be imported directly
+    spec = importlib.util.spec_from_file_location(module_name, SCRIPT_DIR / file_name)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# Also puts lambda_layer/ on sys.path, as /opt/python is in Lambda
+deploy_lambda = load_script('deploy-lambda.py', 'deploy_lambda')
+
+
+class CallMeter:
+    """Counts AWS API calls and the CPU time spent inside them."""
+
+    def __init__(self):
+        self.calls = 0
+        self.cpu = 0.0
+
+    def install(self):
+        from botocore.client import BaseClient
+        original = BaseClient._make_api_call
+        meter = self
+
+        def metered(client, operation_name, api_params):
+            started = time.process_time()
+            try:
+                return original(client, operation_name, api_params)
+            finally:
+                meter.calls += 1
+                meter.cpu += time.process_time() - started
+
+        BaseClient._make_api_call = metered
+
+    def measure(self, fn, trace_memory=False):
+        """Run fn; returns (result, handler CPU seconds, AWS calls, peak traced bytes)."""
+        self.calls, self.cpu = 0, 0.0
+        if trace_memory:
+            tracemalloc.start()
+        started = time.process_time()
+        try:
+            result = fn()
+        finally:
+            cpu = time.process_time() - started - self.cpu
+            peak = tracemalloc.get_traced_memory()[1] if trace_memory else 0
+            if trace_memory:
+                tracemalloc.stop()
+        return result, max(cpu, 0.0), self.calls, peak
+
+
+def runtime_baseline():
+    """CPU seconds and peak RSS (MB) of a fresh interpreter that imports boto3 and creates a resource."""
+    code = (
+        "import resource, time\n"
+        "started = time.process_time()\n"
+        "import boto3\n"
+        f"boto3.resource('dynamodb', region_name='{REGION}')\n"
+        "print(time.process_time() - started, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)\n"
+    )
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    cpu, max_rss = output.split()
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    return float(cpu), int(max_rss) / (MB if sys.platform == 'darwin' else 1024)
+
+
+def create_tables(dynamodb_client):
+    template = yaml.safe_load((ROOT_DIR / 'templates' / 'dynamodb-template.yaml').read_text())
+    names = []
+    for resource in template.get('Resources', {}).values():
+        if resource.get('Type') != 'AWS::DynamoDB::Table':
+            continue
+        props = resource['Properties']
+        base = re.match(r"\$\{EnvPrefix\}-(?P<base>.+)", props['TableName']['Fn::Sub']).group('base')
+        args = {key: props[key] for key in TABLE_PROPERTIES if key in props}
+        if args.get('BillingMode') == 'PAY_PER_REQUEST':
+            # CloudFormation tolerates the 0-capacity placeholders on on-demand indexes; the API doesn't
+            args['GlobalSecondaryIndexes'] = [{k: v for k, v in index.items() if k != 'ProvisionedThroughput'}
+                                              for index in args.get('GlobalSecondaryIndexes', [])] or None
+            args = {key: value for key, value in args.items() if value is not None}
+        dynamodb_client.create_table(TableName=f"{ENV_PREFIX}-{base}", **args)
+        names.append(base)
+    return names
+
+
+def synthetic_rows(users, items, transactions, seed=7):
+    rng = random.Random(seed)
+    user_rows = [
+        {
+            'username': f"user{n:05d}",
+            'userID': f"sub-{n:05d}",
+            'email': f"user{n:05d}@example.com",
+            'name': f"User {n}",
+            'phone_number': f"+97250{n:07d}",
+            'picture': f"https://kashishop2.s3.amazonaws.com/images/profile-photos/user{n:05d}.jpg",
+            'creationDate': f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T12:00:00",
+            'isActive': 'true'
+        }
+        for n in range(users)
+    ]
+    item_rows = [
+        {
+            'itemID': f"item-{n:06d}",
+            'item_name': f"Item {n}",
+            'seller': rng.choice(user_rows)['userID'],
+            # Stored as text, like add_item/update_item write it
+            'price': str(rng.randint(1, 500)),
+            'creationDate': f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T12:00:00",
+            'image': f"https://kashishop2.s3.amazonaws.com/images/item-images/item-{n:06d}.jpg",
+            'item_description': ' '.join(rng.choice(('used', 'new', 'great', 'vintage', 'cheap', 'mint'))
+                                         for _ in range(rng.randint(5, 40))),
+            'isActive': 'true',
+            'isSold': 'false'
+        }
+        for n in range(items)
+    ]
+    transaction_rows = []
+    for n in range(transactions):
+        item = rng.choice(item_rows)
+        transaction_rows.append({
+            'transactionID': f"tx-{n:06d}",
+            'ItemID': item['itemID'],
+            'sellerID': item['seller'],
+            'buyerID': rng.choice(user_rows)['userID'],
+            'price': item['price'],
+            'status': rng.choice(('pending', 'accepted', 'rejected')),
+            'transactionDate': f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T12:00:00"
+        })
+    return {'Users': user_rows, 'Items': item_rows, 'TransactionHistory': transaction_rows}
+
+
+def snapshot_rows(snapshot_dir):
+    from boto3.dynamodb.types import TypeDeserializer
+    from snapshot_env import load_manifest, read_shard
+
+    deserializer = TypeDeserializer()
+    manifest = load_manifest(snapshot_dir)
+    return {
+        table: [
+            {k: deserializer.deserialize(v) for k, v in raw.items()}
+            for shard in info['shards'] for raw in read_shard(Path(snapshot_dir) / shard)
+        ]
+        for table, info in manifest['tables'].items()
+    }
+
+
+def seed_tables(dynamodb, rows):
+    for table, table_rows in rows.items():
+        with dynamodb.Table(f"{ENV_PREFIX}-{table}").batch_writer() as batch:
+            for row in table_rows:
+                batch.put_item(Item=row)
+
+
+def sample_ids(rows):
+    """IDs for the event placeholders: a seller with items and a pending offer, where the data has one."""
+    transactions = rows.get('TransactionHistory', [])
+    transaction = next((t for t in transactions if t.get('status') == 'pending'), transactions[0] if transactions else {})
+    items = rows.get('Items', [])
+    seller_id = transaction.get('sellerID') or (items[0].get('seller', '') if items else '')
+    users = rows.get('Users', [])
+    user = next((u for u in users if u.get('userID') == seller_id), users[0] if users else {})
+    item = next((i for i in items if i.get('seller') == seller_id), items[0] if items else {})
+    return {
+        'userID': user.get('userID', ''),
+        'username': user.get('username', ''),
+        'sellerID': seller_id,
+        'itemID': item.get('itemID', ''),
+        'buyerID': transaction.get('buyerID', ''),
+        'transactionID': transaction.get('transactionID', '')
+    }
+
+
+def load_events(path, ids):
+    events = json.loads(Path(path).read_text())
+    events.pop('_comment', None)
+    filled = {}
+    for name, event in events.items():
+        text = json.dumps(event)
+        for key, value in ids.items():
+            text = text.replace(f"{{{key}}}", value)
+        filled[name] = json.loads(text)
+    return filled
+
+
+def third_party_imports(path):
+    """Top-level packages the handler imports beyond the stdlib, boto3 and the shared layer."""
+    roots = set()
+    for node in ast.walk(ast.parse(path.read_text(encoding='utf-8'))):
+        if isinstance(node, ast.Import):
+            roots.update(alias.name.split('.')[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            roots.add(node.module.split('.')[0])
+    return sorted(roots - set(sys.stdlib_module_names) - RUNTIME_PACKAGES)
+
+
+def import_handler(name, path):
+    spec = importlib.util.spec_from_file_location(f"power_tune_{name}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def profile_handler(meter, name, path, event, runs):
+    """
+    Measure one handler: a cold init plus first call, then `runs` warm calls.
+
+    CPU is measured without tracemalloc (which slows Python down); peak memory is
+    measured on separate traced runs.
+    """
+    module, init_cpu, init_calls, _ = meter.measure(lambda: import_handler(name, path))
+    _, _, _, init_peak = meter.measure(lambda: import_handler(name, path), trace_memory=True)
+    handler = module.lambda_handler
+
+    response, first_cpu, first_calls, _ = meter.measure(lambda: handler(event, None))
+    warm = [meter.measure(lambda: handler(event, None)) for _ in range(runs)]
+    _, _, _, invoke_peak = meter.measure(lambda: handler(event, None), trace_memory=True)
+
+    status = response.get('statusCode') if isinstance(response, dict) else None
+    return {
+        'name': name,
+        'status': status,
+        'initCpu': init_cpu,
+        'initCalls': init_calls,
+        'firstCpu': first_cpu,
+        'firstCalls': first_calls,
+        'cpu': statistics.median(cpu for _, cpu, _, _ in warm),
+        'calls': round(statistics.median(calls for _, _, calls, _ in warm)),
+        'initPeak': init_peak,
+        'invokePeak': invoke_peak,
+        'api': 'httpMethod' in event
+    }
+
+
+def estimate_ms(cpu_seconds, calls, memory, args):
+    return cpu_seconds * 1000 * args.cpu_scale * max(1.0, FULL_VCPU_MB / memory) + calls * args.call_ms
+
+
+def recommend(profile, settings, baseline, args, path):
+    """Suggested settings and the model's estimates for one profiled handler."""
+    baseline_cpu, baseline_mb = baseline
+    used_mb = baseline_mb + (profile['initPeak'] + profile['invokePeak']) / MB
+    candidates = [m for m in MEMORY_STEPS if m >= used_mb * MEMORY_HEADROOM] or [MEMORY_STEPS[-1]]
+    durations = {m: estimate_ms(profile['cpu'], profile['calls'], m, args) for m in candidates}
+    init = {m: estimate_ms(baseline_cpu + profile['initCpu'], profile['initCalls'], m, args) for m in candidates}
+    # Sizes whose init meets the target (or, failing that, is near the best possible)
+    init_enough = [m for m in candidates if init[m] <= args.init_target_ms] or \
+        [m for m in candidates if init[m] <= min(init.values()) * 1.1]
+    best_warm = min(durations[m] for m in init_enough)
+    # Smallest of those that meets the warm target, else the smallest within 10% of the fastest
+    memory = next((m for m in init_enough if durations[m] <= args.target_ms), None) or \
+        next(m for m in init_enough if durations[m] <= best_warm * 1.1)
+    # A cold request pays the init plus a first call, which also creates clients and connections
+    cold_ms = init[memory] + estimate_ms(profile['firstCpu'], profile['firstCalls'], memory, args)
+    timeout = max(3, math.ceil((cold_ms + durations[memory] * TIMEOUT_FACTOR) / 1000))
+    if profile['api']:
+        timeout = min(timeout, API_TIMEOUT_LIMIT)
+
+    # Pure-Python handlers run anywhere; others need a layer built for their architecture
+    native = third_party_imports(path)
+    architecture = settings['architecture'] if native else 'arm64'
+    billed_seconds = math.ceil(durations[memory]) / 1000
+    return {
+        'settings': {**settings, 'memory': memory, 'timeout': timeout, 'architecture': architecture},
+        'usedMb': used_mb,
+        'warmMs': durations[memory],
+        'coldMs': cold_ms,
+        'costPerMillion': GB_SECOND_PRICE[architecture] * memory / 1024 * billed_seconds * 1e6,
+        'nativeImports': native
+    }
+
+
+def deployed_settings(path):
+    """Memory, timeout and architecture per function from a get-lambda.sh export."""
+    if not path or not Path(path).is_file():
+        return {}
+    deployed = {}
+    for entry in json.loads(Path(path).read_text()):
+        configuration = entry.get('configuration') or {}
+        if 'MemorySize' in configuration:
+            deployed[entry['functionName']] = {
+                'memory': configuration['MemorySize'],
+                'timeout': configuration.get('Timeout'),
+                'architecture': (configuration.get('Architectures') or ['x86_64'])[0]
+            }
+    return deployed
+
+
+def describe(settings):
+    if not settings:
+        return '-'
+    return f"{settings['memory']}MB/{settings['timeout']}s/{settings['architecture']}"
+
+
+def print_report(results, deployed, baseline):
+    print(f"Runtime init (import boto3 + resource): {baseline[0] * 1000:.0f} ms CPU, {baseline[1]:.0f} MB RSS",
+          file=sys.stderr)
+    print("----------------------------------------", file=sys.stderr)
+    print(f"{'Function':<30}{'CPU ms':>8}{'Calls':>7}{'Peak MB':>9}  {'Deployed':<20}{'Configured':<20}"
+          f"{'Suggested':<20}{'Warm ms':>8}{'Cold ms':>8}{'$/1M':>8}", file=sys.stderr)
+    for result in results:
+        profile, suggestion = result['profile'], result['suggestion']
+        peak_mb = (profile['initPeak'] + profile['invokePeak']) / MB
+        print(f"{profile['name']:<30}{profile['cpu'] * 1000:>8.1f}{profile['calls']:>7}{peak_mb:>9.1f}  "
+              f"{describe(deployed.get(profile['name'])):<20}{describe(result['configured']):<20}"
+              f"{describe(suggestion['settings']):<20}{suggestion['warmMs']:>8.0f}{suggestion['coldMs']:>8.0f}"
+              f"{suggestion['costPerMillion']:>8.2f}", file=sys.stderr)
+        if profile['status'] and profile['status'] >= 400:
+            print(f"  ⚠️ {profile['name']} answered {profile['status']}; check its event", file=sys.stderr)
+        if suggestion['nativeImports']:
+            print(f"  • {profile['name']} imports {', '.join(suggestion['nativeImports'])}; "
+                  f"architecture kept as configured", file=sys.stderr)
+    print("----------------------------------------", file=sys.stderr)
+
+
+def print_overrides(results, defaults):
+    # Only the values that differ from the functions.yaml defaults
+    overrides = {}
+    for result in results:
+        changed = {key: value for key, value in result['suggestion']['settings'].items() if value != defaults[key]}
+        if changed:
+            overrides[result['profile']['name']] = changed
+    print(yaml.safe_dump({'functions': overrides}, sort_keys=False, default_flow_style=False), end='')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Profile the Lambda handlers locally and suggest their settings')
+    parser.add_argument('functions', nargs='*', help='Handlers to profile (default: every handler with an event)')
+    parser.add_argument('--events', default=str(EVENTS_PATH), help='JSON file of events per handler')
+    parser.add_argument('--runs', type=int, default=5, help='Warm invocations per handler')
+    parser.add_argument('--users', type=int, default=200, help='Synthetic Users rows')
+    parser.add_argument('--items', type=int, default=2000, help='Synthetic Items rows')
+    parser.add_argument('--transactions', type=int, default=1000, help='Synthetic TransactionHistory rows')
+    parser.add_argument('--snapshot', default=None, help='Seed from a snapshot_env.py directory instead')
+    parser.add_argument('--call-ms', type=float, default=8.0, help='Assumed latency of one AWS call in Lambda')
+    parser.add_argument('--cpu-scale', type=float, default=1.0,
+                        help='Lambda vCPU time per local CPU second (calibrate against CloudWatch durations)')
+    parser.add_argument('--target-ms', type=float, default=200.0, help='Warm duration to size memory for')
+    parser.add_argument('--init-target-ms', type=float, default=3000.0,
+                        help='Init duration (runtime and handler imports) to size memory for')
+    parser.add_argument('--lambda-export', default=str(LAMBDA_EXPORT_PATH),
+                        help='get-lambda.sh export with the deployed settings')
+    parser.add_argument('--output', default=None, help='Write the full report as JSON')
+    args = parser.parse_args()
+
+    try:
+        from moto import mock_aws
+    except ImportError:
+        print("❌ The local harness needs moto (pip install moto).", file=sys.stderr)
+        sys.exit(1)
+
+    baseline = runtime_baseline()
+    function_settings = deploy_lambda.load_function_settings(LAMBDA_DIR)
+    defaults = {**deploy_lambda.DEFAULT_SETTINGS,
+                **(yaml.safe_load((LAMBDA_DIR / deploy_lambda.FUNCTION_SETTINGS_FILE).read_text()) or {})
+                .get('defaults', {})}
+
+    # Credentials and resource names the handlers read at import time
+    os.environ.update({'AWS_ACCESS_KEY_ID': 'testing', 'AWS_SECRET_ACCESS_KEY': 'testing',
+                       'AWS_DEFAULT_REGION': REGION, 'USER_POOL_ID': '', 'BUCKET_NAME': f"{ENV_PREFIX}-kashishop2"})
+    os.environ.pop('AWS_PROFILE', None)
+
+    meter = CallMeter()
+    meter.install()
+    results = []
+    with mock_aws():
+        import boto3
+        tables = create_tables(boto3.client('dynamodb', region_name=REGION))
+        os.environ.update({deploy_lambda.table_env_var(table): f"{ENV_PREFIX}-{table}" for table in tables})
+        # deploy-lambda.py imported kashishop_common.config before these were set
+        importlib.reload(sys.modules['kashishop_common.config'])
+        rows = snapshot_rows(args.snapshot) if args.snapshot else \
+            synthetic_rows(args.users, args.items, args.transactions)
+        seed_tables(boto3.resource('dynamodb', region_name=REGION), rows)
+        print(f"Seeded {', '.join(f'{table} {len(r)}' for table, r in rows.items())}", file=sys.stderr)
+
+        events = load_events(args.events, sample_ids(rows))
+        names = args.functions or sorted(name for name in events if (LAMBDA_DIR / f"{name}.py").is_file())
+        for name in names:
+            path = LAMBDA_DIR / f"{name}.py"
+            if name not in events or not path.is_file():
+                print(f"  ⚠️ {name}: no handler or no event in {args.events}, skipped", file=sys.stderr)
+                continue
+            try:
+                profile = profile_handler(meter, name, path, events[name], args.runs)
+            except Exception as e:
+                print(f"  ❌ {name}: {type(e).__name__}: {e}", file=sys.stderr)
+                continue
+            configured = function_settings.get(name, deploy_lambda.DEFAULT_SETTINGS)
+            results.append({'profile': profile, 'configured': configured,
+                            'suggestion': recommend(profile, configured, baseline, args, path)})
+            print(f"  • {name}: {profile['cpu'] * 1000:.1f} ms CPU, {profile['calls']} AWS calls", file=sys.stderr)
+
+    print_report(results, deployed_settings(args.lambda_export), baseline)
+    print_overrides(results, defaults)
+    if args.output:
+        Path(args.output).write_text(json.dumps(
+            {'runtimeBaseline': {'cpu': baseline[0], 'rssMb': baseline[1]}, 'functions': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
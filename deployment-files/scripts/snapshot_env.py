@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+import argparse
+import gzip
+import importlib.util
+import json
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+import boto3
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+from export_table import export_table
+from import_csv import BulkWriter, BATCH_SIZE, chunked
+
+# Snapshots and restores the data of a Kashishop environment.
+#
+#   snapshot <env> <dir>   Exports Items, TransactionHistory and Users as typed DynamoDB JSON
+#                          shards (parallel segmented scan) and records every S3 image
+#                          the rows reference; --with-images also downloads those images.
+#   restore <dir> <env>    Bulk-loads all tables of a snapshot into <env>-<Table> at once,
+#                          copies the referenced images into <env>-kashishop2 and points
+#                          the image URLs in the restored rows at that bucket.
+#
+# Snapshot layout:
+#   manifest.json                      tables, row counts, shard files, image keys (with their
+#                                      Content-Type and Cache-Control when downloaded)
+#   tables/<Table>/<Table>-NNN-of-NNN.ddb.jsonl.gz
+#   images/<bucket>/<key>              only with --with-images
+#
+# Usage: python3 scripts/snapshot_env.py snapshot dev snapshots/dev-2024-05-01 [--with-images]
+#        python3 scripts/snapshot_env.py restore snapshots/dev-2024-05-01 test1
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_TABLES = ('Items', 'TransactionHistory', 'Users')
+# Attributes holding S3 image URLs, per table
+IMAGE_ATTRIBUTES = {'Items': ('image',), 'Users': ('picture',)}
+IMAGE_URL_PATTERN = re.compile(r'^https://([a-z0-9.-]+?)\.s3(?:[.-][a-z0-9-]+)?\.amazonaws\.com/(.+)$')
+BUCKET_TEMPLATE = "{env}-kashishop2"
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+deserializer = TypeDeserializer()
+
+
+def parse_image_url(url):
+    match = IMAGE_URL_PATTERN.match(url) if isinstance(url, str) else None
+    return (match.group(1), match.group(2)) if match else None
+
+
+def read_shard(path):
+    with gzip.open(path, 'rt') as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def referenced_images(table, shards):
+    attributes = IMAGE_ATTRIBUTES.get(table, ())
+    images = set()
+    if not attributes:
+        return images
+    for shard in shards:
+        for raw in read_shard(shard):
+            for attribute in attributes:
+                parsed = parse_image_url(raw.get(attribute, {}).get('S'))
+                if parsed:
+                    images.add(parsed)
+    return images
+
+
+def snapshot(env, out_dir, segments=8, with_images=False, workers=16, region=None):
+    """
+    Write a snapshot of the <env> tables (and optionally their images) to out_dir.
+
+    Returns:
+        dict: The snapshot manifest.
+    """
+    out_dir = Path(out_dir)
+    started = time.perf_counter()
+
+    def export(table):
+        result = export_table(f"{env}-{table}", out_dir / 'tables' / table, fmt='ddb-json',
+                              segments=segments, region=region, prefix=table)
+        print(f"  • {table}: {result['rows']} rows in {result['seconds']:.1f}s", file=sys.stderr)
+        return table, result
+
+    with ThreadPoolExecutor(max_workers=len(SNAPSHOT_TABLES)) as executor:
+        results = dict(executor.map(export, SNAPSHOT_TABLES))
+
+    images = set()
+    for table, result in results.items():
+        images |= referenced_images(table, result['shards'])
+    images = sorted(images)
+
+    objects = [{'bucket': bucket, 'key': key} for bucket, key in images]
+    if with_images:
+        s3 = boto3.client('s3', region_name=region, config=Config(max_pool_connections=max(10, workers)))
+
+        def download(obj):
+            target = out_dir / 'images' / obj['bucket'] / obj['key']
+            target.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                # Kept in the manifest: restore uploads the file with the same headers
+                head = s3.head_object(Bucket=obj['bucket'], Key=obj['key'])
+                s3.download_file(obj['bucket'], obj['key'], str(target))
+            except ClientError as e:
+                print(f"  ⚠️ s3://{obj['bucket']}/{obj['key']}: {e.response['Error']['Code']}", file=sys.stderr)
+                return False
+            for field in ('ContentType', 'CacheControl'):
+                if head.get(field):
+                    obj[field] = head[field]
+            return True
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            downloaded = sum(executor.map(download, objects))
+        print(f"  • Images: {downloaded}/{len(images)} downloaded", file=sys.stderr)
+
+    manifest = {
+        'version': SNAPSHOT_VERSION,
+        'sourceEnv': env,
+        'createdAt': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'tables': {
+            table: {
+                'rows': result['rows'],
+                'shards': [str(Path(shard).relative_to(out_dir)) for shard in result['shards']]
+            }
+            for table, result in results.items()
+        },
+        'images': {
+            'included': with_images,
+            'objects': objects
+        }
+    }
+    (out_dir / 'manifest.json').write_text(json.dumps(manifest, indent=2))
+    print(f"✅ Snapshot of {env} written to {out_dir} in {time.perf_counter() - started:.1f}s "
+          f"({sum(r['rows'] for r in results.values())} rows, {len(images)} images)", file=sys.stderr)
+    return manifest
+
+
+def template_table_names():
+    # deploy-lambda.py has a dash in its name, so it can't be imported directly
+    spec = importlib.util.spec_from_file_location('deploy_lambda', SCRIPT_DIR / 'deploy-lambda.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.load_table_names()
+
+
+def check_tables(tables):
+    """Exit on table names the DynamoDB template doesn't define, before any scan or write."""
+    unknown = sorted(set(tables) - set(template_table_names()))
+    if unknown:
+        print(f"❌ Not tables of templates/dynamodb-template.yaml: {', '.join(unknown)}", file=sys.stderr)
+        sys.exit(1)
+
+
+def load_manifest(snapshot_dir):
+    path = Path(snapshot_dir) / 'manifest.json'
+    if not path.is_file():
+        print(f"❌ {path} not found; is {snapshot_dir} a snapshot?", file=sys.stderr)
+        sys.exit(1)
+    manifest = json.loads(path.read_text())
+    if manifest.get('version') != SNAPSHOT_VERSION:
+        print(f"❌ Unsupported snapshot version {manifest.get('version')}", file=sys.stderr)
+        sys.exit(1)
+    return manifest
+
+
+def restore(snapshot_dir, env, workers=16, bucket=None, tables=None, skip_images=False, region=None):
+    """
+    Load a snapshot into the <env> tables and bucket.
+
+    Args:
+        snapshot_dir (str): Directory written by snapshot().
+        env (str): Target EnvPrefix; its tables must already exist (deploy-all.sh step 3).
+        workers (int): BatchWriteItem workers per table, and image copy workers.
+        bucket (str): Target image bucket, defaults to <env>-kashishop2.
+        tables (list): Subset of the snapshot's tables to restore.
+        skip_images (bool): Leave images and image URLs untouched.
+
+    Returns:
+        dict: Rows restored per table and the number of images copied.
+    """
+    snapshot_dir = Path(snapshot_dir)
+    manifest = load_manifest(snapshot_dir)
+    bucket = bucket or BUCKET_TEMPLATE.format(env=env)
+    tables = tables or list(manifest['tables'])
+    started = time.perf_counter()
+
+    source_buckets = {obj['bucket'] for obj in manifest['images']['objects']}
+
+    def rewrite_urls(table, item):
+        for attribute in IMAGE_ATTRIBUTES.get(table, ()):
+            parsed = parse_image_url(item.get(attribute))
+            if parsed and parsed[0] in source_buckets:
+                item[attribute] = f"https://{bucket}.s3.amazonaws.com/{parsed[1]}"
+        return item
+
+    def load(table):
+        writer = BulkWriter(f"{env}-{table}", region=region, workers=workers)
+        shards = [snapshot_dir / shard for shard in manifest['tables'][table]['shards']]
+        items = (
+            {k: deserializer.deserialize(v) for k, v in raw.items()}
+            for shard in shards for raw in read_shard(shard)
+        )
+        if not skip_images:
+            items = (rewrite_urls(table, item) for item in items)
+        rows = [0]
+
+        def count(index, written):
+            rows[0] += written
+
+        writer.write_all(chunked(items, BATCH_SIZE), count)
+        print(f"  • {env}-{table}: {rows[0]} rows", file=sys.stderr)
+        return table, rows[0]
+
+    def copy_images():
+        if skip_images:
+            return 0
+        s3 = boto3.client('s3', region_name=region, config=Config(max_pool_connections=max(10, workers)))
+        included = manifest['images']['included']
+
+        def copy(obj):
+            try:
+                if included:
+                    # Same Content-Type and Cache-Control as the source object (upload_image.py sets both)
+                    extra_args = {field: obj[field] for field in ('ContentType', 'CacheControl') if obj.get(field)}
+                    s3.upload_file(str(snapshot_dir / 'images' / obj['bucket'] / obj['key']), bucket, obj['key'],
+                                   ExtraArgs=extra_args or None)
+                elif obj['bucket'] != bucket:
+                    # Server-side copy keeps metadata such as Cache-Control and Content-Type
+                    s3.copy_object(Bucket=bucket, Key=obj['key'],
+                                   CopySource={'Bucket': obj['bucket'], 'Key': obj['key']})
+                return 1
+            except (ClientError, FileNotFoundError) as e:
+                print(f"  ⚠️ {obj['bucket']}/{obj['key']}: {e}", file=sys.stderr)
+                return 0
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            copied = sum(executor.map(copy, manifest['images']['objects']))
+        print(f"  • Images: {copied}/{len(manifest['images']['objects'])} → s3://{bucket}", file=sys.stderr)
+        return copied
+
+    # Every table loads concurrently, alongside the image copy
+    with ThreadPoolExecutor(max_workers=len(tables) + 1) as executor:
+        image_future = executor.submit(copy_images)
+        rows = dict(executor.map(load, tables))
+        copied = image_future.result()
+
+    elapsed = time.perf_counter() - started
+    total = sum(rows.values())
+    print(f"✅ Restored {total} rows and {copied} images into {env} in {elapsed:.1f}s "
+          f"({total / elapsed if elapsed else 0:.0f} rows/s)", file=sys.stderr)
+    return {'rows': rows, 'images': copied, 'seconds': elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Snapshot or restore the data of a Kashishop environment')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    snap = subparsers.add_parser('snapshot', help='Export an environment to a snapshot directory')
+    snap.add_argument('env', help='Source EnvPrefix, e.g. dev')
+    snap.add_argument('out_dir', help='Snapshot directory')
+    snap.add_argument('--segments', type=int, default=8, help='Parallel scan segments per table')
+    snap.add_argument('--with-images', action='store_true', help='Download referenced images into the snapshot')
+    snap.add_argument('--workers', type=int, default=16, help='Parallel image downloads')
+    snap.add_argument('--region', default=None, help='AWS region')
+
+    rest = subparsers.add_parser('restore', help='Load a snapshot into an environment')
+    rest.add_argument('snapshot_dir', help='Snapshot directory')
+    rest.add_argument('env', help='Target EnvPrefix, e.g. test1')
+    rest.add_argument('--workers', type=int, default=16, help='BatchWriteItem workers per table')
+    rest.add_argument('--bucket', default=None, help='Target image bucket (default <env>-kashishop2)')
+    rest.add_argument('--tables', help=f"Comma-separated subset of {', '.join(SNAPSHOT_TABLES)}")
+    rest.add_argument('--skip-images', action='store_true', help='Do not copy images or rewrite image URLs')
+    rest.add_argument('--region', default=None, help='AWS region')
+    args = parser.parse_args()
+
+    if args.command == 'snapshot':
+        check_tables(SNAPSHOT_TABLES)
+        snapshot(args.env, args.out_dir, segments=args.segments, with_images=args.with_images,
+                 workers=args.workers, region=args.region)
+    else:
+        tables = [t.strip() for t in args.tables.split(',') if t.strip()] if args.tables else None
+        check_tables(tables or SNAPSHOT_TABLES)
+        restore(args.snapshot_dir, args.env, workers=args.workers, bucket=args.bucket, tables=tables,
+                skip_images=args.skip_images, region=args.region)
+
+
+if __name__ == '__main__':
+    main()
@@ -18,6 +18,39 @@ def aws_cli(cmd):
     return proc.stdout.strip()
 
 
+def apply_callback_values(content, client_id, client_secret, redirect_uri, token_endpoint, api_url):
+    """Return callback.js content with the environment-specific constants filled in."""
+    # Replace constants
+    replacements = {
+        r'const\s+clientId\s*=\s*".*?";': f'const clientId = "{client_id}";',
+        r'const\s+clientSecret\s*=\s*".*?";': f'const clientSecret = "{client_secret}";',
+        r'const\s+redirectUri\s*=\s*".*?";': f'const redirectUri = "{redirect_uri}";',
+        r'const\s+tokenEndpoint\s*=\s*".*?";': f'const tokenEndpoint = "{token_endpoint}";'
+    }
+    for pat, repl in replacements.items():
+        content = re.sub(pat, repl, content)
+
+    # Replace or insert API constant
+    api_pattern = r'const\s+API\s*=\s*".*?";'
+    api_line = f'const API = "{api_url}";'
+    if re.search(api_pattern, content):
+        content = re.sub(api_pattern, api_line, content)
+    else:
+        content = re.sub(r'(const\s+tokenEndpoint\s*=\s*".*?";)',
+                         lambda m: f"{m.group(1)}\n{api_line}", content)
+
+    # Insert or replace Basic Auth line
+    basic_pattern = r'const\s+basicAuth\s*=.*?;'
+    basic_line = 'const basicAuth = btoa(`${clientId}:${clientSecret}`);'
+    if re.search(basic_pattern, content):
+        content = re.sub(basic_pattern, basic_line, content)
+    else:
+        # insert after API constant
+        content = re.sub(api_pattern,
+                         lambda m: f"{m.group(0)}\n{basic_line}", content)
+    return content
+
+
 def main():
     parser = argparse.ArgumentParser(description="Update callback.js for Basic Auth flow")
     parser.add_argument("--file", default="./frontend/script/callback.js",
@@ -68,6 +101,12 @@ def main():
         "aws", "apigateway", "get-rest-apis",
         "--query", f"items[?name=='{api_name}'].id | [0]", "--output", "text", "--region", region
     ])
+    if api_id in ('', 'None'):
+        # Deployed as an HTTP API (API_TYPE=http)
+        api_id = aws_cli([
+            "aws", "apigatewayv2", "get-apis",
+            "--query", f"Items[?Name=='{api_name}'].ApiId | [0]", "--output", "text", "--region", region
+        ])
     api_url = f"https://{api_id}.execute-api.{region}.amazonaws.com/{env}"
 
     # Read existing callback.js
@@ -78,34 +117,7 @@ def main():
         print(f"Failed to read {args.file}: {e}", file=sys.stderr)
         sys.exit(1)
 
-    # Replace constants
-    replacements = {
-        r'const\s+clientId\s*=\s*".*?";': f'const clientId = "{client_id}";',
-        r'const\s+clientSecret\s*=\s*".*?";': f'const clientSecret = "{client_secret}";',
-        r'const\s+redirectUri\s*=\s*".*?";': f'const redirectUri = "{redirect_uri}";',
-        r'const\s+tokenEndpoint\s*=\s*".*?";': f'const tokenEndpoint = "{token_endpoint}";'
-    }
-    for pat, repl in replacements.items():
-        content = re.sub(pat, repl, content)
-
-    # Replace or insert API constant
-    api_pattern = r'const\s+API\s*=\s*".*?";'
-    api_line = f'const API = "{api_url}";'
-    if re.search(api_pattern, content):
-        content = re.sub(api_pattern, api_line, content)
-    else:
-        content = re.sub(r'(const\s+tokenEndpoint\s*=\s*".*?";)',
-                         lambda m: f"{m.group(1)}\n{api_line}", content)
-
-    # Insert or replace Basic Auth line
-    basic_pattern = r'const\s+basicAuth\s*=.*?;'
-    basic_line = 'const basicAuth = btoa(`${clientId}:${clientSecret}`);'
-    if re.search(basic_pattern, content):
-        content = re.sub(basic_pattern, basic_line, content)
-    else:
-        # insert after API constant
-        content = re.sub(api_pattern,
-                         lambda m: f"{m.group(0)}\n{basic_line}", content)
+    content = apply_callback_values(content, client_id, client_secret, redirect_uri, token_endpoint, api_url)
 
     # Write back
     try: